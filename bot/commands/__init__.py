@@ -6,6 +6,7 @@ Modules:
 - help: Contains functions to handle the /help command.
 - friend: Contains functions to handle the /friend command.
 - birthday: Contains functions to handle the /birthday command.
+- birthdays: Contains functions to handle the /birthdays command.
 - math: Contains functions to handle the /math command.
 ---
 - birthday_response: Contains functions to handle the response to the /birthday command
@@ -23,6 +24,7 @@ from .start import start_command
 from .help import help_command
 from .friend import friend_command
 from .birthday import birthday_command
+from .birthdays import birthdays_command
 from .math import math_command
 
 from .helpers.birthdayres import birthday_response
@@ -33,5 +35,6 @@ __all__ = [
     "help_command",
     "friend_command",
     "birthday_command",
+    "birthdays_command",
     "math_command",
 ]
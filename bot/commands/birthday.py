@@ -6,9 +6,33 @@ from telegram.ext import ContextTypes
 from datetime import datetime
 
 # Custom-made
-from utils import get_user_info, StateManager, TimerConfig, set_timer, c_vars
+from utils import (
+    Router,
+    BOT_TIMEZONE,
+    get_user_record_async,
+    next_birthday,
+    StateManager,
+    BirthdaySession,
+    TimerConfig,
+    set_timer,
+    c_vars,
+)
 
 
+def days_word(days: int) -> str:
+    """
+    Return the Russian word for "days" agreeing with a number.
+
+    Example:
+        >>> days_word(3)
+        'дня'
+    """
+    if days % 10 in {5, 6, 7, 8, 9, 0} or days % 100 in {11, 12, 13, 14}:
+        return "дней"
+    return "дня" if days % 10 in {2, 3, 4} else "день"
+
+
+@Router.command("birthday")
 async def birthday_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     Handle the /birthday command.
@@ -33,42 +57,30 @@ async def birthday_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     print("Birthday command triggered")
     user, chat, mention, _ = c_vars(update)
 
-    user_info = get_user_info(user)
+    record = await get_user_record_async(user)
     state_manager = StateManager()
 
     # Check if the user is already setting their birthday
-    bd_state = await state_manager.get_state("birthday", user.id)
+    bd_state = await state_manager.get_state("birthday", chat.id, user.id)
 
-    if bd_state and bd_state["action"]["setting"]:
+    if bd_state and bd_state.action == "setting":
         prompt = f"{mention}, сначала закончи менять свою дату рождения!"
         await context.bot.send_message(chat.id, prompt)
         return
 
-    birthday = user_info[str(user.id)]["credentials"]["birthday"]
+    birthday = record.birthday_date
     if birthday:
-        if isinstance(birthday, str):
-            birthday = datetime.strptime(birthday, "%d.%m.%Y")
-
-        today = datetime.today()
-        next_bd = birthday.replace(year=today.year)
-        if next_bd <= today:
-            next_bd = next_bd.replace(year=today.year + 1)
-
-        days_until_birthday = (next_bd - today).days
-        days_word = (
-            "дней"
-            if days_until_birthday % 10 in {5, 6, 7, 8, 9, 0}
-            else "дня" if days_until_birthday % 10 in {2, 3, 4} else "день"
-        )
+        today = datetime.now(BOT_TIMEZONE).date()
+        days_until_birthday = (next_birthday(birthday, today) - today).days
 
-        if days_until_birthday in [0, 364]:
+        if days_until_birthday == 0:
             prompt = f"С днем рождения, {mention}! 🥳🎂"
         else:
-            prompt = f"{mention}, до твоего дня рождения осталось {days_until_birthday} {days_word}! 🎉"
+            prompt = f"{mention}, до твоего дня рождения осталось {days_until_birthday} {days_word(days_until_birthday)}! 🎉"
         await context.bot.send_message(chat.id, prompt)
     else:
         prompt = f"{mention}, твоя дата дня рождения не установлена. Пожалуйста, введи ее в формате 'дд.мм.гггг', и я сохраню ее 🙂"
-        await state_manager.set_state("birthday", user.id, {"action": "setting"})
+        await state_manager.set_state("birthday", chat.id, user.id, BirthdaySession())
         await context.bot.send_message(chat.id, prompt)
 
         # Setting the timer (using TimerConfig)
@@ -81,6 +93,6 @@ async def birthday_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -
             prompt=f"{mention}, установка дня рождения не закончена. Время истекло.",
             timeout=30,
             callback_data="/birthday",
-            is_active=lambda state: state["action"] == "setting",
+            active_action="setting",
         )
         await set_timer(config)
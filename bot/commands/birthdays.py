@@ -0,0 +1,66 @@
+# 3rd party
+from telegram import Update
+from telegram.ext import ContextTypes
+
+# Built-in
+from datetime import datetime
+
+# Custom-made
+from utils import Router, BOT_TIMEZONE, BirthdayIndex, ChatMembers, UserStore, run_blocking, c_vars
+from .birthday import days_word
+
+DEFAULT_COUNT: int = 5  # birthdays listed without an argument
+MAX_COUNT: int = 20
+
+
+@Router.command("birthdays")
+async def birthdays_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Handle the /birthdays command.
+
+    This function lists the next birthdays of the members of the chat, soonest first. The number of
+    birthdays can be given as an argument (e.g. "/birthdays 10").
+    ---
+    Args:
+        update (telegram.Update): The incoming update from Telegram.
+        context (telegram.ext.ContextTypes.DEFAULT_TYPE): The context for the update.
+
+    Example:
+        >>> await birthdays_command(update, context)
+    ---
+    The function performs the following steps:
+    1. Reads the number of birthdays to list from the arguments.
+    2. Walks the birthday index from today and keeps the members of the chat, until enough are found.
+    3. Sends the list with the days left until every birthday.
+    """
+    print("Birthdays command triggered")
+    user, chat, _, _ = c_vars(update)
+
+    count = DEFAULT_COUNT
+    if context.args and context.args[0].isdigit():
+        count = min(max(int(context.args[0]), 1), MAX_COUNT)
+
+    # In a private chat only the user's own birthday belongs to the chat
+    members = {user.id} if chat.type == "private" else ChatMembers().members_of(chat.id)
+
+    today = datetime.now(BOT_TIMEZONE).date()
+    lines = []
+    for day, user_id in BirthdayIndex().upcoming(today):
+        if int(user_id) not in members:
+            continue
+
+        record = await run_blocking(UserStore().get, user_id)
+        if record is None:
+            continue
+        name = record.first_name or record.username
+        days_left = (day - today).days
+        when = "сегодня! 🥳" if days_left == 0 else f"через {days_left} {days_word(days_left)}"
+        lines.append(f"{day:%d.%m} — {name}, {when}")
+        if len(lines) == count:
+            break
+
+    if lines:
+        prompt = "🎂 Ближайшие дни рождения:\n\n" + "\n".join(lines)
+    else:
+        prompt = "Здесь пока никто не сохранил свой день рождения. Это можно сделать командой /birthday 🙂"
+    await context.bot.send_message(chat.id, prompt)
@@ -6,9 +6,10 @@ from telegram.ext import ContextTypes
 import random
 
 # Custom
-from utils import get_user_info, save_user_info, c_vars
+from utils import Router, get_user_record_async, save_user_record_async, c_vars
 
 
+@Router.command("friend")
 async def friend_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     Handle the /friend command.
@@ -33,14 +34,12 @@ async def friend_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     user, chat, mention, _ = c_vars(update)
 
     # Check if the user has used the command recently
-    user_info = get_user_info(user)
-    used_today = user_info[str(user.id)]["friend"]["used_today"]
+    record = await get_user_record_async(user)
 
-    if used_today:
+    if record.friend_used_today:
         # User HAS used the command recently - notify about the cooldown
         print("Friend command triggered - NOT generating")
-        stored_percentage = user_info[str(user.id)]["friend"]["percentage"]
-        prompt = f"Прости, {mention}, ты уже узнал свой уровень дружбы на сегодня: {stored_percentage}%"
+        prompt = f"Прости, {mention}, ты уже узнал свой уровень дружбы на сегодня: {record.friend_percentage}%"
         await context.bot.send_message(chat.id, prompt)
     else:
         # User CAN use the command - proceed with generating
@@ -49,6 +48,5 @@ async def friend_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         prompt = f"Уровень дружбы {mention} сегодня: {random_percentage}% ❤"
         await context.bot.send_message(chat.id, prompt)
 
-        user_info[str(user.id)]["friend"]["used_today"] = True
-        user_info[str(user.id)]["friend"]["percentage"] = random_percentage
-        save_user_info(user_info)
+        record.set_friend_percentage(random_percentage)
+        await save_user_record_async(user, record)
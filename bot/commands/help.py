@@ -3,9 +3,24 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 
 # Custom
-from utils import get_and_save, c_vars
+from utils import Router, get_and_save_async, c_vars
+
+# The help keyboard, also shown under the pages it leads to
+HELP_MARKUP = InlineKeyboardMarkup(
+    [
+        [
+            InlineKeyboardButton("🔍 Возможности", callback_data="/capabilities"),
+            InlineKeyboardButton("🚀 Планы", callback_data="/future"),
+        ],
+        [
+            InlineKeyboardButton("👋 Что я и зачем я", callback_data="/about_me"),
+            InlineKeyboardButton("🚀 На начало", callback_data="/start_message"),
+        ],
+    ]
+)
 
 
+@Router.command("help")
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     Handle the /help command.
@@ -27,25 +42,9 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     """
     print("Help command triggered")
     user, chat, _, _ = c_vars(update)
-    get_and_save(user)
+    await get_and_save_async(user)
 
-    caps_text = "🔍 Возможности"
-    future_text = "🚀 Планы"
-    about_text = "👋 Что я и зачем я"
-    start_text = "🚀 На начало"
-
-    keyboard = [
-        [
-            InlineKeyboardButton(caps_text, callback_data="/capabilities"),
-            InlineKeyboardButton(future_text, callback_data="/future"),
-        ],
-        [
-            InlineKeyboardButton(about_text, callback_data="/about_me"),
-            InlineKeyboardButton(start_text, callback_data="/start_message"),
-        ],
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
     prompt = "Выбери одну из опций:"
     await context.bot.send_message(
-        chat_id=chat.id, text=prompt, reply_markup=reply_markup
+        chat_id=chat.id, text=prompt, reply_markup=HELP_MARKUP
     )
@@ -6,7 +6,14 @@ from telegram.ext import ContextTypes
 import re
 
 # Custom
-from utils import get_user_info, save_user_info, StateManager, c_vars
+from utils import (
+    get_user_record_async,
+    save_user_record_async,
+    parse_birthday,
+    BirthdayIndex,
+    StateManager,
+    c_vars,
+)
 from ..birthday import birthday_command
 
 
@@ -29,37 +36,38 @@ async def birthday_response(update: Update, context: ContextTypes.DEFAULT_TYPE)
     ---
     The function performs the following steps:
     1. Checks if the user is in the correct state to set their birthday.
-    2. Validates the date input format (dd.mm.yyyy).
-    3. Saves the date to the user's information.
-    4. Sends a confirmation message to the user.
-    5. Removes the user's state from the state manager.
+    2. Validates the date input format (dd.mm.yyyy) and parses it.
+    3. Removes the user's state, and with it the deadline, from the state manager.
+    4. Saves the date to the user's information and moves the user in the birthday index.
+    5. Sends a confirmation message to the user.
     6. Calls the birthday command.
     """
     user, chat, mention, user_input = c_vars(update)
 
     state_manager = StateManager()
-    bd_state = await state_manager.get_state("birthday", user.id)
+    bd_state = await state_manager.get_state("birthday", chat.id, user.id)
 
     # Check if bot is awaiting the birthday setting
-    if not bd_state or bd_state["action"] != "setting":
+    if not bd_state or bd_state.action != "setting":
         return
 
     date_pattern = re.compile(r"^\d{2}\.\d{2}\.\d{4}$")
-    if not date_pattern.match(user_input):
+    birthday = parse_birthday(user_input) if date_pattern.match(user_input) else None
+    if not birthday:
         prompt = f"Введи дату в формате 'дд.мм.гггг', {mention}..."
         await context.bot.send_message(chat.id, prompt)
         return
 
-    if bd_state["timer"]:
-        bd_state["timer"].cancel()
+    # Drops the deadline too, so the timeout cannot fire while the date is saved and confirmed
+    await state_manager.remove_state("birthday", chat.id, user.id)
 
-    user_info = get_user_info(user)
-    user_info[str(user.id)]["credentials"]["birthday"] = str(user_input)
-    save_user_info(user_info)
+    record = await get_user_record_async(user)
+    record.birthday = birthday
+    await save_user_record_async(user, record)
+    BirthdayIndex().set(str(user.id), record.birthday_date)
 
     prompt = f"Я сохранил твою дату дня рождения: {user_input}"
     await context.bot.send_message(chat.id, prompt)
-    await state_manager.remove_state("birthday", user.id)
     await birthday_command(update, context)
 
     print("Setting ended")
@@ -4,8 +4,8 @@ from telegram.ext import ContextTypes
 
 
 # Custom
-from utils import get_user_info, save_user_info, StateManager, c_vars
-from ..math import math_command
+from utils import get_user_record_async, save_user_record_async, StateManager, c_vars
+from ..math import math_command, retry_callback
 
 
 async def math_response(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -34,14 +34,13 @@ async def math_response(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     6. Saves user information and removes their state from the state manager if needed.
     """
     user, chat, mention, user_input = c_vars(update)
-    user_info = get_user_info(user)
     goal = 20
 
     state_manager = StateManager()
-    math_state = await state_manager.get_state("math", user.id)
+    math_state = await state_manager.get_state("math", chat.id, user.id)
 
     # Check if bot is awaiting response
-    if math_state or math_state["action"] != "answering":
+    if not math_state or math_state.action != "answering":
         return
 
     try:
@@ -54,52 +53,48 @@ async def math_response(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         return
 
     # Get the correct answer to the equation
-    result = math_state["result"]
+    result = math_state.result
+    record = await get_user_record_async(user)
 
     if user_input == result:
         # Correct answer
-        math_state["score"] += 1
-        math_state["action"] = "done"
+        math_state.score += 1
+        math_state.action = "done"
 
         # Update the state with the current score from math_game
-        # math_state = await state_manager.get_state("math", user.id)
+        # math_state = await state_manager.get_state("math", chat.id, user.id)
 
         # IF USER SUCCEDED SET HIGH SCORE
-        if math_state["score"] > user_info[str(user.id)]["math_score"]:
-            if math_state["score"] <= goal:
-                user_info[str(user.id)]["math_score"] = math_state["score"]
-                save_user_info(user_info)
+        if math_state.score > record.math_score:
+            if math_state.score <= goal:
+                record.math_score = math_state.score
+                await save_user_record_async(user, record)
 
         # IF REACHED THE GOAL
-        if math_state["score"] >= goal:
+        if math_state.score >= goal:
             prompt = f"Поздравляю, {mention}! Ты достиг цели: {goal}! 🏅"
             await context.bot.send_message(chat.id, prompt)
-            await state_manager.remove_state("math", user.id)
+            await state_manager.remove_state("math", chat.id, user.id)
             return
 
-        # Update state and proceed to the next question
-        await state_manager.set_state("math", user.id, math_state)
-
-        # Cancel the existing timer task and create a new one
-        if math_state["timer"]:
-            math_state["timer"].cancel()
+        # Store the new score; the new version voids the pending timer and the next question arms a new one
+        await state_manager.set_state("math", chat.id, user.id, math_state)
         await math_command(update, context)
     else:
         # Incorrect answer
         retry_text = "Попробовать еще раз..."
         keyboard = [
-            [InlineKeyboardButton(retry_text, callback_data="/math")],
+            [InlineKeyboardButton(retry_text, callback_data=retry_callback(math_state.level))],
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
         prompt = (
             f"Ответ неверен, {mention} 🥺\n"
             f"Правильный ответ: {result}\n"
-            f"\nТвой финальный счёт: {math_state['score']} из {goal}"
+            f"\nТвой финальный счёт: {math_state.score} из {goal}"
         )
 
-        # Cancel the existing timer task
-        if math_state["timer"]:
-            math_state["timer"].cancel()
+        # Delete their data first, which cancels the timer
+        await state_manager.remove_state("math", chat.id, user.id)
 
         await context.bot.send_message(
             chat_id=chat.id,
@@ -107,6 +102,5 @@ async def math_response(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
             reply_markup=reply_markup,
         )
 
-        # Save user information and delete their data
-        save_user_info(user_info)
-        await state_manager.remove_state("math", user.id)
+        # Save user information
+        await save_user_record_async(user, record)
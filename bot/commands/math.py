@@ -1,16 +1,37 @@
 # 3rd party
 from telegram import Update
+from telegram.error import BadRequest
 from telegram.ext import ContextTypes
 
 # Custom
-from utils import StateManager, generate_equation, TimerConfig, set_timer, c_vars
+from utils import (
+    Router,
+    StateManager,
+    MathSession,
+    generate_equation,
+    TimerConfig,
+    set_timer,
+    c_vars,
+)
 
+# Largest operand of every difficulty, chosen with "/math hard" or the callback "/math:hard"
+LEVELS = {"normal": 99, "hard": 999}
 
+
+def retry_callback(level: str) -> str:
+    """
+    Return the callback data starting a new game at a difficulty.
+    """
+    return "/math" if level == "normal" else f"/math:{level}"
+
+
+@Router.command("math")
 async def math_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     Handle the /math command.
 
     This function initiates a math game for the user by generating a mathematical equation and prompting the user to solve it.
+    The difficulty can be given as an argument ("/math hard", or the callback data "/math:hard"); the next rounds keep it.
     It tracks the user's score and provides feedback on each answer. Additionally, it sets a timer for each question and handles
     the timeout scenario.
     ---
@@ -24,7 +45,8 @@ async def math_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     The function performs the following steps:
     1. Checks if the user is already playing the game. If so, it forbids starting a new game.
     2. Generates a new mathematical equation and updates the user's state with the equation and the correct answer.
-    3. Sends a prompt to the user with the equation.
+    3. Shows the equation: a new game sends a new game message, the next rounds edit it in place. If the
+       message cannot be edited (e.g. it was deleted), a new one is sent instead.
     4. Sets a timer for the question and handles the timeout scenario.
     """
     print("Math command triggered")
@@ -32,44 +54,50 @@ async def math_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     state_manager = StateManager()
     goal = 20
 
-    math_state = await state_manager.get_state("math", user.id)
+    math_state = await state_manager.get_state("math", chat.id, user.id)
 
     # Check if the user is already playing (has the "answering" flag)
-    if math_state and math_state["action"] == "answering":
+    if math_state and math_state.action == "answering":
         # If YES - forbid to call the /math command
         prompt = f"{mention}, ты уже играешь! Сначала ответь на задание!"
         await context.bot.send_message(chat.id, prompt)
         return
-    else:
-        # If NO - generate a new equation
-        num1, num2, operator, result = await generate_equation()
-        # Declaring a new dictionary (setting all the defaults)
-        await state_manager.set_state(
-            "math",
-            user.id,
-            {
-                "action": "answering",
-                "score": math_state.get(user.id, {}).get("score", 0),
-                "result": result,
-                "timer": None,
-            },
-        )
-
-    # Reload the state to get the updated information
-    math_state = await state_manager.get_state("math", user.id)
+
+    # If NO - generate a new equation, keeping the score and difficulty of the current game
+    score = math_state.score if math_state else 0
 
     # Check if user achieved the max result
-    if math_state["score"] == goal:
-        math_state["score"] = 0
+    if score == goal:
+        score = 0
+
+    args = context.args or []
+    if args and args[0] in LEVELS:
+        level = args[0]
+    else:
+        level = math_state.level if math_state and score else "normal"
+    num1, num2, operator, result = await generate_equation(LEVELS[level])
 
-    # Generate prompt and send
+    # Generate prompt and show it in the game message
     equation = f"Сколько будет {num1} {operator} {num2}?"
-    prompt = (
-        f"Проверим твои знания математики, {mention}.\n\n{equation}"
-        if math_state["score"] == 0
-        else f"Правильно, {mention}!\nТекущий счет: {math_state['score']}.\nСледующий вопрос:\n\n{equation}"
+    message_id = math_state.message_id if math_state and score else None
+    if score == 0:
+        prompt = f"Проверим твои знания математики, {mention}.\n\n{equation}"
+    else:
+        prompt = f"Правильно, {mention}!\nТекущий счет: {score}.\nСледующий вопрос:\n\n{equation}"
+
+    try:
+        if message_id is not None:
+            await context.bot.edit_message_text(prompt, chat_id=chat.id, message_id=message_id)
+        else:
+            message_id = (await context.bot.send_message(chat.id, prompt)).message_id
+    except BadRequest as e:
+        print(f"Could not edit the math game message: {e}")
+        message_id = (await context.bot.send_message(chat.id, prompt)).message_id
+
+    math_state = MathSession(
+        action="answering", score=score, result=result, message_id=message_id, level=level
     )
-    await context.bot.send_message(chat.id, prompt)
+    await state_manager.set_state("math", chat.id, user.id, math_state)
 
     # Setting the timer (using TimerConfig)
     config = TimerConfig(
@@ -80,10 +108,10 @@ async def math_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         mention=mention,
         prompt=(
             f"Время истекло, {mention}.⌛\n"
-            f"\nТвой финальный счёт: {math_state['score']} из {goal}"
+            f"\nТвой финальный счёт: {math_state.score} из {goal}"
         ),
         timeout=10,
-        callback_data="/math",
-        is_active=lambda state: state["action"] == "answering",
+        callback_data=retry_callback(level),
+        active_action="answering",
     )
     await set_timer(config)
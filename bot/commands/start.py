@@ -3,9 +3,10 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 
 # Custom
-from utils import get_and_save, c_vars
+from utils import Router, get_and_save_async, c_vars
 
 
+@Router.command("start")
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     Handle the /start command.
@@ -27,7 +28,7 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     """
     print("Start command triggered")
     user, chat, _, _ = c_vars(update)
-    get_and_save(user)
+    await get_and_save_async(user)
 
     friend_text = "🎲 Сегодняшний уровень дружбы"
     birthday_text = "🎉 Через сколько дней у меня ДР"
@@ -2,28 +2,32 @@
 The handlers package contains modules for handling various types of updates from the Telegram bot.
 
 Modules:
-- callback_query: Contains functions to handle callback queries from inline keyboards.
+- callback_query: Contains the routes of the inline buttons of the help message.
 - message: Contains functions to handle various types of messages, including new messages and edited messages.
 - math_response: Contains functions to handle math-related responses.
 - birthday_response: Contains functions to handle responses related to setting a user's birthday.
+- chat_member: Contains functions to keep the index of chat members current.
 - error: Contains functions to handle errors.
 `
 Usage:
 Import specific handlers:
-    from handlers import handle_callback_query, handle_message
+    from handlers import handle_message, handle_error
 
 Or import all handlers:
     from handlers import *
 """
 
-from .callback_query import handle_callback_query
+# Registers the help keyboard routes with the Router
+from . import callback_query
 from .message import handle_message, handle_new_message, handle_edited_message
+from .chat_member import track_chat_members, handle_chat_member
 from .error import handle_error
 
 __all__ = [
-    "handle_callback_query",
     "handle_message",
     "handle_new_message",
     "handle_edited_message",
+    "track_chat_members",
+    "handle_chat_member",
     "handle_error",
 ]
@@ -1,97 +1,63 @@
 # 3rd party
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Update
 from telegram.ext import ContextTypes
 
 # Custom
-from commands import *
-
-
-async def handle_callback_query(
-    update: Update, context: ContextTypes.DEFAULT_TYPE
-) -> None:
+from commands import start_command
+from commands.help import HELP_MARKUP
+from utils import Router
+
+# Text of the pages of the help keyboard by their callback data
+HELP_PAGES = {
+    "/capabilities": (
+        "🔍 Мои возможности:\n"
+        "\n/start - Моё приветствие"
+        "\n/friend - Узнать уровень твоей дружбы на сегодня"
+        "\n/birthday - Узнать, сколько осталось до твоего дня рождения"
+        "\n/birthdays - Ближайшие дни рождения в этом чате"
+        "\n/math - Проверить твои знания математики (/math hard - посложнее)"
+        "\n/help - Рассказать о себе"
+    ),
+    "/future": (
+        "🚀 Будущие обновления:\n\n- Рандомизатор игры на сегодня с последующим опросом"
+        "\n- Усовершенствование диалогов (возможно подключение LLM)"
+        "\n- Автоматическое отправление жаб в Дружбу каждую среду"
+        "\n- Малые правки остальных команд"
+    ),
+    "/about_me": (
+        "👋 Что я и зачем я:\n\nЯ дружный Друг. Меня создал Влад с нуля на питоне вместо того, "
+        "что бы заниматься более полезными делами. Влад не умеет программировать красиво, поэтому его код лучше не видеть."
+        "\n\nСоздан я по большей части для небольшого развлечения Дружбы. "
+        "За основные концепты были взяты рандомизатор % и небольшая математическая игра от Евгосика"
+    ),
+}
+
+
+@Router.callback(*HELP_PAGES)
+async def show_help_page(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
-    Handle callback queries from inline keyboards.
-
-    This function processes callback queries triggered by inline keyboards (telegram buttons),
-    and performs different actions based on the received data.
+    Show a page of the help keyboard in place of the current one.
 
     Args:
         update (telegram.Update): The incoming update from Telegram.
         context (telegram.ext.ContextTypes.DEFAULT_TYPE): The context for the update.
 
-    Raises:
-        ValueError: If the received data does not match any expected callback query.
-
     Example:
-        >>> await handle_callback_query(update, context)
-
-    The function performs the following actions based on the received data:
-    - If the data is "/capabilities", it sends a message listing the bot's capabilities.
-    - If the data is "/future", it sends a message listing the upcoming updates.
-    - If the data is "/about_me", it sends a message explaining the purpose of the bot.
-    ---
-    - If the data is "/start_message", it triggers the start command.
-    - If the data is "/friend", it triggers the friend command.
-    - If the data is "/birthday", it triggers the birthday command.
-    - If the data is "/math", it triggers the math command.
-    - If the data is "/help", it triggers the help command.
+        >>> await Router().dispatch_callback(update, context)  # with the data "/future"
     """
     query = update.callback_query
-    data = query.data
-    
-    caps_text = "🔍 Возможности"
-    future_text = "🚀 Планы"
-    about_text = "👋 Что я и зачем я"
-    start_text = "🚀 На начало"
+    await query.edit_message_text(text=HELP_PAGES[query.data], reply_markup=HELP_MARKUP)
 
-    keyboard = [
-        [
-            InlineKeyboardButton(caps_text, callback_data="/capabilities"),
-            InlineKeyboardButton(future_text, callback_data="/future"),
-        ],
-        [
-            InlineKeyboardButton(about_text, callback_data="/about_me"),
-            InlineKeyboardButton(start_text, callback_data="/start_message"),
-        ],
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
 
-    if data == "/capabilities":
-        prompt = (
-            "🔍 Мои возможности:\n"
-            "\n/start - Моё приветствие"
-            "\n/friend - Узнать уровень твоей дружбы на сегодня"
-            "\n/birthday - Узнать, сколько осталось до твоего дня рождения"
-            "\n/math - Проверить твои знания математики\n/help - Рассказать о себе"
-        )
-        await query.edit_message_text(text=prompt, reply_markup=reply_markup)
-    elif data == "/future":
-        prompt = (
-            "🚀 Будущие обновления:\n\n- Рандомизатор игры на сегодня с последующим опросом"
-            "\n- Усовершенствование диалогов (возможно подключение LLM)"
-            "\n- Автоматическое отправление жаб в Дружбу каждую среду"
-            "\n- Усовершенствование команды /birthday с добавлением автоматического поздравления в день рождения"
-            "\n- Малые правки остальных команд"
-        )
-        await query.edit_message_text(text=prompt, reply_markup=reply_markup)
-    elif data == "/about_me":
-        prompt = (
-            "👋 Что я и зачем я:\n\nЯ дружный Друг. Меня создал Влад с нуля на питоне вместо того, "
-            "что бы заниматься более полезными делами. Влад не умеет программировать красиво, поэтому его код лучше не видеть."
-            "\n\nСоздан я по большей части для небольшого развлечения Дружбы. "
-            "За основные концепты были взяты рандомизатор % и небольшая математическая игра от Евгосика"
-        )
-        await query.edit_message_text(text=prompt, reply_markup=reply_markup)
-    elif data == "/start_message":
-        message_id = query.message.message_id
-        chat_id = query.message.chat.id
-        await context.bot.delete_message(chat_id=chat_id, message_id=message_id)
-        await start_command(update, context)
-    elif data == "/friend":
-        await friend_command(update, context)
-    elif data == "/birthday":
-        await birthday_command(update, context)
-    elif data == "/math":
-        await math_command(update, context)
-    elif data == "/help":
-        await help_command(update, context)
+@Router.callback("/start_message")
+async def back_to_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Replace the help message with the start message.
+
+    Args:
+        update (telegram.Update): The incoming update from Telegram.
+        context (telegram.ext.ContextTypes.DEFAULT_TYPE): The context for the update.
+    """
+    message = update.callback_query.message
+    await context.bot.delete_message(chat_id=message.chat.id, message_id=message.message_id)
+    await start_command(update, context)
@@ -0,0 +1,79 @@
+# 3rd party
+from telegram import Update
+from telegram.constants import ChatMemberStatus
+from telegram.ext import ContextTypes
+
+# Custom
+from utils import ChatMembers
+
+GROUP_TYPES = {"group", "supergroup"}
+GONE = {ChatMemberStatus.LEFT, ChatMemberStatus.BANNED}
+
+
+async def track_chat_members(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Record the sender of every update in a group chat in the chat index.
+
+    This handler sees all updates before the other handlers and never answers them. Service messages
+    about joined and left members and group migrations update the index as well.
+    ---
+    Args:
+        update (telegram.Update): The incoming update from Telegram.
+        context (telegram.ext.ContextTypes.DEFAULT_TYPE): The context for the update.
+
+    Example:
+        >>> app.add_handler(TypeHandler(Update, track_chat_members), group=-1)
+    """
+    chat = update.effective_chat
+    if not chat or chat.type not in GROUP_TYPES or update.my_chat_member or update.chat_member:
+        return
+
+    index = ChatMembers()
+    message = update.effective_message
+    if message and message.migrate_to_chat_id:
+        index.move_chat(chat.id, message.migrate_to_chat_id)
+        return
+
+    user = update.effective_user
+    if user and not user.is_bot:
+        index.add(chat.id, user.id)
+    if message:
+        for member in message.new_chat_members or ():
+            if not member.is_bot:
+                index.add(chat.id, member.id)
+        if message.left_chat_member and not message.left_chat_member.is_bot:
+            index.remove(chat.id, message.left_chat_member.id)
+
+
+async def handle_chat_member(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Handle changes of the members of a chat, including the bot itself.
+
+    `my_chat_member` updates add the chat to the index when the bot joins it and drop it when the bot
+    leaves or is removed. `chat_member` updates (only sent to admin bots) add and remove members.
+    ---
+    Args:
+        update (telegram.Update): The incoming update from Telegram.
+        context (telegram.ext.ContextTypes.DEFAULT_TYPE): The context for the update.
+
+    Example:
+        >>> app.add_handler(ChatMemberHandler(handle_chat_member, ChatMemberHandler.ANY_CHAT_MEMBER))
+    """
+    change = update.my_chat_member or update.chat_member
+    if change.chat.type not in GROUP_TYPES:
+        return
+
+    index = ChatMembers()
+    gone = change.new_chat_member.status in GONE
+    if update.my_chat_member:
+        if gone:
+            index.remove_chat(change.chat.id)
+            print(f"Left chat {change.chat.id}")
+        else:
+            index.add_chat(change.chat.id)
+            print(f"Joined chat {change.chat.id}")
+    elif not change.new_chat_member.user.is_bot:
+        if gone:
+            index.remove(change.chat.id, change.new_chat_member.user.id)
+        else:
+            index.add(change.chat.id, change.new_chat_member.user.id)
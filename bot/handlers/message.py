@@ -42,19 +42,18 @@ async def handle_new_message(
 
         print(f'User: {user_id} in {message_type}: "{text}"')
 
-        state_manager = StateManager()
         dm = DialogManager()
 
-        math_state = await state_manager.get_math_state()
-        bd_state = await state_manager.get_bd_state()
+        # Route to the dialog the user is in with a single lookup
+        category = await StateManager.active_category(update.message.chat.id, user_id)
 
         # math-related responses
-        if user_id in math_state:
+        if category == "math":
             await math_response(update, context)
             return
 
         # Birthday-related responses
-        if user_id in bd_state:
+        if category == "birthday":
             await birthday_response(update, context)
             return
 
@@ -7,12 +7,11 @@ and starts the bot. It also manages tasks and handles errors.
 Modules:
 - dotenv: Loads environment variables from a .env file.
 - telegram.ext: Provides the Application class for building the bot application,
-  CommandHandler, MessageHandler, filters, and CallbackQueryHandler for handling
-  different types of Telegram updates.
+  MessageHandler, filters, and the handlers of chat member updates.
 - os: Provides functions for interacting with the operating system.
 - asyncio: Provides infrastructure for writing single-threaded concurrent code
   using coroutines.
-- commands: Contains command handling functions.
+- commands: Contains command handling functions, registered with the Router.
 - handlers: Contains functions for handling callback queries, messages, and errors.
 - utils: Contains utility classes and functions.
 
@@ -21,12 +20,13 @@ Run the script to start the Telegram bot.
 """
 
 from dotenv import load_dotenv
+from telegram import Update
 from telegram.ext import (
     Application,
-    CommandHandler,
     MessageHandler,
     filters,
-    CallbackQueryHandler,
+    ChatMemberHandler,
+    TypeHandler,
 )
 
 # Built-in
@@ -34,24 +34,50 @@ import os
 import asyncio
 
 # Custom
-from commands import *
-from handlers import handle_callback_query, handle_message, handle_error
-from utils import TaskManager
+import commands  # importing the commands registers their routes with the Router
+from handlers import (
+    handle_message,
+    handle_error,
+    track_chat_members,
+    handle_chat_member,
+)
+from utils import (
+    TaskManager,
+    UserStore,
+    StateManager,
+    BirthdayIndex,
+    ChatMembers,
+    OutboundQueue,
+    Router,
+    WorkQueue,
+    restore_timer,
+    run_blocking,
+    shutdown_io_pool,
+)
 
 load_dotenv()
 
 
 async def main():
     print("Preparing...")
-    app = Application.builder().token(os.getenv("API_KEY")).build()
-    app.add_handler(CommandHandler("start", start_command))
-    app.add_handler(CommandHandler("help", help_command))
-    app.add_handler(CommandHandler("friend", friend_command))
-    app.add_handler(CommandHandler("birthday", birthday_command))
-    app.add_handler(CommandHandler("math", math_command))
-
-    app.add_handler(CallbackQueryHandler(handle_callback_query))
-    app.add_handler(MessageHandler(filters.TEXT, handle_message))
+    UserStore().load()
+    BirthdayIndex().build()
+    ChatMembers().load()
+
+    app = (
+        Application.builder()
+        .token(os.getenv("API_KEY"))
+        # Every request to a chat goes through the rate-limited queue
+        .rate_limiter(OutboundQueue())
+        .build()
+    )
+    # Sees every update first to keep the chat index current
+    app.add_handler(TypeHandler(Update, track_chat_members), group=-1)
+    app.add_handler(ChatMemberHandler(handle_chat_member, ChatMemberHandler.ANY_CHAT_MEMBER))
+    # Every command and inline button, from the routing table
+    Router().register(app)
+    # Answers to the games and prompts run in order with the user's commands and clicks
+    app.add_handler(MessageHandler(filters.TEXT, Router().per_user(handle_message)))
     app.add_error_handler(handle_error)
 
     task_manager = TaskManager()
@@ -60,11 +86,18 @@ async def main():
     print("Initializing...")
     await app.initialize()
 
+    # Bring back the sessions and timers of the last run
+    await StateManager().restore_snapshot(lambda data: restore_timer(data, app.bot))
+
     print("Starting...")
     await app.start()
 
+    # Members of the chats from before the chat index who never post are looked up once
+    user_ids = await run_blocking(lambda: [int(user_id) for user_id, _ in UserStore().iter_all()])
+    await task_manager.add_task(ChatMembers().seed, app.bot, user_ids)
+
     print("Polling...")
-    await app.updater.start_polling(poll_interval=0.5)
+    await app.updater.start_polling(poll_interval=0.5, allowed_updates=Update.ALL_TYPES)
 
     try:
         while True:
@@ -73,8 +106,15 @@ async def main():
         print("Stopping... it may take a while...")
     finally:
         task_manager.stop_tasks()
+        # Let the clicks already answered be handled before the bot goes away
+        await WorkQueue().drain()
+        await StateManager().save_snapshot()
         await app.stop()
         await app.updater.stop()
+        UserStore().close()
+        await ChatMembers().save()
+        await StateManager().close()
+        shutdown_io_pool()
 
 
 if __name__ == "__main__":
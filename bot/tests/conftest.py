@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The bot imports its modules from the bot directory (`from utils import ...`)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
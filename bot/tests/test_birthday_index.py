@@ -0,0 +1,61 @@
+from datetime import date
+
+import pytest
+
+from utils.birthday_index import SLOTS, BirthdayIndex, slot_of
+
+
+@pytest.fixture
+def index():
+    BirthdayIndex._instance = None
+    yield BirthdayIndex()
+    BirthdayIndex._instance = None
+
+
+def test_slots_cover_a_leap_year():
+    assert slot_of(1, 1) == 0
+    assert slot_of(2, 29) == 59
+    assert slot_of(3, 1) == 60
+    assert slot_of(12, 31) == SLOTS - 1
+
+
+def test_set_moves_and_removes_a_user(index):
+    index.set("1", date(2000, 5, 3))
+    index.set("1", date(2000, 5, 4))
+    assert index.celebrating_on(date(2026, 5, 3)) == []
+    assert index.celebrating_on(date(2026, 5, 4)) == ["1"]
+    index.set("1", None)
+    assert index.celebrating_on(date(2026, 5, 4)) == []
+
+
+def test_february_29_is_celebrated_on_february_28_in_common_years(index):
+    index.set("leap", date(2004, 2, 29))
+    index.set("common", date(2001, 2, 28))
+
+    assert sorted(index.celebrating_on(date(2027, 2, 28))) == ["common", "leap"]
+    assert index.celebrating_on(date(2027, 3, 1)) == []
+    assert index.celebrating_on(date(2028, 2, 28)) == ["common"]
+    assert index.celebrating_on(date(2028, 2, 29)) == ["leap"]
+
+
+def test_upcoming_yields_every_user_once_soonest_first(index):
+    index.set("a", date(1990, 10, 18))
+    index.set("b", date(1990, 10, 17))
+    index.set("c", date(1990, 12, 1))
+    index.set("d", date(1990, 12, 1))
+
+    assert list(index.upcoming(date(2026, 10, 18))) == [
+        (date(2026, 10, 18), "a"),
+        (date(2026, 12, 1), "c"),
+        (date(2026, 12, 1), "d"),
+        (date(2027, 10, 17), "b"),
+    ]
+
+
+def test_upcoming_february_29(index):
+    index.set("leap", date(2004, 2, 29))
+
+    assert list(index.upcoming(date(2026, 10, 18))) == [(date(2027, 2, 28), "leap")]
+    assert list(index.upcoming(date(2027, 10, 18))) == [(date(2028, 2, 29), "leap")]
+    # Already celebrated on February 28 of a common year: the next day is a year later
+    assert list(index.upcoming(date(2027, 3, 1))) == [(date(2028, 2, 29), "leap")]
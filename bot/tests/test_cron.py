@@ -0,0 +1,59 @@
+from datetime import datetime
+
+import pytest
+import pytz
+
+from utils.cron import CronSchedule
+
+CET = pytz.timezone("CET")
+
+
+def at(*args) -> datetime:
+    return CET.localize(datetime(*args))
+
+
+def test_next_after_is_strictly_after():
+    schedule = CronSchedule("0 9 * * *", CET)
+    assert schedule.next_after(at(2026, 10, 18, 8, 59)) == at(2026, 10, 18, 9, 0)
+    assert schedule.next_after(at(2026, 10, 18, 9, 0)) == at(2026, 10, 19, 9, 0)
+
+
+def test_next_after_keeps_the_wall_clock_across_dst():
+    schedule = CronSchedule("0 9 * * *", CET)
+
+    spring = schedule.next_after(at(2026, 3, 28, 10))
+    assert (spring.date(), spring.hour, spring.utcoffset().seconds) == (at(2026, 3, 29).date(), 9, 7200)
+
+    autumn = schedule.next_after(at(2026, 10, 24, 10))
+    assert (autumn.date(), autumn.hour, autumn.utcoffset().seconds) == (at(2026, 10, 25).date(), 9, 3600)
+
+
+def test_time_skipped_by_dst_fires_once_after_the_gap():
+    # 02:30 does not exist on 2026-03-29 in CET
+    schedule = CronSchedule("30 2 * * *", CET)
+    skipped = schedule.next_after(at(2026, 3, 28, 12))
+    assert skipped.date() == at(2026, 3, 29).date() and skipped.hour == 3
+    assert schedule.next_after(skipped) == at(2026, 3, 30, 2, 30)
+
+
+def test_day_of_month_or_day_of_week():
+    # Restricting both fields fires on either: the 1st, and every Monday
+    schedule = CronSchedule("0 12 1 * mon", CET)
+    assert schedule.next_after(at(2026, 10, 18)) == at(2026, 10, 19, 12)
+    assert schedule.next_after(at(2026, 10, 27)) == at(2026, 11, 1, 12)
+
+
+def test_names_and_aliases():
+    assert CronSchedule("0 9 * * wed", CET).next_after(at(2026, 10, 18)) == at(2026, 10, 21, 9)
+    assert CronSchedule("0 0 1 jan *", CET).next_after(at(2026, 10, 18)) == at(2027, 1, 1)
+    assert CronSchedule("@weekly", CET).next_after(at(2026, 10, 18, 1)) == at(2026, 10, 25)
+    assert CronSchedule("0 9 * * 7", CET).weekdays == [0]
+
+
+@pytest.mark.parametrize(
+    "spec",
+    ["0 9 * * wedx", "0 9 * mon *", "0 9 * * jan", "0 9 jan * *", "0 1234 * * *", "60 * * * *", "0 9 * *"],
+)
+def test_invalid_specs_are_rejected(spec):
+    with pytest.raises(ValueError):
+        CronSchedule(spec, CET)
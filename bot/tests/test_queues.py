@@ -0,0 +1,130 @@
+import asyncio
+import time
+
+import pytest
+from telegram.error import RetryAfter
+
+from utils import outbound_queue
+from utils.outbound_queue import BROADCAST, OutboundQueue
+from utils.work_queue import WorkQueue
+
+
+@pytest.fixture
+def work_queue():
+    WorkQueue._instance = None
+    yield WorkQueue()
+    WorkQueue._instance = None
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    # One request per chat at once and a new one every 50 ms, so the tests run fast
+    monkeypatch.setattr(outbound_queue, "CHAT_RATE", 20.0)
+    monkeypatch.setattr(outbound_queue, "CHAT_BURST", 1)
+    OutboundQueue._instance = None
+    yield OutboundQueue()
+    OutboundQueue._instance = None
+
+
+def test_jobs_of_a_key_run_in_order_and_survive_errors(work_queue):
+    async def run():
+        done, errors = [], []
+
+        async def job(name, delay):
+            await asyncio.sleep(delay)
+            if name == "a2":
+                raise RuntimeError(name)
+            done.append(name)
+
+        async def on_error(error):
+            errors.append(str(error))
+
+        for name, delay in (("a1", 0.03), ("a2", 0), ("a3", 0)):
+            work_queue.submit("a", lambda name=name, delay=delay: job(name, delay), on_error)
+        work_queue.submit("b", lambda: job("b1", 0))
+        await work_queue.drain()
+
+        # b1 does not wait for the jobs of a, and a3 runs after a2 failed
+        assert done == ["b1", "a1", "a3"]
+        assert errors == ["a2"]
+        stats = work_queue.stats()
+        assert (stats["done"], stats["failed"], stats["queued"], stats["busy_users"]) == (3, 1, 0, 0)
+
+    asyncio.run(run())
+
+
+def test_drain_cancels_jobs_past_the_timeout(work_queue):
+    async def run():
+        work_queue.submit("a", lambda: asyncio.sleep(10))
+        await work_queue.drain(timeout=0.01)
+        assert work_queue.stats()["busy_users"] == 0
+
+    asyncio.run(run())
+
+
+def send(queue, sent, name, lane=None, chat_id=1):
+    async def call():
+        sent.append(name)
+        return name
+
+    return queue.process_request(call, (), {}, "sendMessage", {"chat_id": chat_id}, lane)
+
+
+def test_interactive_requests_go_ahead_of_broadcasts_of_the_chat(queue):
+    async def run():
+        await queue.initialize()
+        sent = []
+        broadcasts = [asyncio.create_task(send(queue, sent, f"b{i}", BROADCAST)) for i in range(1, 5)]
+        await asyncio.sleep(0.01)
+        assert sent == ["b1"]
+
+        assert await send(queue, sent, "i1") == "i1"
+        await asyncio.gather(*broadcasts)
+        assert sent == ["b1", "i1", "b2", "b3", "b4"]
+        assert queue.stats()["busy_chats"] == 0
+        await queue.shutdown()
+
+    asyncio.run(run())
+
+
+def test_chats_do_not_wait_for_each_other(queue):
+    async def run():
+        await queue.initialize()
+        sent = []
+        started = time.monotonic()
+        await asyncio.gather(*(send(queue, sent, chat_id, chat_id=chat_id) for chat_id in range(10)))
+        assert sorted(sent) == list(range(10))
+        assert time.monotonic() - started < 0.2
+        await queue.shutdown()
+
+    asyncio.run(run())
+
+
+def test_retry_after_pauses_the_chat_for_the_given_time(queue):
+    async def run():
+        await queue.initialize()
+        attempts = []
+
+        async def call():
+            attempts.append(time.monotonic())
+            if len(attempts) == 1:
+                raise RetryAfter(1)
+            return "ok"
+
+        assert await queue.process_request(call, (), {}, "sendMessage", {"chat_id": 1}, None) == "ok"
+        assert 0.95 <= attempts[1] - attempts[0] < 1.2
+        assert (queue.sent, queue.retries, queue.failed) == (1, 1, 0)
+        await queue.shutdown()
+
+    asyncio.run(run())
+
+
+def test_requests_without_a_chat_are_sent_right_away(queue):
+    async def run():
+        async def call():
+            return "ok"
+
+        # No dispatcher is running, so a queued request would never finish
+        assert await queue.process_request(call, (), {}, "answerCallbackQuery", {}, None) == "ok"
+
+    asyncio.run(run())
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from utils.session_backends import FakeRedis, RedisConnection, RedisError, RedisSessionBackend
+from utils.sessions import BirthdaySession, MathSession
+
+KEY = ("-100", "42")
+
+
+def test_put_get_and_active_category():
+    async def run():
+        backend = RedisSessionBackend(FakeRedis())
+        assert await backend.get(KEY, "math") is None
+        assert await backend.active_category(KEY) is None
+
+        await backend.put(KEY, "math", MathSession(score=3, result=7, version="a"))
+        await backend.put(KEY, "birthday", BirthdaySession(version="b"))
+        session = await backend.get(KEY, "math")
+        assert (session.score, session.result, session.version) == (3, 7, "a")
+        assert await backend.active_category(KEY) == "birthday"
+
+    asyncio.run(run())
+
+
+def test_versioned_delete_keeps_replaced_session():
+    async def run():
+        backend = RedisSessionBackend(FakeRedis())
+        await backend.put(KEY, "math", MathSession(version="new"))
+
+        assert await backend.delete(KEY, "math", version="old") is False
+        assert (await backend.get(KEY, "math")).version == "new"
+
+        assert await backend.delete(KEY, "math", version="new") is True
+        assert await backend.get(KEY, "math") is None
+        assert await backend.delete(KEY, "math") is False
+
+    asyncio.run(run())
+
+
+def test_exec_is_aborted_when_a_watched_key_changes():
+    async def run():
+        redis = FakeRedis()
+        await redis.call("HSET", "session", "math", "1")
+        await redis.call("WATCH", "session")
+        await redis.call("HSET", "session", "math", "2")
+        await redis.call("MULTI")
+        await redis.call("HDEL", "session", "math")
+        assert await redis.call("EXEC") is None
+        assert await redis.call("HGET", "session", "math") == b"2"
+
+    asyncio.run(run())
+
+
+def test_sessions_expire():
+    async def run():
+        backend = RedisSessionBackend(FakeRedis(), ttl=1)
+        await backend.put(KEY, "math", MathSession())
+        await asyncio.sleep(0.01)
+        assert await backend.get(KEY, "math") is None
+
+    asyncio.run(run())
+
+
+def test_resp_replies_are_parsed():
+    async def run():
+        connection = RedisConnection()
+        connection._reader = asyncio.StreamReader()
+        connection._reader.feed_data(
+            b"+OK\r\n:5\r\n$3\r\nabc\r\n$-1\r\n*-1\r\n*3\r\n$1\r\na\r\n-ERR wrong type\r\n:1\r\n-ERR boom\r\n"
+        )
+        assert await connection._read_reply() == "OK"
+        assert await connection._read_reply() == 5
+        assert await connection._read_reply() == b"abc"
+        assert await connection._read_reply() is None
+        assert await connection._read_reply() is None
+        reply = await connection._read_reply()
+        assert reply[0] == b"a" and isinstance(reply[1], RedisError) and reply[2] == 1
+        with pytest.raises(RedisError, match="ERR boom"):
+            await connection._read_reply()
+
+    asyncio.run(run())
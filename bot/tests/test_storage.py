@@ -0,0 +1,169 @@
+import gzip
+import json
+import os
+
+import pytest
+
+from utils.storage import ColdStore, IndexedStorage, JsonStorage, migrate_json_users
+from utils.storage import indexed_backend
+from utils.user_record import UserRecord
+
+
+def record(score: int) -> UserRecord:
+    return UserRecord("user", "User", None, score)
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / "users.jsonl"), str(tmp_path / "users.idx")
+
+
+def test_indexed_reopen_reads_the_latest_records(paths):
+    storage = IndexedStorage(*paths)
+    storage.save({"1": record(1), "2": record(2)})
+    storage.save({"1": record(10)})
+    storage.delete(["2"])
+    storage.close()
+
+    storage = IndexedStorage(*paths)
+    assert storage.get("1").math_score == 10
+    assert storage.get("2") is None
+    assert sorted(storage.index) == ["1"]
+    storage.close()
+
+
+def test_indexed_catches_up_on_lines_missing_from_the_index(paths):
+    storage = IndexedStorage(*paths)
+    storage.save({"1": record(1)})
+    storage.close()
+
+    # A crash between the write of the data file and the index leaves lines only the data file has
+    with open(paths[0], "ab") as data:
+        data.write(b'["2",[null,null,null,5,null,0,null]]\n')
+        data.write(b"not json\n")
+        data.write(b'["1",[null,null,null,7,null,0,null]]\n')
+        data.write(b'["3",[null,null')
+
+    storage = IndexedStorage(*paths)
+    assert storage.get("1").math_score == 7
+    assert storage.get("2").math_score == 5
+    assert storage.get("3") is None
+    storage.save({"3": record(3)})
+    storage.close()
+
+    # The corrupt line is skipped, the half-written one dropped, and the caught-up entries indexed
+    storage = IndexedStorage(*paths)
+    assert {user_id: r.math_score for user_id, r in storage.iter_all()} == {"1": 7, "2": 5, "3": 3}
+    storage.close()
+
+
+def test_indexed_rebuilds_an_index_of_another_generation(paths):
+    storage = IndexedStorage(*paths)
+    storage.save({"1": record(1)})
+    storage.close()
+    with open(paths[1], "w") as index_file:
+        index_file.write("# stale\n1 0 5\n")
+
+    storage = IndexedStorage(*paths)
+    assert storage.get("1").math_score == 1
+    storage.close()
+
+
+def test_indexed_compaction_keeps_live_records(paths, monkeypatch):
+    monkeypatch.setattr(indexed_backend, "COMPACT_MIN_DEAD_BYTES", 0)
+    storage = IndexedStorage(*paths)
+    for score in range(5):
+        storage.save({"1": record(score), "2": record(score + 100)})
+    storage.delete(["2"])
+    size = os.path.getsize(paths[0])
+
+    storage.maintain()
+    assert os.path.getsize(paths[0]) < size
+    assert storage.get("1").math_score == 4
+    storage.save({"4": record(4)})
+    storage.close()
+
+    storage = IndexedStorage(*paths)
+    assert {user_id: r.math_score for user_id, r in storage.iter_all()} == {"1": 4, "4": 4}
+    storage.close()
+
+
+def test_indexed_failed_compaction_keeps_the_old_files(paths, monkeypatch):
+    monkeypatch.setattr(indexed_backend, "COMPACT_MIN_DEAD_BYTES", 0)
+    storage = IndexedStorage(*paths)
+    for score in range(5):
+        storage.save({"1": record(score)})
+
+    def replace(*args):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(indexed_backend.os, "replace", replace)
+    with pytest.raises(OSError):
+        storage.maintain()
+    monkeypatch.undo()
+
+    assert storage.get("1").math_score == 4
+    storage.save({"1": record(5)})
+    storage.close()
+    storage = IndexedStorage(*paths)
+    assert storage.get("1").math_score == 5
+    storage.close()
+
+
+def test_cold_store_moves_users_in_and_out(tmp_path):
+    cold = ColdStore(str(tmp_path / "cold.json.gz"))
+    assert "1" not in cold
+    cold.move_in({"1": record(1), "2": record(2)})
+    cold.move_in({"3": record(3)}, remove=["1"])
+
+    cold = ColdStore(cold.path)
+    assert "1" not in cold and "2" in cold
+    assert cold.get("3").math_score == 3
+    assert sorted(user_id for user_id, _ in cold.iter_all()) == ["2", "3"]
+
+
+@pytest.mark.parametrize("damage", ["truncate", "corrupt"])
+def test_cold_store_refuses_to_rewrite_an_unreadable_file(tmp_path, damage):
+    path = str(tmp_path / "cold.json.gz")
+    ColdStore(path).move_in({str(user_id): record(user_id) for user_id in range(100)})
+    if damage == "truncate":
+        with open(path, "rb") as file:
+            content = file.read()[:-20]
+        with open(path, "wb") as file:
+            file.write(content)
+    else:
+        with gzip.open(path, "wt") as file:
+            file.write('{"1": [')
+    with open(path, "rb") as file:
+        before = file.read()
+
+    cold = ColdStore(path)
+    # Readers see an empty file, but nothing is written over it
+    assert cold.get("1") is None
+    with pytest.raises(OSError):
+        ColdStore(path).move_in({"100": record(100)})
+    with open(path, "rb") as file:
+        assert file.read() == before
+
+
+def test_migrate_leaves_a_corrupt_users_file_in_place(tmp_path):
+    json_path = str(tmp_path / "users.json")
+    with open(json_path, "w") as file:
+        file.write('{"1": {"username": "user"')
+    storage = JsonStorage(str(tmp_path / "store.json"))
+
+    with pytest.raises(ValueError):
+        migrate_json_users(json_path, storage)
+    assert os.path.exists(json_path)
+    assert storage.is_empty()
+
+
+def test_migrate_imports_and_renames_the_users_file(tmp_path):
+    json_path = str(tmp_path / "users.json")
+    with open(json_path, "w") as file:
+        json.dump({"1": {"username": "user", "math_score": 3}}, file)
+    storage = JsonStorage(str(tmp_path / "store.json"))
+
+    assert migrate_json_users(json_path, storage) == 1
+    assert storage.get("1").math_score == 3
+    assert os.path.exists(f"{json_path}.migrated")
@@ -3,10 +3,24 @@ The utilities(utils) package contains modules for various utility functions used
 
 Modules:
 - users_info_module: Contains functions to retrieve and save user information.
+- user_store: Contains a class holding all user information in memory.
+- user_record: Contains the compact, typed record of a single user.
+- birthday_index: Contains the index of the users' birthdays by day of the year.
+- chat_members: Contains the index of the members of the group chats the bot is in.
+- storage: Contains the JSON and SQLite backends persisting user information.
+- io_pool: Contains a bounded thread pool for running blocking I/O off the event loop.
+- outbound_queue: Contains the rate-limited queue all requests of the bot to chats go through.
+- broadcast: Contains the resumable fan-out of a message to many chats.
+- image_catalog: Contains a catalog of image files with a cache of their Telegram file IDs.
+- work_queue: Contains the per-user ordered queue of work deferred out of the update handlers.
+- router: Contains the routing table of the commands and inline button callbacks.
 - gen_equation: Contains a function to generate math equations for the math game.
 - dialog_manager: Contains a class to manage dialog interactions.
 - task_manager: Contains a class to manage asynchronous tasks.
+- cron: Contains the cron schedules of the periodic jobs run by the task manager.
 - state_manager: Contains a class to manage user states.
+- sessions: Contains the typed session classes of the math and birthday dialogs.
+- session_backends: Contains the in-memory and Redis stores behind the StateManager.
 
 Usage:
 Import specific utilities:
@@ -19,31 +33,76 @@ Or import all utilities:
 from .data_manager import (
     get_user_info,
     get_all_users_info,
+    iter_all_users_info,
     save_user_info,
     get_and_save,
+    get_user_info_async,
+    get_all_users_info_async,
+    save_user_info_async,
+    get_and_save_async,
+    get_user_record,
+    save_user_record,
+    get_user_record_async,
+    save_user_record_async,
 )
+from .user_record import UserRecord, BOT_TIMEZONE, parse_birthday, next_birthday
+from .birthday_index import BirthdayIndex
+from .chat_members import ChatMembers
+from .user_store import UserStore
+from .io_pool import run_blocking, shutdown_io_pool
+from .outbound_queue import OutboundQueue, INTERACTIVE, BROADCAST
+from .broadcast import broadcast, BroadcastReport
+from .work_queue import WorkQueue
+from .router import Router
 from .gen_equation import generate_equation
 from .dialog_manager import DialogManager
 from .task_manager import TaskManager
 from .state_manager import StateManager
-from .timer import TimerConfig, set_timer
+from .sessions import MathSession, BirthdaySession
+from .timer import TimerConfig, set_timer, restore_timer
 from .common_vars import c_vars
 
-from .tasks.percent_resetter import friend_percent_reset
 from .tasks.frog_sender import send_frog
 
 __all__ = [
     "get_user_info",
     "get_all_users_info",
+    "iter_all_users_info",
     "save_user_info",
     "get_and_save",
+    "get_user_info_async",
+    "get_all_users_info_async",
+    "save_user_info_async",
+    "get_and_save_async",
+    "get_user_record",
+    "save_user_record",
+    "get_user_record_async",
+    "save_user_record_async",
+    "UserRecord",
+    "BOT_TIMEZONE",
+    "parse_birthday",
+    "next_birthday",
+    "BirthdayIndex",
+    "ChatMembers",
+    "UserStore",
+    "run_blocking",
+    "shutdown_io_pool",
+    "OutboundQueue",
+    "INTERACTIVE",
+    "BROADCAST",
+    "broadcast",
+    "BroadcastReport",
+    "WorkQueue",
+    "Router",
     "generate_equation",
     "DialogManager",
     "TaskManager",
     "StateManager",
+    "MathSession",
+    "BirthdaySession",
     "TimerConfig",
     "set_timer",
+    "restore_timer",
     "c_vars",
-    "friend_percent_reset",
     "send_frog",
 ]
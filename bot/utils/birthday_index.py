@@ -0,0 +1,119 @@
+import calendar
+from datetime import date, timedelta
+from typing import Iterator, List, Optional, Set, Tuple
+
+from .user_store import UserStore
+
+LEAP_YEAR: int = 2000  # calendar the slots are numbered in, so February 29 has its own slot
+SLOTS: int = 366
+
+
+def slot_of(month: int, day: int) -> int:
+    """
+    Return the slot of a day of the year, 0 for January 1 to 365 for December 31.
+    """
+    return date(LEAP_YEAR, month, day).timetuple().tm_yday - 1
+
+
+class BirthdayIndex:
+    """
+    Singleton index of the users' birthdays by day of the year.
+
+    The index is a ring of 366 slots, one per (month, day) of a leap year, each holding the IDs of the
+    users born on that day. It is built once from the UserStore at startup and kept current by `set`
+    whenever a user sets their birthday, so the daily announcement reads a single slot and the upcoming
+    birthdays are found by walking the ring from today instead of sorting all users.
+
+    Attributes:
+        slots (list): Set of user IDs (str) for every slot.
+        built (bool): Whether the index has been built.
+    """
+
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super(BirthdayIndex, cls).__new__(cls, *args, **kwargs)
+            cls._instance.slots: List[Set[str]] = [set() for _ in range(SLOTS)]
+            cls._instance.built = False
+            cls._instance._slot_by_user = {}
+        return cls._instance
+
+    def build(self) -> None:
+        """
+        Fill the index from the birthdays of all users, cold users included.
+
+        This call reads the whole user base, so it is done once at startup.
+
+        Example:
+            >>> BirthdayIndex().build()
+        """
+        self.slots = [set() for _ in range(SLOTS)]
+        self._slot_by_user = {}
+        for user_id, record in UserStore().iter_all():
+            self.set(user_id, record.birthday_date)
+        self.built = True
+        print(f"Birthday index built: {len(self._slot_by_user)} birthdays")
+
+    def set(self, user_id: str, birthday: Optional[date]) -> None:
+        """
+        Move a user to the slot of their birthday.
+
+        Args:
+            user_id (str): The ID of the user.
+            birthday (date or None): The new birthday, or None to remove the user from the index.
+
+        Example:
+            >>> BirthdayIndex().set("123", date(2000, 12, 31))
+        """
+        old_slot = self._slot_by_user.pop(user_id, None)
+        if old_slot is not None:
+            self.slots[old_slot].discard(user_id)
+        if birthday:
+            slot = slot_of(birthday.month, birthday.day)
+            self.slots[slot].add(user_id)
+            self._slot_by_user[user_id] = slot
+
+    def celebrating_on(self, day: date) -> List[str]:
+        """
+        Return the users celebrating their birthday on a day.
+
+        In common years the users born on February 29 celebrate on February 28.
+
+        Args:
+            day (date): The day.
+
+        Returns:
+            list: IDs of the users.
+
+        Example:
+            >>> BirthdayIndex().celebrating_on(date.today())
+            ['123']
+        """
+        users = list(self.slots[slot_of(day.month, day.day)])
+        if (day.month, day.day) == (2, 28) and not calendar.isleap(day.year):
+            users += self.slots[slot_of(2, 29)]
+        return users
+
+    def upcoming(self, today: date) -> Iterator[Tuple[date, str]]:
+        """
+        Walk the ring once from today and yield every user with the day of their next celebration.
+
+        Args:
+            today (date): The day to start from, included.
+
+        Returns:
+            Iterator[Tuple[date, str]]: Pairs of celebration day and user ID, soonest first.
+
+        Example:
+            >>> next(BirthdayIndex().upcoming(date.today()))
+            (datetime.date(2024, 6, 5), '123')
+        """
+        seen = set()
+        for offset in range(SLOTS):
+            day = today + timedelta(days=offset)
+            for user_id in sorted(self.celebrating_on(day)):
+                # Without a February 29 on the way, the last day of the walk is today a year later
+                if user_id not in seen:
+                    seen.add(user_id)
+                    yield day, user_id
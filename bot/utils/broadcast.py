@@ -0,0 +1,157 @@
+# 3rd party
+from telegram.error import Forbidden, TelegramError
+
+# Built-in
+import os
+import time
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+# Custom
+from .io_pool import run_blocking
+from .chat_members import ChatMembers
+from .storage.json_backend import read_json, write_json_atomic
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+BROADCAST_FILE = os.getenv("BROADCAST_FILE", os.path.join(CURRENT_DIR, "..", "broadcasts.json"))
+BROADCAST_CONCURRENCY: int = 8  # chats a broadcast sends to at once
+CHECKPOINT_EVERY: int = 50  # sends between two checkpoints
+
+_checkpoints: Optional[Dict[str, dict]] = None
+_checkpoint_lock = asyncio.Lock()
+
+
+@dataclass
+class BroadcastReport:
+    """
+    Outcome of a broadcast.
+
+    Attributes:
+        name (str): The name of the broadcast.
+        total (int): Number of chats the broadcast was for.
+        delivered (int): Number of chats the message was delivered to.
+        failed (int): Number of chats the message could not be sent to.
+        blocked (int): Number of chats that blocked or removed the bot; they are dropped from ChatMembers.
+        resumed (bool): Whether an interrupted broadcast was continued.
+    """
+    name: str
+    total: int
+    delivered: int = 0
+    failed: int = 0
+    blocked: int = 0
+    resumed: bool = False
+
+
+async def broadcast(
+    name: str,
+    chat_ids: Iterable[int],
+    payload: Any,
+    send: Callable[[int, Any], Awaitable[Any]],
+    resume_within: float = 86400.0,
+    concurrency: int = BROADCAST_CONCURRENCY,
+) -> BroadcastReport:
+    """
+    Send a message to many chats with bounded concurrency, resuming an interrupted run of the same broadcast.
+
+    The chats still to do, the payload and the counts are checkpointed in BROADCAST_FILE every
+    CHECKPOINT_EVERY sends and when the broadcast is interrupted. If a checkpoint of a broadcast with
+    the same name younger than `resume_within` seconds exists, its chats and payload are used instead
+    of the given ones, so a job re-run after a restart finishes what it started. Chats that were being
+    sent to when the bot stopped are sent to again.
+
+    Args:
+        name (str): Unique name of the broadcast, e.g. the name of the job.
+        chat_ids (Iterable[int]): The chats to send to.
+        payload: JSON-serializable description of the message, handed to `send`.
+        send (Callable[[int, Any], Awaitable]): Sends the message described by the payload to a chat.
+        resume_within (float): Maximum age of a checkpoint to resume, in seconds.
+        concurrency (int): Number of chats sent to at once.
+
+    Returns:
+        BroadcastReport: The delivered, failed and blocked counts.
+
+    Example:
+        >>> await broadcast("frog", ChatMembers().group_chats(), "bl.jpg", send_image)
+    """
+    checkpoints = await _load_checkpoints()
+    checkpoint = checkpoints.get(name)
+    if checkpoint and time.time() - checkpoint["started_at"] < resume_within:
+        pending = deque(checkpoint["pending"])
+        payload = checkpoint["payload"]
+        report = BroadcastReport(name, checkpoint["total"], *checkpoint["counts"], resumed=True)
+        started_at = checkpoint["started_at"]
+        print(f"Resuming broadcast {name}: {len(pending)} of {report.total} chats left")
+    else:
+        pending = deque(dict.fromkeys(chat_ids))
+        report = BroadcastReport(name, len(pending))
+        started_at = time.time()
+
+    in_flight = set()
+    sends_since_checkpoint = 0
+
+    async def checkpoint_now() -> None:
+        checkpoints[name] = {
+            "started_at": started_at,
+            "total": report.total,
+            "counts": [report.delivered, report.failed, report.blocked],
+            "payload": payload,
+            "pending": list(in_flight) + list(pending),
+        }
+        await _save_checkpoints()
+
+    async def worker() -> None:
+        nonlocal sends_since_checkpoint
+        while pending:
+            chat_id = pending.popleft()
+            in_flight.add(chat_id)
+            try:
+                await send(chat_id, payload)
+                report.delivered += 1
+            except Forbidden as e:
+                report.blocked += 1
+                ChatMembers().remove_chat(chat_id)
+                print(f"Broadcast {name}: chat {chat_id} blocked the bot: {e}")
+            except TelegramError as e:
+                report.failed += 1
+                print(f"Broadcast {name}: sending to {chat_id} failed: {e}")
+            in_flight.discard(chat_id)
+
+            sends_since_checkpoint += 1
+            if sends_since_checkpoint >= CHECKPOINT_EVERY:
+                sends_since_checkpoint = 0
+                await checkpoint_now()
+
+    workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(pending)))]
+    try:
+        await asyncio.gather(*workers)
+    except BaseException:
+        # Interrupted (e.g. the bot is stopping): keep what is left for the next run
+        for task in workers:
+            task.cancel()
+        await asyncio.shield(checkpoint_now())
+        raise
+
+    checkpoints.pop(name, None)
+    await _save_checkpoints()
+    print(
+        f"Broadcast {name} done: {report.delivered} delivered, {report.failed} failed, "
+        f"{report.blocked} blocked of {report.total}"
+    )
+    return report
+
+
+async def _load_checkpoints() -> Dict[str, dict]:
+    global _checkpoints
+    if _checkpoints is None:
+        _checkpoints = await run_blocking(read_json, BROADCAST_FILE)
+    return _checkpoints
+
+
+async def _save_checkpoints() -> None:
+    async with _checkpoint_lock:
+        try:
+            await run_blocking(write_json_atomic, BROADCAST_FILE, _checkpoints, separators=(",", ":"))
+        except OSError as e:
+            print(f"Error writing the broadcast checkpoints: {e}")
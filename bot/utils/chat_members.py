@@ -0,0 +1,254 @@
+from typing import Dict, Iterable, List, Set
+import asyncio
+import os
+
+from telegram import Bot
+from telegram.constants import ChatMemberStatus
+from telegram.error import Forbidden, TelegramError
+
+from .io_pool import run_blocking
+from .outbound_queue import BROADCAST
+from .storage.json_backend import read_json, write_json_atomic
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+CHAT_MEMBERS_FILE = os.getenv(
+    "CHAT_MEMBERS_FILE", os.path.join(CURRENT_DIR, "..", "chat_members.json")
+)
+SAVE_INTERVAL: float = 30.0  # seconds between two writes of a changed index
+
+
+def parse_chat_ids(value: str) -> List[int]:
+    """
+    Parse a comma-separated list of chat IDs, e.g. from an environment variable.
+
+    Example:
+        >>> parse_chat_ids("-1001545165176, -4198289287")
+        [-1001545165176, -4198289287]
+    """
+    return [int(chat_id) for chat_id in value.split(",") if chat_id.strip()]
+
+
+# Chats the bot was in before the index existed; their members are looked up once
+SEED_CHAT_IDS = parse_chat_ids(os.getenv("SEED_CHAT_IDS", "-1001545165176"))
+GONE = {ChatMemberStatus.LEFT, ChatMemberStatus.BANNED}
+
+
+class ChatMembers:
+    """
+    Singleton index of the members of the group chats the bot is in.
+
+    The index is built from the traffic the bot sees: every handled update in a group adds its sender,
+    service messages and `chat_member` updates add and remove members, and `my_chat_member` updates tell
+    which chats the bot itself is in. It maps chat ID to user IDs and user ID to chat IDs, so per-chat
+    jobs (announcements, leaderboards) read their audience directly instead of scanning all users.
+
+    Members who never post are not seen that way, so `seed` asks Telegram once, per chat the bot was
+    already in (SEED_CHAT_IDS), which of the known users are its members.
+
+    The index is kept in CHAT_MEMBERS_FILE as
+    `{"chats": {chat_id: [user_id, ...]}, "seeded": [chat_id, ...]}` and written every SAVE_INTERVAL
+    seconds if it changed.
+
+    Attributes:
+        members (dict): Mapping of chat ID to the set of IDs of its known members.
+        chats (dict): Mapping of user ID to the set of IDs of the chats they are known to be in.
+        seeded (set): IDs of the chats whose members were looked up with `seed`.
+        dirty (bool): Whether the index changed since it was last written.
+    """
+
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super(ChatMembers, cls).__new__(cls, *args, **kwargs)
+            cls._instance.members: Dict[int, Set[int]] = {}
+            cls._instance.chats: Dict[int, Set[int]] = {}
+            cls._instance.seeded: Set[int] = set()
+            cls._instance.dirty = False
+        return cls._instance
+
+    def load(self, path: str = CHAT_MEMBERS_FILE) -> None:
+        """
+        Read the index from its file.
+
+        Args:
+            path (str): Path of the file.
+
+        Example:
+            >>> ChatMembers().load()
+        """
+        data = read_json(path)
+        self.members, self.chats = {}, {}
+        for chat_id, user_ids in data.get("chats", {}).items():
+            self.add_chat(int(chat_id))
+            for user_id in user_ids:
+                self.add(int(chat_id), user_id)
+        self.seeded = set(data.get("seeded", []))
+        self.dirty = False
+        print(f"Chat index loaded: {len(self.members)} chats, {len(self.chats)} users")
+
+    def add_chat(self, chat_id: int) -> None:
+        """
+        Record that the bot is in a chat.
+        """
+        if chat_id not in self.members:
+            self.members[chat_id] = set()
+            self.dirty = True
+
+    def remove_chat(self, chat_id: int) -> None:
+        """
+        Forget a chat the bot left or was removed from, with all its members.
+        """
+        for user_id in self.members.pop(chat_id, ()):
+            self._unlink(chat_id, user_id)
+        self.dirty = True
+
+    def move_chat(self, old_chat_id: int, new_chat_id: int) -> None:
+        """
+        Carry the members of a group over to the supergroup it was migrated to.
+        """
+        user_ids = self.members.get(old_chat_id, set())
+        self.remove_chat(old_chat_id)
+        self.add_chat(new_chat_id)
+        for user_id in user_ids:
+            self.add(new_chat_id, user_id)
+
+    def add(self, chat_id: int, user_id: int) -> None:
+        """
+        Record that a user is in a chat. The bot is assumed to be in it too.
+
+        Example:
+            >>> ChatMembers().add(-1001545165176, 123)
+        """
+        members = self.members.get(chat_id)
+        if members is None:
+            members = self.members[chat_id] = set()
+            self.dirty = True
+        if user_id not in members:
+            members.add(user_id)
+            self.chats.setdefault(user_id, set()).add(chat_id)
+            self.dirty = True
+
+    def remove(self, chat_id: int, user_id: int) -> None:
+        """
+        Record that a user left a chat.
+        """
+        members = self.members.get(chat_id)
+        if members and user_id in members:
+            members.discard(user_id)
+            self._unlink(chat_id, user_id)
+            self.dirty = True
+
+    def _unlink(self, chat_id: int, user_id: int) -> None:
+        chats = self.chats.get(user_id)
+        if chats is not None:
+            chats.discard(chat_id)
+            if not chats:
+                del self.chats[user_id]
+
+    def members_of(self, chat_id: int) -> Set[int]:
+        """
+        Return the IDs of the known members of a chat.
+
+        Example:
+            >>> 123 in ChatMembers().members_of(-1001545165176)
+            True
+        """
+        return self.members.get(chat_id, set())
+
+    def chats_of(self, user_id: int) -> Set[int]:
+        """
+        Return the IDs of the chats a user is known to be in.
+
+        Example:
+            >>> ChatMembers().chats_of(123)
+            {-1001545165176}
+        """
+        return self.chats.get(user_id, set())
+
+    def group_chats(self) -> List[int]:
+        """
+        Return the IDs of all group chats the bot is in.
+        """
+        return list(self.members)
+
+    async def seed(self, bot: Bot, user_ids: Iterable[int], chat_ids: Iterable[int] = SEED_CHAT_IDS) -> None:
+        """
+        Look up which known users are members of chats the bot was in before the index existed.
+
+        Every chat is seeded once: the users not yet indexed as its members are asked for with
+        getChatMember in the BROADCAST lane, and the chat is marked as seeded. A chat the bot is no
+        longer in is dropped.
+
+        Args:
+            bot (telegram.Bot): The bot asking; it has to be in the chats.
+            user_ids (Iterable[int]): The IDs of the known users, e.g. of the UserStore.
+            chat_ids (Iterable[int]): The chats to seed. Defaults to SEED_CHAT_IDS.
+
+        Example:
+            >>> await ChatMembers().seed(app.bot, user_ids)
+        """
+        user_ids = list(user_ids)
+        for chat_id in chat_ids:
+            if chat_id in self.seeded:
+                continue
+            self.add_chat(chat_id)
+            found = 0
+            for user_id in user_ids:
+                if user_id in self.members_of(chat_id):
+                    continue
+                try:
+                    member = await bot.get_chat_member(chat_id, user_id, rate_limit_args=BROADCAST)
+                except Forbidden as e:
+                    print(f"Not in chat {chat_id} any more, dropping it: {e}")
+                    self.remove_chat(chat_id)
+                    break
+                except TelegramError:
+                    # Not a user Telegram knows in this chat
+                    continue
+                if member.status not in GONE:
+                    self.add(chat_id, user_id)
+                    found += 1
+            self.seeded.add(chat_id)
+            self.dirty = True
+            print(f"Chat {chat_id} seeded: {found} members found")
+
+    async def save(self, path: str = CHAT_MEMBERS_FILE) -> None:
+        """
+        Write the index to its file on the I/O thread pool if it changed.
+
+        Example:
+            >>> await ChatMembers().save()
+        """
+        if not self.dirty:
+            return
+        self.dirty = False
+        data = {
+            "chats": {str(chat_id): sorted(user_ids) for chat_id, user_ids in self.members.items()},
+            "seeded": sorted(self.seeded),
+        }
+        try:
+            await run_blocking(write_json_atomic, path, data, separators=(",", ":"))
+        except OSError as e:
+            self.dirty = True
+            print(f"Error writing the chat index: {e}")
+
+    async def run_saver(self, interval: float = SAVE_INTERVAL) -> None:
+        """
+        Write the index periodically while it changes.
+
+        This task runs indefinitely and is meant to be started by the TaskManager.
+
+        Args:
+            interval (float): Number of seconds between two writes.
+
+        Example:
+            >>> await task_manager.add_task(ChatMembers().run_saver)
+        """
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                await self.save()
+        except asyncio.CancelledError:
+            # Cancel the task if it's cancelled
+            pass
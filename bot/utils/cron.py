@@ -0,0 +1,151 @@
+from datetime import date, datetime, timedelta
+from typing import Dict, Set
+
+ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+}
+
+# Allowed range of every field: minute, hour, day of month, month, day of week (0 = Sunday)
+FIELD_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+DAY_NAMES = {"sun": 0, "mon": 1, "tue": 2, "wed": 3, "thu": 4, "fri": 5, "sat": 6}
+MONTH_NAMES = {
+    name: number
+    for number, name in enumerate(
+        ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], 1
+    )
+}
+# Names allowed in every field: only the month and day of week fields have them
+FIELD_NAMES = ({}, {}, {}, MONTH_NAMES, DAY_NAMES)
+
+
+class CronSchedule:
+    """
+    A cron schedule, evaluated in local time of a timezone.
+
+    Accepts the five standard fields `minute hour day-of-month month day-of-week` with `*`, lists,
+    ranges, steps and English day or month names (e.g. `"0 9 * * wed"`), as well as the aliases
+    `@hourly`, `@daily`, `@weekly`, `@monthly` and `@yearly`. Like cron, a day matches if either the
+    day of month or the day of week matches when both are restricted.
+
+    Attributes:
+        spec (str): The schedule as given.
+        timezone: The pytz timezone the schedule is evaluated in.
+    """
+
+    def __init__(self, spec: str, timezone) -> None:
+        self.spec = spec
+        self.timezone = timezone
+
+        fields = ALIASES.get(spec.strip().lower(), spec).split()
+        if len(fields) != 5:
+            raise ValueError(f"A cron schedule needs 5 fields: {spec!r}")
+
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            sorted(parse_field(field, bounds, names))
+            for field, bounds, names in zip(fields, FIELD_RANGES, FIELD_NAMES)
+        )
+        # 7 is an alias for Sunday
+        self.weekdays = sorted({day % 7 for day in self.weekdays})
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    def _day_matches(self, day: date) -> bool:
+        if day.month not in self.months:
+            return False
+        in_month = day.day in self.days
+        in_week = day.isoweekday() % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return in_month and in_week
+        return in_month or in_week
+
+    def next_after(self, moment: datetime) -> datetime:
+        """
+        Return the first fire time strictly after a moment.
+
+        Args:
+            moment (datetime): A timezone-aware point in time.
+
+        Returns:
+            datetime: The next fire time, aware and in the timezone of the schedule.
+
+        Raises:
+            ValueError: If the schedule never fires (e.g. "0 0 31 2 *").
+
+        Example:
+            >>> CronSchedule("0 9 * * wed", timezone("CET")).next_after(now)
+            datetime.datetime(2024, 6, 5, 9, 0, tzinfo=<DstTzInfo 'CET' CEST+2:00:00 DST>)
+        """
+        local = moment.astimezone(self.timezone).replace(tzinfo=None, second=0, microsecond=0)
+        start = local + timedelta(minutes=1)
+
+        day = start.date()
+        # Every valid schedule fires within 8 years (Feb 29 on a given weekday)
+        for _ in range(366 * 8):
+            if self._day_matches(day):
+                for hour in self.hours:
+                    for minute in self.minutes:
+                        candidate = datetime(day.year, day.month, day.day, hour, minute)
+                        if candidate >= start:
+                            return self.timezone.normalize(self.timezone.localize(candidate))
+            day += timedelta(days=1)
+        raise ValueError(f"The cron schedule never fires: {self.spec!r}")
+
+    def __repr__(self) -> str:
+        return f"CronSchedule({self.spec!r}, {self.timezone})"
+
+
+def parse_field(field: str, bounds: tuple, names: Dict[str, int] = None) -> Set[int]:
+    """
+    Parse one field of a cron schedule into the set of values it matches.
+
+    Args:
+        field (str): The field, e.g. "*/15", "1-5" or "mon,wed".
+        bounds (tuple): The smallest and largest allowed value.
+        names (dict, optional): The names allowed in the field, e.g. DAY_NAMES.
+
+    Returns:
+        set: The matched values.
+
+    Raises:
+        ValueError: If the field is malformed or out of range.
+    """
+    low, high = bounds
+    values: Set[int] = set()
+    for part in field.lower().split(","):
+        value_range, _, step = part.partition("/")
+        if value_range == "*":
+            first, last = low, high
+        elif "-" in value_range:
+            first, last = (parse_value(value, names) for value in value_range.split("-", 1))
+        else:
+            first = last = parse_value(value_range, names)
+            if step:
+                last = high
+
+        # Day of week accepts 7 as Sunday
+        top = 7 if bounds == FIELD_RANGES[4] else high
+        if not low <= first <= last <= top:
+            raise ValueError(f"Cron field out of range: {field!r}")
+        values.update(range(first, last + 1, int(step) if step else 1))
+    return values
+
+
+def parse_value(value: str, names: Dict[str, int] = None) -> int:
+    """
+    Parse a single cron value, a number or one of the three-letter names allowed in its field.
+
+    Raises:
+        ValueError: If the value is neither a number nor an allowed name.
+    """
+    if value.isdigit():
+        return int(value)
+    if names and value in names:
+        return names[value]
+    raise ValueError(f"Invalid cron value: {value!r}")
@@ -1,14 +1,13 @@
-from typing import Dict, Any
-import json
-import os
+from typing import Dict, Any, Iterator, Tuple
 
-CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
-USER_INFO_FILE = os.path.join(CURRENT_DIR, "..", "users_info.json")
+from .io_pool import run_blocking
+from .user_record import UserRecord, today_ordinal
+from .user_store import UserStore
 
 
 def get_user_info(user) -> Dict[str, Any]:
     """
-    Retrieve user information from the JSON file or use default values if not found.
+    Retrieve user information from the user store or use default values if not found.
 
     Args:
         user: The Telegram user object.
@@ -24,47 +23,56 @@ def get_user_info(user) -> Dict[str, Any]:
             - used_today (bool): Indicates if the friend feature has been used today.
             - percentage (int): The percentage of friendship points used.
 
-    Raises:
-        IOError: If there is an error reading the file.
-        json.JSONDecodeError: If the file cannot be parsed as JSON.
-
     Example:
         >>> user_info = get_user_info(user)
     """
-    user_id = str(user.id)
+    return {str(user.id): get_user_record(user).to_info()}
+
+
+def get_user_record(user) -> UserRecord:
+    """
+    Retrieve the typed record of a user from the user store or a default record if not found.
+
+    The username and first name are taken from the Telegram user object, like in `get_user_info`.
+    The returned record is a copy; pass it to `save_user_record` to store changes. Reading the record
+    counts as activity of the user, which keeps them out of cold storage.
+
+    Args:
+        user: The Telegram user object.
 
-    try:
-        with open(USER_INFO_FILE, "r") as file:
-            file_content = file.read()
-            if file_content.strip():
-                user_data = json.loads(file_content)
-            else:
-                user_data = {}
-    except (FileNotFoundError, json.JSONDecodeError):
-        user_data = {}
+    Returns:
+        UserRecord: The record of the user.
+
+    Example:
+        >>> record = get_user_record(user)
+        >>> record.birthday_date
+        datetime.date(2000, 12, 31)
+    """
+    store = UserStore()
+    store.touch(str(user.id))
+    record = store.get(str(user.id)) or UserRecord(last_seen=today_ordinal())
+    record.username = user.username
+    record.first_name = user.first_name
+    return record
 
-    user_birthday = user_data.get(user_id, {}).get("credentials", {}).get("birthday")
-    math_score = user_data.get(user_id, {}).get("math_score", 0)
 
-    friend_info = user_data.get(user_id, {}).get("friend", {})
-    used_today = friend_info.get("used_today", False)
-    percentage = friend_info.get("percentage", 0)
+def save_user_record(user, record: UserRecord) -> None:
+    """
+    Save the typed record of a user to the user store.
 
-    default_user_info = {
-        "username": user.username,
-        "first_name": user.first_name,
-        "credentials": {"birthday": user_birthday},
-        "math_score": math_score,
-        "friend": {"used_today": used_today, "percentage": percentage},
-    }
-    user_info = {user_id: default_user_info}
+    Args:
+        user: The Telegram user object.
+        record (UserRecord): The record to save.
 
-    return user_info
+    Example:
+        >>> save_user_record(user, record)
+    """
+    UserStore().put(str(user.id), record)
 
 
 def get_all_users_info() -> Dict[str, Dict[str, Any]]:
     """
-    Retrieve user information for all users from the JSON file.
+    Retrieve user information for all users from the user store.
 
     Returns:
         dict: A dictionary containing user information with the following keys:
@@ -77,70 +85,47 @@ def get_all_users_info() -> Dict[str, Dict[str, Any]]:
             - used_today (bool): Indicates if the friend feature has been used today.
             - percentage (int): The percentage of friendship points used.
 
-    Raises:
-        IOError: If there is an error reading the file.
-        json.JSONDecodeError: If the file cannot be parsed as JSON.
-
     Example:
         >>> all_users_info = get_all_users_info()
     """
-    try:
-        with open(USER_INFO_FILE, "r") as file:
-            file_content = file.read()
-            if file_content.strip():
-                user_data = json.loads(file_content)
-            else:
-                user_data = {}
-    except (FileNotFoundError, json.JSONDecodeError):
-        user_data = {}
+    return dict(iter_all_users_info())
+
+
+def iter_all_users_info() -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Stream the user information of all users from the storage backend, one user at a time.
+
+    Background tasks walking all users should prefer this over `get_all_users_info`, since the sharded
+    backend then only holds one shard in memory at a time.
+
+    Returns:
+        Iterator[Tuple[str, dict]]: Pairs of user ID and user information (same keys as `get_user_info`).
 
-    return user_data
+    Example:
+        >>> for user_id, user_info in iter_all_users_info():
+        ...     print(user_id, user_info["math_score"])
+    """
+    for user_id, record in UserStore().iter_all():
+        yield user_id, record.to_info()
 
 
 def save_user_info(user_info: Dict[str, Any]) -> None:
     """
-    Save user information to the JSON file.
+    Save user information to the user store. The change reaches the JSON file with the next flush.
 
     Args:
         user_info: A dictionary containing user information to be saved. It should include at least the user's ID
         as the key and other relevant user data such as username, first name, and credentials.
 
-    Raises:
-        IOError: If there is an error writing to the file.
-
     Example:
         >>> save_user_info(user_info)
     """
-    existing_user_data = {}
-
-    try:
-        with open(USER_INFO_FILE, "r") as file:
-            file_content = file.read()
-            if file_content.strip():
-                existing_user_data = json.loads(file_content)
-    except FileNotFoundError:
-        print("File not found. Creating a new one.")
-    except Exception as e:
-        print(f"Error occurred while reading user data: {e}")
-
-    try:
-        for user_id, info in user_info.items():
-            if user_id in existing_user_data:
-                existing_user_data[user_id].update(info)
-            else:
-                existing_user_data[user_id] = info
-
-        with open(USER_INFO_FILE, "w") as file:
-            json.dump(existing_user_data, file, indent=4)
-    except IOError as e:
-        print(f"Error writing user data: {e}")
-    finally:
-        file.close()
+    UserStore().update(user_info)
 
 
 def get_and_save(user: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Retrieve user information and save it back to the JSON file.
+    Retrieve user information and save it back to the user store.
 
     Args:
         user: The Telegram user object.
@@ -159,6 +144,66 @@ def get_and_save(user: Dict[str, Any]) -> Dict[str, Any]:
     Example:
         >>> user_info = get_and_save(user)
     """
-    user_info = get_user_info(user)
-    save_user_info(user_info)
-    return user_info
+    record = get_user_record(user)
+    save_user_record(user, record)
+    return {str(user.id): record.to_info()}
+
+
+async def get_user_info_async(user) -> Dict[str, Any]:
+    """
+    Async variant of `get_user_info` that runs on the I/O thread pool.
+
+    Example:
+        >>> user_info = await get_user_info_async(user)
+    """
+    return await run_blocking(get_user_info, user)
+
+
+async def get_user_record_async(user) -> UserRecord:
+    """
+    Async variant of `get_user_record` that runs on the I/O thread pool.
+
+    Example:
+        >>> record = await get_user_record_async(user)
+    """
+    return await run_blocking(get_user_record, user)
+
+
+async def save_user_record_async(user, record: UserRecord) -> None:
+    """
+    Async variant of `save_user_record` that runs on the I/O thread pool.
+
+    Example:
+        >>> await save_user_record_async(user, record)
+    """
+    await run_blocking(save_user_record, user, record)
+
+
+async def get_all_users_info_async() -> Dict[str, Dict[str, Any]]:
+    """
+    Async variant of `get_all_users_info` that runs on the I/O thread pool.
+
+    Example:
+        >>> all_users_info = await get_all_users_info_async()
+    """
+    return await run_blocking(get_all_users_info)
+
+
+async def save_user_info_async(user_info: Dict[str, Any]) -> None:
+    """
+    Async variant of `save_user_info` that runs on the I/O thread pool.
+
+    Example:
+        >>> await save_user_info_async(user_info)
+    """
+    await run_blocking(save_user_info, user_info)
+
+
+async def get_and_save_async(user) -> Dict[str, Any]:
+    """
+    Async variant of `get_and_save` that runs on the I/O thread pool.
+
+    Example:
+        >>> user_info = await get_and_save_async(user)
+    """
+    return await run_blocking(get_and_save, user)
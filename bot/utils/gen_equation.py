@@ -1,14 +1,17 @@
 import random
 
 
-async def generate_equation() -> tuple:
+async def generate_equation(limit: int = 99) -> tuple:
     """
     Generate a random arithmetic equation involving addition or subtraction.
 
-    This function generates two random integers between -99 and 99, and randomly chooses
+    This function generates two random integers between -limit and limit, and randomly chooses
     an operator (either "+" or "-") to create an equation. If the second number is negative,
     the operator is adjusted accordingly to ensure correct arithmetic operations.
 
+    Args:
+        limit (int): The largest absolute value of an operand. Defaults to 99.
+
     Returns:
         tuple: A tuple containing four elements:
         - num1 (int): The first operand.
@@ -20,8 +23,8 @@ async def generate_equation() -> tuple:
         >>> await generate_equation()
         (23, 45, '+', 68)
     """
-    num1 = random.randint(-99, 99)
-    num2 = random.randint(-99, 99)
+    num1 = random.randint(-limit, limit)
+    num2 = random.randint(-limit, limit)
     operator = random.choice(["+", "-"])
 
     if num2 < 0:
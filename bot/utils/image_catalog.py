@@ -0,0 +1,186 @@
+# 3rd party
+from telegram import Bot, Message
+from telegram.error import BadRequest
+
+# Built-in
+import os
+import random
+import asyncio
+import hashlib
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Custom
+from .io_pool import run_blocking
+from .storage.json_backend import read_json, write_json_atomic
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+IMAGE_CACHE_FILE = os.getenv("IMAGE_CACHE_FILE", os.path.join(CURRENT_DIR, "..", "image_cache.json"))
+IMAGE_SUFFIXES = {".jpg", ".png", ".gif"}
+HASH_CHUNK: int = 1 << 20  # bytes read at once while hashing an image
+
+
+class ImageCatalog:
+    """
+    Catalog of the images in a folder with a cache of their Telegram file IDs.
+
+    The folder is listed once and listed again only when its modification time changes. Every image is
+    identified by the SHA-256 of its content, hashed once per version of the file. The file ID Telegram
+    returns for the first upload of an image is kept by hash, so later sends reference it instead of
+    uploading the bytes again, even after a restart or a rename. The hashes and file IDs are kept in
+    IMAGE_CACHE_FILE as `{"files": {name: [mtime_ns, size, hash]}, "file_ids": {hash: file_id}}`.
+    Concurrent sends of an image that has no file ID yet wait for the first upload and then use its file
+    ID, so the bytes are uploaded once even when a broadcast sends to several chats at a time.
+
+    All file system access runs on the I/O thread pool.
+
+    Attributes:
+        folder (str): Path of the folder.
+        cache_path (str): Path of the cache file.
+        images (list): The image files found on the last listing.
+        file_ids (dict): Telegram file ID by content hash.
+    """
+
+    def __init__(self, folder: str, cache_path: str = IMAGE_CACHE_FILE) -> None:
+        self.folder = folder
+        self.cache_path = cache_path
+        self.images: List[Path] = []
+        self.file_ids: Dict[str, str] = {}
+        self._files: Dict[str, list] = {}
+        self._listed_mtime: Optional[int] = None
+        self._cache_loaded = False
+        self._uploads: Dict[str, asyncio.Lock] = {}
+
+    async def refresh(self) -> List[Path]:
+        """
+        List the folder again if it changed since the last listing.
+
+        Returns:
+            list: The image files in the folder.
+
+        Example:
+            >>> await ImageCatalog("img").refresh()
+            [PosixPath('img/bl.jpg')]
+        """
+        if not self._cache_loaded:
+            cache = await run_blocking(read_json, self.cache_path)
+            self._files = cache.get("files", {})
+            self.file_ids = cache.get("file_ids", {})
+            self._cache_loaded = True
+
+        try:
+            mtime = (await run_blocking(os.stat, self.folder)).st_mtime_ns
+        except OSError:
+            self.images, self._listed_mtime = [], None
+            return self.images
+        if mtime != self._listed_mtime:
+            self.images = await run_blocking(list_images, self.folder)
+            self._listed_mtime = mtime
+            names = {image.name for image in self.images}
+            self._files = {name: known for name, known in self._files.items() if name in names}
+            print(f"Image catalog of {self.folder}: {len(self.images)} images")
+        return self.images
+
+    async def pick(self) -> Optional[Path]:
+        """
+        Return a random image of the folder, or None if it has none.
+        """
+        images = await self.refresh()
+        return random.choice(images) if images else None
+
+    async def _hash_of(self, path: Path) -> str:
+        stat = await run_blocking(path.stat)
+        known = self._files.get(path.name)
+        if known and known[:2] == [stat.st_mtime_ns, stat.st_size]:
+            return known[2]
+        digest = await run_blocking(hash_file, path)
+        self._files[path.name] = [stat.st_mtime_ns, stat.st_size, digest]
+        return digest
+
+    async def send(self, bot: Bot, chat_id: int, path: Path, **send_kwargs) -> Message:
+        """
+        Send an image as a photo, by its cached file ID if it was uploaded before.
+
+        Args:
+            bot (telegram.Bot): The bot sending the photo.
+            chat_id (int): The ID of the chat.
+            path (Path): The image file.
+            **send_kwargs: Extra arguments for send_photo, e.g. `rate_limit_args`.
+
+        Returns:
+            telegram.Message: The sent message.
+
+        Raises:
+            telegram.error.TelegramError: If Telegram refuses the photo.
+
+        Example:
+            >>> await catalog.send(bot, chat_id, await catalog.pick())
+        """
+        digest = await self._hash_of(path)
+        message = await self._send_cached(bot, chat_id, path, digest, send_kwargs)
+        if message is not None:
+            return message
+
+        lock = self._uploads.setdefault(digest, asyncio.Lock())
+        async with lock:
+            # Another send may have uploaded the image while this one waited
+            message = await self._send_cached(bot, chat_id, path, digest, send_kwargs)
+            if message is not None:
+                return message
+            photo = await run_blocking(path.read_bytes)
+            message = await bot.send_photo(
+                chat_id=chat_id, photo=photo, filename=path.name, **send_kwargs
+            )
+            self.file_ids[digest] = message.photo[-1].file_id
+        await self._save()
+        return message
+
+    async def _send_cached(
+        self, bot: Bot, chat_id: int, path: Path, digest: str, send_kwargs: dict
+    ) -> Optional[Message]:
+        file_id = self.file_ids.get(digest)
+        if not file_id:
+            return None
+        try:
+            return await bot.send_photo(chat_id=chat_id, photo=file_id, **send_kwargs)
+        except BadRequest as e:
+            # File IDs belong to one bot; a new token invalidates them
+            print(f"Cached file ID of '{path.name}' rejected, uploading again: {e}")
+            if self.file_ids.get(digest) == file_id:
+                del self.file_ids[digest]
+            return None
+
+    async def _save(self) -> None:
+        data = {"files": self._files, "file_ids": self.file_ids}
+        try:
+            await run_blocking(write_json_atomic, self.cache_path, data, indent=4)
+        except OSError as e:
+            print(f"Error writing the image cache: {e}")
+
+
+def list_images(image_folder: str) -> List[Path]:
+    """
+    List the image files in a folder.
+
+    Args:
+        image_folder (str): Path of the folder.
+
+    Returns:
+        list: Paths of the .jpg, .png and .gif files in the folder.
+    """
+    return [
+        f
+        for f in Path(image_folder).iterdir()
+        if f.is_file() and f.suffix.lower() in IMAGE_SUFFIXES
+    ]
+
+
+def hash_file(path: Path) -> str:
+    """
+    Return the SHA-256 of the content of a file as a hex string, read in chunks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
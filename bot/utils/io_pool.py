@@ -0,0 +1,39 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+import asyncio
+import functools
+
+IO_WORKERS: int = 4  # maximum number of threads doing blocking I/O at the same time
+
+_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="io")
+
+
+async def run_blocking(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Run a blocking function on the I/O thread pool without blocking the event loop.
+
+    The pool is bounded, so a burst of slow file operations queues up instead of spawning threads.
+
+    Args:
+        func (Callable): The blocking function to run.
+        *args: Positional arguments for the function.
+        **kwargs: Keyword arguments for the function.
+
+    Returns:
+        Any: The return value of the function.
+
+    Example:
+        >>> data = await run_blocking(Path("img/bl.jpg").read_bytes)
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
+def shutdown_io_pool() -> None:
+    """
+    Wait for the running I/O jobs to finish and stop the thread pool.
+
+    Example:
+        >>> shutdown_io_pool()
+    """
+    _executor.shutdown(wait=True)
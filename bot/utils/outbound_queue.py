@@ -0,0 +1,346 @@
+# 3rd party
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+# Built-in
+import time
+import heapq
+import asyncio
+import itertools
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+INTERACTIVE: int = 0  # lane of the replies to users
+BROADCAST: int = 1  # lane of the messages sent by background jobs
+LANES = (INTERACTIVE, BROADCAST)
+
+GLOBAL_RATE: float = 30.0  # requests per second to all chats
+CHAT_RATE: float = 1.0  # requests per second to one chat
+CHAT_BURST: int = 3  # requests a quiet chat may get at once
+MAX_RETRIES: int = 3  # attempts after a RetryAfter before the error is passed on
+PRUNE_INTERVAL: float = 60.0  # seconds between two sweeps of idle chat buckets
+
+
+class TokenBucket:
+    """
+    Token bucket allowing `rate` requests per second with bursts of up to `capacity`.
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """
+        Return the number of seconds until a token is available, 0 if one is available now.
+        """
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        """
+        Use up a token.
+        """
+        self._refill(now)
+        self.tokens -= 1
+
+    def pause(self, now: float, seconds: float) -> None:
+        """
+        Empty the bucket so that the next token is only available after `seconds`.
+        """
+        self._refill(now)
+        self.tokens = 1 - seconds * self.rate
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class OutboundRequest:
+    """
+    A request to the Bot API waiting in the OutboundQueue.
+    """
+
+    __slots__ = ("chat_id", "lane", "call", "future", "enqueued", "attempts", "ticket", "queued")
+
+    def __init__(self, chat_id: Any, lane: int, call: Callable, future: asyncio.Future) -> None:
+        self.chat_id = chat_id
+        self.lane = lane
+        self.call = call
+        self.future = future
+        self.enqueued = time.monotonic()
+        self.attempts = 0
+        self.ticket = None  # of its current entry in a lane heap; older entries are stale
+        self.queued = False  # whether it is in a lane heap, i.e. scheduled but not being sent
+
+
+class OutboundQueue(BaseRateLimiter):
+    """
+    Singleton pipeline that every request of the bot to a chat goes through.
+
+    Plugged into the Application as its rate limiter, so handlers and jobs keep calling the bot as
+    before. Requests are throttled by a global token bucket (GLOBAL_RATE) and one token bucket per
+    chat (CHAT_RATE with bursts of CHAT_BURST). Requests of a chat are sent one after another, with
+    one queue per lane: the INTERACTIVE requests of a chat go ahead of its BROADCAST ones (even of a
+    broadcast request already scheduled but not sent yet), and each lane keeps the order the requests
+    were made in. Across chats, the INTERACTIVE lane goes ahead of the BROADCAST lane too.
+    A request is put in the BROADCAST lane with `rate_limit_args=BROADCAST`. If Telegram still
+    answers with RetryAfter, the chat is paused for the given time and the request is retried, up to
+    MAX_RETRIES times. Requests without a chat (e.g. answering a callback query) are sent right away.
+
+    Attributes:
+        sent (int): Number of requests sent successfully.
+        retries (int): Number of retries after a RetryAfter.
+        failed (int): Number of requests that raised an error.
+    """
+
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super(OutboundQueue, cls).__new__(cls)
+            cls._instance._reset()
+        return cls._instance
+
+    def _reset(self) -> None:
+        self.sent = 0
+        self.retries = 0
+        self.failed = 0
+        self._global = TokenBucket(GLOBAL_RATE, GLOBAL_RATE)
+        self._buckets: Dict[Any, TokenBucket] = {}
+        # Per lane, a heap of (not before, ticket, request) holding the head request of every chat
+        self._lanes: List[list] = [[] for _ in LANES]
+        # The request of every busy chat that is scheduled or being sent
+        self._heads: Dict[Any, OutboundRequest] = {}
+        # Per busy chat and lane, the requests waiting behind the head request
+        self._waiting: Dict[Any, List[Deque[OutboundRequest]]] = {}
+        self._depth = [0 for _ in LANES]
+        self._waited = [[0, 0.0, 0.0] for _ in LANES]  # dispatched requests, total and max wait
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._in_flight = set()
+
+    async def initialize(self) -> None:
+        if self._dispatcher is None:
+            self._dispatcher = asyncio.create_task(self.run_dispatcher())
+
+    async def shutdown(self) -> None:
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+        for request in self._heads.values():
+            request.future.cancel()
+        for queues in self._waiting.values():
+            for queue in queues:
+                for request in queue:
+                    request.future.cancel()
+
+    async def process_request(
+        self,
+        callback: Callable,
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[int],
+    ) -> Any:
+        chat_id = data.get("chat_id")
+        if chat_id is None:
+            return await self._call_now(callback, args, kwargs)
+
+        lane = BROADCAST if rate_limit_args == BROADCAST else INTERACTIVE
+        future = asyncio.get_running_loop().create_future()
+        request = OutboundRequest(chat_id, lane, lambda: callback(*args, **kwargs), future)
+        self._depth[lane] += 1
+
+        head = self._heads.get(chat_id)
+        if head is None:
+            # The chat is idle: its request becomes the head right away
+            self._heads[chat_id] = request
+            self._waiting[chat_id] = [deque() for _ in LANES]
+            self._schedule(request, 0.0)
+        elif lane < head.lane and head.queued:
+            # Goes ahead of a request of a later lane that is not being sent yet; its heap entry
+            # becomes stale and it is the next of its lane again
+            head.queued = False
+            self._waiting[chat_id][head.lane].appendleft(head)
+            self._heads[chat_id] = request
+            self._schedule(request, 0.0)
+        else:
+            self._waiting[chat_id][lane].append(request)
+        return await future
+
+    async def _call_now(self, callback: Callable, args: Any, kwargs: Dict[str, Any]) -> Any:
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                if attempt == MAX_RETRIES:
+                    raise
+                self.retries += 1
+                await asyncio.sleep(_seconds(e.retry_after))
+
+    def _schedule(self, request: OutboundRequest, not_before: float) -> None:
+        request.ticket = next(self._seq)
+        request.queued = True
+        heapq.heappush(self._lanes[request.lane], (not_before, request.ticket, request))
+        self._wakeup.set()
+
+    def _bucket(self, chat_id: Any) -> TokenBucket:
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._buckets[chat_id] = TokenBucket(CHAT_RATE, CHAT_BURST)
+        return bucket
+
+    def _next_ready(self, now: float) -> Optional[OutboundRequest]:
+        # The first request, by lane, whose chat may get a message now
+        for lane in self._lanes:
+            while lane and lane[0][0] <= now:
+                _, ticket, request = heapq.heappop(lane)
+                if not request.queued or request.ticket != ticket:
+                    # Superseded by a request of an earlier lane or scheduled again since
+                    continue
+                wait = self._bucket(request.chat_id).wait_time(now)
+                if wait > 0:
+                    heapq.heappush(lane, (now + wait, ticket, request))
+                    continue
+                request.queued = False
+                return request
+        return None
+
+    async def run_dispatcher(self) -> None:
+        """
+        Hand the queued requests to Telegram as fast as the buckets allow.
+
+        This task runs until the queue is shut down and is started by `initialize`.
+        """
+        last_prune = time.monotonic()
+        try:
+            while True:
+                now = time.monotonic()
+                global_wait = self._global.wait_time(now)
+                if global_wait > 0:
+                    await asyncio.sleep(global_wait)
+                    continue
+
+                request = self._next_ready(now)
+                if request is None:
+                    heads = [lane[0][0] for lane in self._lanes if lane]
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(
+                            self._wakeup.wait(), min(heads) - now if heads else None
+                        )
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                self._global.take(now)
+                self._bucket(request.chat_id).take(now)
+                task = asyncio.create_task(self._send(request))
+                self._in_flight.add(task)
+                task.add_done_callback(self._in_flight.discard)
+
+                if now - last_prune > PRUNE_INTERVAL:
+                    self._prune(now)
+                    last_prune = now
+        except asyncio.CancelledError:
+            # Cancel the task if it's cancelled
+            pass
+
+    async def _send(self, request: OutboundRequest) -> None:
+        if request.attempts == 0:
+            waited = time.monotonic() - request.enqueued
+            self._depth[request.lane] -= 1
+            stats = self._waited[request.lane]
+            stats[0] += 1
+            stats[1] += waited
+            stats[2] = max(stats[2], waited)
+        request.attempts += 1
+
+        try:
+            result = await request.call()
+        except RetryAfter as e:
+            if request.attempts <= MAX_RETRIES and not request.future.done():
+                self.retries += 1
+                seconds = _seconds(e.retry_after)
+                now = time.monotonic()
+                self._bucket(request.chat_id).pause(now, seconds)
+                print(f"Chat {request.chat_id} paused for {seconds:.0f}s by Telegram")
+                # Stays the head of its chat, so the chat keeps its order
+                self._schedule(request, now + seconds)
+                return
+            self._fail(request, e)
+        except Exception as e:
+            self._fail(request, e)
+        else:
+            self.sent += 1
+            if not request.future.done():
+                request.future.set_result(result)
+        self._advance(request.chat_id)
+
+    def _fail(self, request: OutboundRequest, error: Exception) -> None:
+        self.failed += 1
+        if not request.future.done():
+            request.future.set_exception(error)
+
+    def _advance(self, chat_id: Any) -> None:
+        # Make the next waiting request of the chat, by lane, its head, or mark the chat idle
+        for queue in self._waiting.get(chat_id, ()):
+            if queue:
+                request = self._heads[chat_id] = queue.popleft()
+                self._schedule(request, 0.0)
+                return
+        self._heads.pop(chat_id, None)
+        self._waiting.pop(chat_id, None)
+
+    def _prune(self, now: float) -> None:
+        # A full bucket of an idle chat is the same as a new one
+        for chat_id in [
+            chat_id
+            for chat_id, bucket in self._buckets.items()
+            if chat_id not in self._heads and bucket.is_full(now)
+        ]:
+            del self._buckets[chat_id]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the counters of the queue.
+
+        Returns:
+            dict: Requests sent, retried and failed, the chats with queued requests, and per lane the
+            number of queued requests and the mean and longest wait before sending in seconds.
+
+        Example:
+            >>> OutboundQueue().stats()["lanes"]["interactive"]["queued"]
+            0
+        """
+        lanes = {}
+        for name, lane in (("interactive", INTERACTIVE), ("broadcast", BROADCAST)):
+            count, total, longest = self._waited[lane]
+            lanes[name] = {
+                "queued": self._depth[lane],
+                "mean_wait": total / count if count else 0.0,
+                "max_wait": longest,
+            }
+        return {
+            "sent": self.sent,
+            "retries": self.retries,
+            "failed": self.failed,
+            "busy_chats": len(self._heads),
+            "lanes": lanes,
+        }
+
+
+def _seconds(retry_after) -> float:
+    # RetryAfter.retry_after is an int or a timedelta depending on the library settings
+    return retry_after.total_seconds() if hasattr(retry_after, "total_seconds") else float(retry_after)
@@ -0,0 +1,285 @@
+# 3rd party
+from telegram import Update
+from telegram.error import TelegramError
+from telegram.ext import Application, CallbackQueryHandler, CommandHandler, ContextTypes
+
+# Built-in
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Custom
+from .work_queue import WorkQueue
+
+Handler = Callable[[Update, ContextTypes.DEFAULT_TYPE], Awaitable[None]]
+TimingHook = Callable[[str, float, Optional[Exception]], None]
+
+ARG_SEPARATOR = ":"  # separates the route from its arguments in callback data, e.g. "/math:hard"
+SLOW_ROUTE: float = 1.0  # seconds after which a handled update is reported as slow
+
+
+@dataclass
+class Route:
+    """
+    A handler reachable by a command and/or inline button callbacks.
+
+    Attributes:
+        name (str): The name of the route, e.g. "/math".
+        handler (Callable): Coroutine function handling the update.
+        command (str): The command running the handler (without the slash), or None.
+        callbacks (tuple): The callback data keys running the handler.
+        hooks (list): Functions called with (route name, duration, error) after every handled update.
+        calls (int): Number of handled updates.
+        errors (int): Number of handled updates that raised.
+        total_time (float): Summed handling time in seconds.
+        max_time (float): Longest handling time in seconds.
+    """
+    name: str
+    handler: Handler
+    command: Optional[str] = None
+    callbacks: Tuple[str, ...] = ()
+    hooks: List[TimingHook] = field(default_factory=list)
+    calls: int = 0
+    errors: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+
+
+class Router:
+    """
+    Singleton routing table of the bot's commands and inline button callbacks.
+
+    Handlers register themselves with the `command` and `callback` decorators, so the table is the only
+    place that knows which command or button runs what. `register` adds one CommandHandler per command
+    and a single CallbackQueryHandler to the application; a callback is dispatched with one dict lookup
+    of the part of its data before the first ":". The parts after it are handed to the handler as
+    `context.args`, like the arguments of a command: the data "/math:hard" runs the "/math" route with
+    the args ["hard"].
+
+    A callback query is answered as soon as it arrives, so the client stops its spinner after one round
+    trip. Its route then runs on the WorkQueue keyed by the user, like the commands and the handlers
+    wrapped with `per_user` (the text messages): everything a user triggers runs one after another in
+    the order it arrived, so the read-modify-write of their record by a click cannot interleave with a
+    typed command or answer. The update handlers return right away and the next updates are not held
+    up by slow routes.
+
+    Every handled update is timed. The counts and times are kept per route (see `stats`), updates taking
+    longer than SLOW_ROUTE seconds are reported, and timing hooks can be added for all routes or one.
+
+    Attributes:
+        routes (dict): Mapping of route name to Route.
+        callbacks (dict): Mapping of callback data key to Route.
+        hooks (list): Timing hooks called for every route.
+    """
+
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super(Router, cls).__new__(cls, *args, **kwargs)
+            cls._instance.routes: Dict[str, Route] = {}
+            cls._instance.callbacks: Dict[str, Route] = {}
+            cls._instance.hooks: List[TimingHook] = []
+        return cls._instance
+
+    def _add(self, route: Route) -> None:
+        if route.name in self.routes:
+            raise ValueError(f"Route {route.name} is already registered")
+        for key in route.callbacks:
+            if key in self.callbacks or ARG_SEPARATOR in key:
+                raise ValueError(f"Invalid or duplicate callback key: {key}")
+        self.routes[route.name] = route
+        for key in route.callbacks:
+            self.callbacks[key] = route
+
+    @classmethod
+    def command(cls, name: str, callbacks: Tuple[str, ...] = None) -> Callable[[Handler], Handler]:
+        """
+        Register a command handler, reachable by inline buttons as well.
+
+        Args:
+            name (str): The command without the slash, e.g. "math".
+            callbacks (tuple, optional): The callback data keys running the handler. Defaults to the
+                command with its slash, e.g. ("/math",).
+
+        Returns:
+            Callable: Decorator returning the handler unchanged.
+
+        Example:
+            >>> @Router.command("math")
+            ... async def math_command(update, context): ...
+        """
+
+        def decorator(handler: Handler) -> Handler:
+            keys = (f"/{name}",) if callbacks is None else tuple(callbacks)
+            cls()._add(Route(f"/{name}", handler, command=name, callbacks=keys))
+            return handler
+
+        return decorator
+
+    @classmethod
+    def callback(cls, *keys: str) -> Callable[[Handler], Handler]:
+        """
+        Register a handler reachable only by inline buttons.
+
+        Args:
+            *keys (str): The callback data keys running the handler. The first one names the route.
+
+        Returns:
+            Callable: Decorator returning the handler unchanged.
+
+        Example:
+            >>> @Router.callback("/capabilities")
+            ... async def show_capabilities(update, context): ...
+        """
+
+        def decorator(handler: Handler) -> Handler:
+            cls()._add(Route(keys[0], handler, callbacks=keys))
+            return handler
+
+        return decorator
+
+    def add_timing_hook(self, hook: TimingHook, route: str = None) -> None:
+        """
+        Call a function with (route name, duration in seconds, error or None) after every handled update.
+
+        Args:
+            hook (Callable): The function.
+            route (str, optional): Only time this route, e.g. "/math". Defaults to all routes.
+
+        Example:
+            >>> Router().add_timing_hook(lambda name, seconds, error: print(name, seconds))
+        """
+        if route is None:
+            self.hooks.append(hook)
+        else:
+            self.routes[route].hooks.append(hook)
+
+    def register(self, app: Application) -> None:
+        """
+        Add a handler for every command and one for all callbacks to the application.
+
+        Example:
+            >>> Router().register(app)
+        """
+        for route in self.routes.values():
+            if route.command:
+                app.add_handler(CommandHandler(route.command, self._queued(route)))
+        app.add_handler(CallbackQueryHandler(self.dispatch_callback))
+
+    def _queued(self, route: Route) -> Handler:
+        async def submit(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+            self.submit(update, context, lambda: self.run(route, update, context))
+
+        return submit
+
+    def per_user(self, handler: Handler) -> Handler:
+        """
+        Wrap a handler outside the table so it runs on the WorkQueue in order with the user's routes.
+
+        Example:
+            >>> app.add_handler(MessageHandler(filters.TEXT, Router().per_user(handle_message)))
+        """
+
+        async def submit(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+            self.submit(update, context, lambda: handler(update, context))
+
+        return submit
+
+    @staticmethod
+    def submit(update: Update, context: ContextTypes.DEFAULT_TYPE, job: Callable[[], Awaitable]) -> None:
+        """
+        Queue the work of an update behind the earlier updates of the same user.
+
+        Errors of the job go to the error handlers of the application.
+        """
+
+        async def report(error: Exception) -> None:
+            await context.application.process_error(update, error)
+
+        user = update.effective_user
+        key = user.id if user else update.effective_chat.id
+        WorkQueue().submit(key, job, on_error=report)
+
+    async def run(self, route: Route, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """
+        Run the handler of a route and record its time.
+        """
+        started = time.perf_counter()
+        error = None
+        try:
+            await route.handler(update, context)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            route.calls += 1
+            route.errors += error is not None
+            route.total_time += elapsed
+            route.max_time = max(route.max_time, elapsed)
+            if elapsed > SLOW_ROUTE:
+                print(f"Slow route {route.name}: {elapsed:.2f}s")
+            for hook in self.hooks + route.hooks:
+                hook(route.name, elapsed, error)
+
+    @staticmethod
+    def parse(data: str) -> Tuple[str, List[str]]:
+        """
+        Split callback data into its key and arguments.
+
+        Example:
+            >>> Router.parse("/math:hard")
+            ('/math', ['hard'])
+        """
+        key, *args = data.split(ARG_SEPARATOR)
+        return key, args
+
+    def resolve(self, data: str) -> Tuple[Optional[Route], List[str]]:
+        """
+        Return the route of callback data and its arguments, or None if no route matches.
+        """
+        key, args = self.parse(data or "")
+        return self.callbacks.get(key), args
+
+    async def dispatch_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """
+        Answer a callback query and queue its route, with the arguments of its data as `context.args`.
+
+        The route runs on the WorkQueue behind the earlier updates of the same user; its errors go to
+        the error handlers of the application.
+
+        Example:
+            >>> app.add_handler(CallbackQueryHandler(Router().dispatch_callback))
+        """
+        query = update.callback_query
+        try:
+            await query.answer()
+        except TelegramError as e:
+            # The query is too old to be answered; the click is still handled
+            print(f"Could not answer the callback query: {e}")
+
+        route, args = self.resolve(query.data)
+        if route is None:
+            print(f"No route for callback data: {query.data}")
+            return
+        context.args = args
+        self.submit(update, context, lambda: self.run(route, update, context))
+
+    def stats(self) -> Dict[str, dict]:
+        """
+        Return the handled updates, errors and mean and longest handling time of every route.
+
+        Example:
+            >>> Router().stats()["/math"]["calls"]
+            12
+        """
+        return {
+            name: {
+                "calls": route.calls,
+                "errors": route.errors,
+                "mean_time": route.total_time / route.calls if route.calls else 0.0,
+                "max_time": route.max_time,
+            }
+            for name, route in self.routes.items()
+        }
@@ -0,0 +1,71 @@
+"""
+The session_backends package contains the stores behind the StateManager.
+
+Modules:
+- base: Contains the SessionBackend interface.
+- memory_backend: Contains a backend keeping the sessions in process memory with LRU eviction.
+- redis_backend: Contains a backend keeping the sessions on a Redis server shared by several processes.
+- resp: Contains a minimal Redis protocol client and an in-process fake server.
+
+The backend is chosen with the SESSION_BACKEND environment variable ("memory" by default, "redis" or
+"fakeredis"). The Redis server is set with REDIS_URL ("redis://localhost:6379/0" by default), the
+capacity of the memory backend with SESSION_CAPACITY (10000 by default). The StateManager snapshot of
+live sessions and deadlines is kept in the file set with SESSION_SNAPSHOT_FILE; processes sharing a Redis
+server need one file each.
+
+Usage:
+    from utils.session_backends import create_session_backend
+"""
+
+import os
+
+from .base import SessionBackend
+from .memory_backend import MemorySessionBackend
+from .redis_backend import RedisSessionBackend
+from .resp import RedisConnection, FakeRedis, RedisError
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(CURRENT_DIR, "..", "..")
+SESSION_SNAPSHOT_FILE = os.getenv(
+    "SESSION_SNAPSHOT_FILE", os.path.join(DATA_DIR, "sessions_snapshot.json")
+)
+
+
+def create_session_backend(kind: str = None) -> SessionBackend:
+    """
+    Create the session backend configured for the bot.
+
+    Args:
+        kind (str, optional): "memory", "redis" or "fakeredis". Defaults to the SESSION_BACKEND
+            environment variable.
+
+    Returns:
+        SessionBackend: The configured backend.
+
+    Raises:
+        ValueError: If the backend kind is unknown.
+
+    Example:
+        >>> backend = create_session_backend("redis")
+    """
+    kind = (kind or os.getenv("SESSION_BACKEND", "memory")).lower()
+
+    if kind == "memory":
+        return MemorySessionBackend(int(os.getenv("SESSION_CAPACITY", "10000")))
+    if kind == "redis":
+        return RedisSessionBackend(RedisConnection(os.getenv("REDIS_URL", "redis://localhost:6379/0")))
+    if kind == "fakeredis":
+        return RedisSessionBackend(FakeRedis())
+    raise ValueError(f"Unknown session backend: {kind}")
+
+
+__all__ = [
+    "SessionBackend",
+    "MemorySessionBackend",
+    "RedisSessionBackend",
+    "RedisConnection",
+    "FakeRedis",
+    "RedisError",
+    "create_session_backend",
+    "SESSION_SNAPSHOT_FILE",
+]
@@ -0,0 +1,100 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..sessions import SESSION_TYPES
+
+SessionKey = Tuple[str, str]
+
+
+class SessionBackend(ABC):
+    """
+    Interface of the store behind the StateManager.
+
+    A backend holds the dialog sessions (see utils.sessions) of (chat ID, user ID) pairs, one session
+    per category and pair. Keys are passed as a tuple of two strings. All methods are coroutines, so a
+    backend can live in another process.
+    """
+
+    @abstractmethod
+    async def get(self, key: SessionKey, category: str) -> Optional[Any]:
+        """
+        Read the session of a pair in a category.
+
+        Args:
+            key (tuple): The (chat ID, user ID) pair.
+            category (str): The name of the dialog category.
+
+        Returns:
+            The session, or None if there is none.
+        """
+
+    @abstractmethod
+    async def put(self, key: SessionKey, category: str, session: Any) -> None:
+        """
+        Store the session of a pair in a category, replacing the previous one.
+
+        The stored category becomes the active one of the pair.
+
+        Args:
+            key (tuple): The (chat ID, user ID) pair.
+            category (str): The name of the dialog category.
+            session: The session to store.
+        """
+
+    @abstractmethod
+    async def delete(self, key: SessionKey, category: str, version: Optional[str] = None) -> bool:
+        """
+        Remove the session of a pair in a category.
+
+        Args:
+            key (tuple): The (chat ID, user ID) pair.
+            category (str): The name of the dialog category.
+            version (str, optional): Only remove the session if it still has this version. The check
+                and the removal happen atomically.
+
+        Returns:
+            bool: True if a session was removed.
+        """
+
+    @abstractmethod
+    async def active_category(self, key: SessionKey) -> Optional[str]:
+        """
+        Return the most recently stored category of a pair.
+
+        Args:
+            key (tuple): The (chat ID, user ID) pair.
+
+        Returns:
+            str or None: The category, or None if the pair has no session.
+        """
+
+    async def snapshot(self) -> Optional[List[list]]:
+        """
+        Return all sessions for a snapshot, if they would be lost when the bot process stops.
+
+        Returns:
+            list or None: `[chat_id, user_id, category, compact_session]` entries, oldest pair first,
+            or None if the sessions outlive the process (the default).
+        """
+        return None
+
+    async def restore(self, entries: List[list]) -> None:
+        """
+        Store the sessions of a snapshot as they are, keeping their versions.
+
+        Args:
+            entries (list): Entries as returned by `snapshot`.
+        """
+        for chat_id, user_id, category, data in entries:
+            await self.put((chat_id, user_id), category, SESSION_TYPES[category].from_compact(data))
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the counters of the backend. Empty by default.
+        """
+        return {}
+
+    async def close(self) -> None:
+        """
+        Release the resources held by the backend.
+        """
@@ -0,0 +1,83 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from .base import SessionBackend, SessionKey
+
+SESSION_CAPACITY: int = 10000  # default number of (chat, user) pairs kept
+
+
+class MemorySessionBackend(SessionBackend):
+    """
+    Session backend keeping the sessions in the memory of the bot process.
+
+    Pairs are held in LRU order; once more than `capacity` pairs have sessions, the least recently
+    used one is evicted, so abandoned sessions cannot pile up. `get` returns the stored object itself.
+
+    Attributes:
+        capacity (int): Maximum number of (chat, user) pairs kept.
+        sessions (OrderedDict): Mapping of pair to its sessions by category, least recently used first.
+        live_sessions (int): Number of sessions currently held.
+        evictions (int): Number of sessions dropped because the capacity was reached.
+    """
+
+    def __init__(self, capacity: int = SESSION_CAPACITY) -> None:
+        self.capacity = capacity
+        self.sessions: "OrderedDict[SessionKey, Dict[str, Any]]" = OrderedDict()
+        self.live_sessions = 0
+        self.evictions = 0
+
+    async def get(self, key: SessionKey, category: str) -> Optional[Any]:
+        dialogs = self.sessions.get(key)
+        if not dialogs:
+            return None
+        self.sessions.move_to_end(key)
+        return dialogs.get(category)
+
+    async def put(self, key: SessionKey, category: str, session: Any) -> None:
+        dialogs = self.sessions.get(key)
+        if dialogs is None:
+            dialogs = self.sessions[key] = {}
+            self._evict()
+        else:
+            self.sessions.move_to_end(key)
+
+        if dialogs.pop(category, None) is None:
+            self.live_sessions += 1
+        # Re-inserting keeps the dialogs in the order they were last stored
+        dialogs[category] = session
+
+    def _evict(self) -> None:
+        while len(self.sessions) > self.capacity:
+            _, dialogs = self.sessions.popitem(last=False)
+            self.live_sessions -= len(dialogs)
+            self.evictions += len(dialogs)
+
+    async def delete(self, key: SessionKey, category: str, version: Optional[str] = None) -> bool:
+        dialogs = self.sessions.get(key)
+        session = dialogs.get(category) if dialogs else None
+        if session is None or (version is not None and session.version != version):
+            return False
+
+        del dialogs[category]
+        self.live_sessions -= 1
+        if not dialogs:
+            del self.sessions[key]
+        return True
+
+    async def active_category(self, key: SessionKey) -> Optional[str]:
+        dialogs = self.sessions.get(key)
+        return next(reversed(dialogs)) if dialogs else None
+
+    async def snapshot(self) -> Optional[List[list]]:
+        return [
+            [chat_id, user_id, category, session.to_compact()]
+            for (chat_id, user_id), dialogs in self.sessions.items()
+            for category, session in dialogs.items()
+        ]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "live_sessions": self.live_sessions,
+            "pairs": len(self.sessions),
+            "evictions": self.evictions,
+        }
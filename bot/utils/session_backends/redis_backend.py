@@ -0,0 +1,84 @@
+from typing import Any, Optional
+import json
+import time
+
+from .base import SessionBackend, SessionKey
+from .resp import RedisConnection
+from ..sessions import SESSION_TYPES
+
+SESSION_TTL: int = 15 * 60 * 1000  # milliseconds a pair without updates is kept by the server
+
+
+class RedisSessionBackend(SessionBackend):
+    """
+    Session backend keeping the sessions on a Redis server, shared by all bot processes.
+
+    Every (chat, user) pair is one hash, `<prefix><chat>:<user>`, with one field per category. A field
+    holds `[stored_at_ns, [...compact session...]]`; the field stored last is the active category.
+    Stores are single atomic transactions that also refresh a server-side TTL, so the sessions of a
+    process that died vanish on their own. Conditional deletes use WATCH, so two processes can never
+    both remove the session another one has just replaced.
+
+    Attributes:
+        connection (RedisConnection): The connection to the server (or a FakeRedis).
+        prefix (str): Prefix of the keys.
+        ttl (int): Milliseconds after the last store of a pair at which the server drops it.
+    """
+
+    def __init__(
+        self, connection: RedisConnection, prefix: str = "druzhnydrug:session:", ttl: int = SESSION_TTL
+    ) -> None:
+        self.connection = connection
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def _name(self, key: SessionKey) -> str:
+        return f"{self.prefix}{key[0]}:{key[1]}"
+
+    @staticmethod
+    def _decode(category: str, raw: Optional[bytes]) -> Optional[Any]:
+        if raw is None:
+            return None
+        _, data = json.loads(raw)
+        return SESSION_TYPES[category].from_compact(data)
+
+    async def get(self, key: SessionKey, category: str) -> Optional[Any]:
+        raw = await self.connection.execute("HGET", self._name(key), category)
+        return self._decode(category, raw)
+
+    async def put(self, key: SessionKey, category: str, session: Any) -> None:
+        name = self._name(key)
+        value = json.dumps([time.time_ns(), session.to_compact()], separators=(",", ":"))
+        connection = self.connection
+        async with connection.lock:
+            await connection.call("MULTI")
+            await connection.call("HSET", name, category, value)
+            await connection.call("PEXPIRE", name, self.ttl)
+            await connection.call("EXEC")
+
+    async def delete(self, key: SessionKey, category: str, version: Optional[str] = None) -> bool:
+        name = self._name(key)
+        connection = self.connection
+        async with connection.lock:
+            if version is not None:
+                await connection.call("WATCH", name)
+                session = self._decode(category, await connection.call("HGET", name, category))
+                if session is None or session.version != version:
+                    await connection.call("UNWATCH")
+                    return False
+            await connection.call("MULTI")
+            await connection.call("HDEL", name, category)
+            result = await connection.call("EXEC")
+        # EXEC returns None if the session changed after WATCH
+        return bool(result and result[0])
+
+    async def active_category(self, key: SessionKey) -> Optional[str]:
+        items = await self.connection.execute("HGETALL", self._name(key))
+        if not items:
+            return None
+        fields = zip(items[::2], items[1::2])
+        category, _ = max(fields, key=lambda field: json.loads(field[1])[0])
+        return category.decode()
+
+    async def close(self) -> None:
+        await self.connection.close()
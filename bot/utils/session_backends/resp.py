@@ -0,0 +1,234 @@
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+import asyncio
+import time
+
+
+class RedisError(Exception):
+    """
+    Error reply of a Redis server.
+    """
+
+
+class RedisConnection:
+    """
+    Minimal asyncio client speaking the Redis protocol (RESP) over a single connection.
+
+    The connection is opened on the first command and reopened after it was lost. Commands are sent one
+    at a time; `execute` holds `lock` for a single command, while sequences that rely on connection state
+    (WATCH ... MULTI ... EXEC) hold `lock` themselves and send their commands with `call`.
+
+    Attributes:
+        host (str): Host of the server.
+        port (int): Port of the server.
+        db (int): Number of the database to select.
+        password (str): Password to authenticate with, or None.
+        lock (asyncio.Lock): Lock serializing the use of the connection.
+    """
+
+    def __init__(self, url: str = "redis://localhost:6379/0") -> None:
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.password = parsed.password
+        self.lock = asyncio.Lock()
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def _connect(self) -> None:
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        if self.password:
+            await self._send("AUTH", self.password)
+        if self.db:
+            await self._send("SELECT", self.db)
+
+    async def _send(self, *args) -> Any:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self._writer.write(b"".join(parts))
+        await self._writer.drain()
+        return await self._read_reply()
+
+    async def _read_reply(self, nested: bool = False) -> Any:
+        line = await self._reader.readuntil(b"\r\n")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            error = RedisError(rest.decode())
+            # An error inside an array (e.g. from EXEC) must not leave the rest of the array unread
+            if nested:
+                return error
+            raise error
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            return (await self._reader.readexactly(length + 2))[:-2]
+        if kind == b"*":
+            length = int(rest)
+            if length < 0:
+                return None
+            return [await self._read_reply(nested=True) for _ in range(length)]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+    async def call(self, *args) -> Any:
+        """
+        Send one command without taking the lock and return its reply.
+
+        Args:
+            *args: The command and its arguments, e.g. `"HGET", "key", "field"`.
+
+        Returns:
+            The decoded reply: str for status replies, int, bytes or None for bulk strings, or a list.
+
+        Raises:
+            RedisError: If the server replies with an error.
+            ConnectionError: If the connection to the server fails.
+        """
+        try:
+            if self._writer is None:
+                await self._connect()
+            return await self._send(*args)
+        except (OSError, asyncio.IncompleteReadError) as e:
+            await self.close()
+            raise ConnectionError(f"Redis connection failed: {e}") from e
+
+    async def execute(self, *args) -> Any:
+        """
+        Send one command and return its reply, see `call`.
+
+        Example:
+            >>> await connection.execute("HGET", "key", "field")
+            b'value'
+        """
+        async with self.lock:
+            return await self.call(*args)
+
+    async def close(self) -> None:
+        """
+        Close the connection. The next command opens a new one.
+        """
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
+
+
+class FakeRedis(RedisConnection):
+    """
+    In-process stand-in for a Redis server, for tests and single-process runs.
+
+    It answers the commands used by the session backend (strings, hashes, PEXPIRE/PTTL, WATCH, MULTI,
+    EXEC and DISCARD) like a server would, including key expiry. Several backends sharing one FakeRedis
+    behave like several bot processes sharing one server. The connection state (WATCH and MULTI) is
+    kept per FakeRedis, like it is per connection on a real server.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.data: Dict[bytes, Any] = {}
+        self.expires: Dict[bytes, float] = {}
+        self._modified: Dict[bytes, int] = {}
+        self._watched: Dict[bytes, int] = {}
+        self._queued: Optional[List[Tuple]] = None
+
+    async def call(self, *args) -> Any:
+        command = str(args[0]).upper()
+        args = [arg if isinstance(arg, bytes) else str(arg).encode() for arg in args[1:]]
+
+        if command == "MULTI":
+            self._queued = []
+            return "OK"
+        if command == "DISCARD":
+            self._queued = None
+            self._watched = {}
+            return "OK"
+        if command == "EXEC":
+            queued, self._queued = self._queued, None
+            watched, self._watched = self._watched, {}
+            if any(self._modified.get(key, 0) != count for key, count in watched.items()):
+                return None
+            return [self._run(*queued_command) for queued_command in queued]
+        if command == "WATCH":
+            for key in args:
+                self._expire(key)
+                self._watched[key] = self._modified.get(key, 0)
+            return "OK"
+        if command == "UNWATCH":
+            self._watched = {}
+            return "OK"
+        if self._queued is not None:
+            self._queued.append((command, *args))
+            return "QUEUED"
+        result = self._run(command, *args)
+        if isinstance(result, RedisError):
+            raise result
+        return result
+
+    def _expire(self, key: bytes) -> None:
+        deadline = self.expires.get(key)
+        if deadline is not None and deadline <= time.monotonic():
+            self._delete(key)
+
+    def _delete(self, key: bytes) -> bool:
+        self.expires.pop(key, None)
+        if self.data.pop(key, None) is None:
+            return False
+        self._touch(key)
+        return True
+
+    def _touch(self, key: bytes) -> None:
+        self._modified[key] = self._modified.get(key, 0) + 1
+
+    def _run(self, command: str, *args: bytes) -> Any:
+        for key in args[:1]:
+            self._expire(key)
+
+        if command == "PING":
+            return "PONG"
+        if command == "GET":
+            return self.data.get(args[0])
+        if command == "SET":
+            self.data[args[0]] = args[1]
+            self.expires.pop(args[0], None)
+            self._touch(args[0])
+            return "OK"
+        if command == "DEL":
+            return sum(self._delete(key) for key in args)
+        if command == "HGET":
+            return self.data.get(args[0], {}).get(args[1])
+        if command == "HGETALL":
+            return [item for pair in self.data.get(args[0], {}).items() for item in pair]
+        if command == "HSET":
+            fields = self.data.setdefault(args[0], {})
+            added = sum(field not in fields for field in args[1::2])
+            fields.update(zip(args[1::2], args[2::2]))
+            self._touch(args[0])
+            return added
+        if command == "HDEL":
+            fields = self.data.get(args[0], {})
+            removed = sum(fields.pop(field, None) is not None for field in args[1:])
+            if removed:
+                self._touch(args[0])
+            if args[0] in self.data and not fields:
+                self._delete(args[0])
+            return removed
+        if command == "PEXPIRE":
+            if args[0] not in self.data:
+                return 0
+            self.expires[args[0]] = time.monotonic() + int(args[1]) / 1000
+            return 1
+        if command == "PTTL":
+            if args[0] not in self.data:
+                return -2
+            deadline = self.expires.get(args[0])
+            return -1 if deadline is None else int((deadline - time.monotonic()) * 1000)
+        return RedisError(f"ERR unknown command '{command}'")
+
+    async def close(self) -> None:
+        pass
@@ -0,0 +1,89 @@
+from typing import Any, Dict, Optional
+
+
+class MathSession:
+    """
+    State of a running math game of a user in a chat.
+
+    Attributes:
+        action (str): "answering" while the bot waits for an answer, "done" once it was answered correctly.
+        score (int): Number of correct answers in a row in this game.
+        result (int): The correct answer to the current equation, or None before the first question.
+        version (str): Token set by the StateManager on every store, used to detect replaced sessions.
+        message_id (int): The game message, edited with every new question, or None before it is sent.
+        level (str): The difficulty of the game, "normal" or "hard".
+    """
+
+    # New fields go last, so compact lists written before they existed stay readable
+    __slots__ = ("action", "score", "result", "version", "message_id", "level")
+
+    def __init__(
+        self,
+        action: str = "answering",
+        score: int = 0,
+        result: Optional[int] = None,
+        version: Optional[str] = None,
+        message_id: Optional[int] = None,
+        level: str = "normal",
+    ) -> None:
+        self.action = action
+        self.score = score
+        self.result = result
+        self.version = version
+        self.message_id = message_id
+        self.level = level
+
+    def to_compact(self) -> list:
+        """
+        Return the session as a short list in slot order, for session backends that serialize.
+        """
+        return [getattr(self, name) for name in self.__slots__]
+
+    @classmethod
+    def from_compact(cls, data: list) -> "MathSession":
+        """
+        Build a session from the list returned by `to_compact`.
+        """
+        return cls(*data)
+
+    def __repr__(self) -> str:
+        return f"MathSession(action={self.action!r}, score={self.score}, result={self.result})"
+
+
+class BirthdaySession:
+    """
+    State of a user entering their birthday in a chat.
+
+    Attributes:
+        action (str): "setting" while the bot waits for the date.
+        version (str): Token set by the StateManager on every store, used to detect replaced sessions.
+    """
+
+    __slots__ = ("action", "version")
+
+    def __init__(self, action: str = "setting", version: Optional[str] = None) -> None:
+        self.action = action
+        self.version = version
+
+    def to_compact(self) -> list:
+        """
+        Return the session as a short list in slot order, for session backends that serialize.
+        """
+        return [getattr(self, name) for name in self.__slots__]
+
+    @classmethod
+    def from_compact(cls, data: list) -> "BirthdaySession":
+        """
+        Build a session from the list returned by `to_compact`.
+        """
+        return cls(*data)
+
+    def __repr__(self) -> str:
+        return f"BirthdaySession(action={self.action!r})"
+
+
+# Session class of every dialog category
+SESSION_TYPES: Dict[str, Any] = {
+    "math": MathSession,
+    "birthday": BirthdaySession,
+}
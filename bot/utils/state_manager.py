@@ -1,67 +1,407 @@
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
 import asyncio
+import heapq
+import itertools
+import time
+import uuid
+import zlib
+
+from .io_pool import run_blocking
+from .session_backends import SessionBackend, create_session_backend, SESSION_SNAPSHOT_FILE
+from .storage.json_backend import read_json, write_json_atomic
+
+LOCK_STRIPES: int = 64  # number of locks the sessions are spread over
+SNAPSHOT_INTERVAL: float = 30.0  # seconds between two snapshots of the live sessions
+EXPIRY_CONCURRENCY: int = 16  # expiry callbacks running at the same time
+
+SessionKey = Tuple[str, str]
 
 
 class StateManager:
     """
-    Singleton class to manage state information for various operations.
-    Uses asyncio locks for thread-safe access to state data.
+    Singleton class to manage the dialog sessions (math games, birthday prompts) of users.
+
+    Sessions are typed objects (see utils.sessions) stored per (chat ID, user ID) pair, so a user can
+    play in several chats at once. They live in a pluggable SessionBackend: in process memory by default,
+    or on a Redis server shared by several bot processes (see utils.session_backends). A session read
+    with `get_state` may be a copy, so changes have to be stored back with `set_state`. Every store gives
+    the session a new version, which tells a pending deadline whether its session was replaced since.
+
+    Access is guarded by a fixed set of striped asyncio locks instead of one global lock: a pair always
+    maps to the same stripe, so updates of different users rarely wait on each other.
+
+    A session can carry a deadline (see `expire_after`). All deadlines of this process live in one heap
+    that the expiry loop (`run_expiry`) sleeps on, so a pending timeout costs a heap entry instead of a
+    sleeping task. Re-arming or removing a session leaves its old heap entry behind; it is skipped when
+    it comes due.
+
+    The sessions that would be lost with the process (those of the memory backend) and the remaining time
+    of every deadline are written to a snapshot every SNAPSHOT_INTERVAL seconds and on shutdown. At startup
+    `restore_snapshot` puts them back and re-arms the deadlines, minus the time the bot was down.
+
+    Attributes:
+        backend (SessionBackend): The store holding the sessions.
+        expirations (int): Number of sessions whose deadline fired in this process.
     """
 
     _instance = None
-    _lock = asyncio.Lock()
+    _locks = [asyncio.Lock() for _ in range(LOCK_STRIPES)]
 
     def __new__(cls, *args, **kwargs):
         if not cls._instance:
             cls._instance = super(StateManager, cls).__new__(cls, *args, **kwargs)
-            cls._instance.state = {}
+            cls._instance.backend = create_session_backend()
+            cls._instance.expirations = 0
+            cls._instance._deadlines = {}
+            cls._instance._expiry_heap = []
+            cls._instance._expiry_order = itertools.count()
+            cls._instance._expiry_changed = asyncio.Event()
+            cls._instance._expiry_slots = asyncio.Semaphore(EXPIRY_CONCURRENCY)
+            cls._instance._expiring = set()
         return cls._instance
 
+    def use_backend(self, backend: SessionBackend) -> None:
+        """
+        Replace the session backend, e.g. with a MemorySessionBackend or a FakeRedis in tests.
+
+        Args:
+            backend (SessionBackend): The backend to use from now on.
+
+        Example:
+            >>> StateManager().use_backend(RedisSessionBackend(FakeRedis()))
+        """
+        self.backend = backend
+
+    @staticmethod
+    def _key(chat_id: int, user_id: int) -> SessionKey:
+        return str(chat_id), str(user_id)
+
+    @classmethod
+    def lock_for(cls, chat_id: int, user_id: int) -> asyncio.Lock:
+        """
+        Return the lock guarding the sessions of a user in a chat.
+
+        Callers reading a session, awaiting something and writing it back can hold this lock to keep
+        other updates of the same pair in this process out in between.
+
+        Args:
+            chat_id (int): The ID of the chat.
+            user_id (int): The ID of the user.
+
+        Returns:
+            asyncio.Lock: The lock of the stripe the pair belongs to.
+
+        Example:
+            >>> async with StateManager.lock_for(456, 123):
+            ...     ...
+        """
+        return cls._locks[zlib.crc32(f"{chat_id}:{user_id}".encode()) % LOCK_STRIPES]
+
+    @classmethod
+    async def active_category(cls, chat_id: int, user_id: int) -> Optional[str]:
+        """
+        Return the category of the dialog a user is currently in within a chat.
+
+        Args:
+            chat_id (int): The ID of the chat.
+            user_id (int): The ID of the user.
+
+        Returns:
+            str or None: The most recently stored category, or None if the user is in no dialog there.
+
+        Example:
+            >>> await StateManager.active_category(456, 123)
+            'math'
+        """
+        return await cls().backend.active_category(cls._key(chat_id, user_id))
+
+    @classmethod
+    async def get_state(cls, category: str, chat_id: int, user_id: int) -> Optional[Any]:
+        """
+        Get the session of a user in a chat for a specific category.
+
+        Args:
+            category (str): The name of the state category.
+            chat_id (int): The ID of the chat.
+            user_id (int): The ID of the user.
+
+        Returns:
+            The session (e.g. MathSession), or None if there is none.
+
+        Example:
+            >>> await StateManager.get_state('math', 456, 123)
+            MathSession(action='answering', score=3, result=42)
+        """
+        async with cls.lock_for(chat_id, user_id):
+            return await cls().backend.get(cls._key(chat_id, user_id), category)
+
     @classmethod
-    async def get_state(cls, category: str, user_id: str) -> dict:
+    async def set_state(cls, category: str, chat_id: int, user_id: int, session: Any) -> None:
         """
-        Set or update the state for a specific user in a specific category.
+        Store the session of a user in a chat for a specific category, replacing the previous one.
 
         Args:
             category (str): The name of the state category.
-            user_id (str): The ID of the user.
-            state (dict): The state information to set or update.
+            chat_id (int): The ID of the chat.
+            user_id (int): The ID of the user.
+            session: The session object to store, e.g. a MathSession. Its version is renewed.
 
         Example:
-            >>> await StateManager.set_state('math', 'user1', {'score': 100})
+            >>> await StateManager.set_state('math', 456, 123, MathSession(result=42))
         """
-        async with cls._lock:
-            return cls._instance.state.get(category, {}).get(user_id, {})
+        async with cls.lock_for(chat_id, user_id):
+            session.version = uuid.uuid4().hex
+            await cls().backend.put(cls._key(chat_id, user_id), category, session)
 
     @classmethod
-    async def set_state(cls, category: str, user_id: str, state: dict) -> None:
+    async def remove_state(cls, category: str, chat_id: int, user_id: int) -> None:
         """
-        Set or update the state for a specific user in a specific category.
+        Remove the session of a user in a chat for a specific category, together with its deadline.
 
         Args:
             category (str): The name of the state category.
-            user_id (str): The ID of the user.
-            state (dict): The state information to set or update.
+            chat_id (int): The ID of the chat.
+            user_id (int): The ID of the user.
 
         Example:
-            >>> await StateManager.set_state('math', 'user1', {'score': 100})
+            >>> await StateManager.remove_state('math', 456, 123)
         """
-        async with cls._lock:
-            if category not in cls._instance.state:
-                cls._instance.state[category] = {}
-            cls._instance.state[category].setdefault(user_id, {}).update(state)
+        async with cls.lock_for(chat_id, user_id):
+            manager = cls()
+            key = cls._key(chat_id, user_id)
+            manager._deadlines.pop((key, category), None)
+            await manager.backend.delete(key, category)
 
     @classmethod
-    async def remove_state(cls, category: str, user_id: str) -> None:
+    async def expire_after(
+        cls,
+        category: str,
+        chat_id: int,
+        user_id: int,
+        timeout: float,
+        on_expire: Callable[[Any], Awaitable[None]],
+        snapshot: Optional[dict] = None,
+    ) -> None:
         """
-        Remove the state for a specific user in a specific category.
+        Arm (or re-arm) the deadline of the current session of a user in a chat.
+
+        Once `timeout` seconds have passed, the expiry loop awaits `on_expire` with the session, unless
+        it was removed, replaced or re-armed in the meantime. The session is removed after the callback ran.
+
+        Only deadlines given `snapshot` data survive a restart: the data is saved with the snapshot and
+        handed to the `rebuild` function of `restore_snapshot` to get the callback back.
 
         Args:
             category (str): The name of the state category.
-            user_id (str): The ID of the user.
+            chat_id (int): The ID of the chat.
+            user_id (int): The ID of the user.
+            timeout (float): Seconds until the session expires.
+            on_expire (Callable[[Any], Awaitable[None]]): Coroutine function called with the expired session.
+            snapshot (dict, optional): JSON-serializable description of `on_expire`.
+
+        Example:
+            >>> await StateManager.expire_after('math', 456, 123, 10, time_is_up, {"prompt": "..."})
+        """
+        async with cls.lock_for(chat_id, user_id):
+            manager = cls()
+            key = cls._key(chat_id, user_id)
+            session = await manager.backend.get(key, category)
+            if session is None:
+                return
+            manager._arm((key, category), timeout, session.version, on_expire, snapshot)
+
+    def _arm(
+        self,
+        entry: Tuple[SessionKey, str],
+        timeout: float,
+        version: str,
+        on_expire: Callable[[Any], Awaitable[None]],
+        snapshot: Optional[dict],
+    ) -> None:
+        deadline = asyncio.get_running_loop().time() + timeout
+        self._deadlines[entry] = (deadline, version, on_expire, snapshot)
+
+        heap = self._expiry_heap
+        if not heap or deadline < heap[0][0]:
+            # The loop is sleeping until a later deadline
+            self._expiry_changed.set()
+        heapq.heappush(heap, (deadline, next(self._expiry_order), entry))
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the session counters of the backend and of the expiry loop.
+
+        Returns:
+            dict: The backend counters (e.g. live sessions and evictions), pending deadlines and expirations.
+
+        Example:
+            >>> StateManager().stats()
+            {'live_sessions': 2, 'pairs': 2, 'evictions': 0, 'pending_deadlines': 1, 'expirations': 5}
+        """
+        return {
+            **self.backend.stats(),
+            "pending_deadlines": len(self._deadlines),
+            "expirations": self.expirations,
+        }
+
+    async def _expire(
+        self, entry: Tuple[SessionKey, str], version: str, on_expire: Callable, _snapshot: Optional[dict]
+    ) -> None:
+        async with self._expiry_slots:
+            try:
+                await self._fire_expiry(entry, version, on_expire)
+            except Exception as e:
+                print(f"Error reading expired session {entry}: {e}")
+
+    async def _fire_expiry(self, entry: Tuple[SessionKey, str], version: str, on_expire: Callable) -> None:
+        key, category = entry
+        session = await self.backend.get(key, category)
+        if session is None or session.version != version:
+            # Removed, or replaced by this or another process
+            return
+        try:
+            await on_expire(session)
+        except Exception as e:
+            print(f"Error expiring {category} session of {key}: {e}")
+        # Unless the callback re-armed the session; a replaced session keeps its new version
+        if entry not in self._deadlines:
+            await self.backend.delete(key, category, version)
+        self.expirations += 1
+
+    async def run_expiry(self) -> None:
+        """
+        Fire the expiry callbacks of sessions whose deadline has passed.
+
+        This task runs indefinitely and is meant to be started by the TaskManager. It sleeps until the
+        earliest deadline, or until an earlier one is armed. Every callback runs as its own task, at most
+        EXPIRY_CONCURRENCY at once, so a slow callback (e.g. a message waiting on the rate limit of its
+        chat) does not hold up the other deadlines.
+
+        Example:
+            >>> await task_manager.add_task(StateManager().run_expiry)
+        """
+        loop = asyncio.get_running_loop()
+        heap = self._expiry_heap
+        try:
+            while True:
+                while heap and heap[0][0] <= loop.time():
+                    deadline, _, entry = heapq.heappop(heap)
+                    armed = self._deadlines.get(entry)
+                    if armed is None or armed[0] != deadline:
+                        # Removed or re-armed since this entry was pushed
+                        continue
+                    del self._deadlines[entry]
+                    task = asyncio.create_task(self._expire(entry, *armed[1:]))
+                    self._expiring.add(task)
+                    task.add_done_callback(self._expiring.discard)
+
+                self._expiry_changed.clear()
+                timeout = heap[0][0] - loop.time() if heap else None
+                try:
+                    await asyncio.wait_for(self._expiry_changed.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        except asyncio.CancelledError:
+            # Cancel the task if it's cancelled
+            pass
+
+    async def save_snapshot(self, path: str = SESSION_SNAPSHOT_FILE) -> None:
+        """
+        Write the live sessions and the remaining time of the deadlines to a snapshot file.
+
+        The file is written atomically on the I/O thread pool. Sessions are only included if the backend
+        would lose them (see SessionBackend.snapshot); deadlines without snapshot data are left out.
+
+        Args:
+            path (str): Path of the snapshot file.
+
+        Example:
+            >>> await StateManager().save_snapshot()
+        """
+        now = asyncio.get_running_loop().time()
+        deadlines = [
+            [*key, category, round(max(deadline - now, 0.0), 3), version, snapshot]
+            for (key, category), (deadline, version, _, snapshot) in self._deadlines.items()
+            if snapshot is not None
+        ]
+        data = {
+            "saved_at": time.time(),
+            "sessions": await self.backend.snapshot(),
+            "deadlines": deadlines,
+        }
+        try:
+            await run_blocking(write_json_atomic, path, data, separators=(",", ":"))
+        except OSError as e:
+            print(f"Error writing session snapshot: {e}")
+
+    async def restore_snapshot(
+        self,
+        rebuild: Callable[[dict], Callable[[Any], Awaitable[None]]],
+        path: str = SESSION_SNAPSHOT_FILE,
+    ) -> int:
+        """
+        Put the sessions of a snapshot back and re-arm their deadlines.
+
+        The time the bot was down counts against the deadlines, so a deadline that passed meanwhile
+        fires as soon as the expiry loop runs.
+
+        Args:
+            rebuild (Callable[[dict], Callable]): Returns the expiry callback for the snapshot data given
+                to `expire_after`.
+            path (str): Path of the snapshot file.
+
+        Returns:
+            int: Number of deadlines re-armed.
+
+        Example:
+            >>> await StateManager().restore_snapshot(lambda data: restore_timer(data, app.bot))
+        """
+        data = await run_blocking(read_json, path)
+        if not data:
+            return 0
+
+        if data.get("sessions"):
+            await self.backend.restore(data["sessions"])
+
+        downtime = max(time.time() - data["saved_at"], 0.0)
+        for chat_id, user_id, category, remaining, version, snapshot in data["deadlines"]:
+            self._arm(
+                ((chat_id, user_id), category),
+                max(remaining - downtime, 0.0),
+                version,
+                rebuild(snapshot),
+                snapshot,
+            )
+        print(
+            f"Restored {len(data.get('sessions') or [])} sessions and {len(data['deadlines'])} deadlines"
+        )
+        return len(data["deadlines"])
+
+    async def run_snapshots(self, interval: float = SNAPSHOT_INTERVAL) -> None:
+        """
+        Write a snapshot of the live sessions periodically.
+
+        This task runs indefinitely and is meant to be started by the TaskManager.
+
+        Args:
+            interval (float): Number of seconds between two snapshots.
+
+        Example:
+            >>> await task_manager.add_task(StateManager().run_snapshots)
+        """
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                await self.save_snapshot()
+        except asyncio.CancelledError:
+            # Cancel the task if it's cancelled
+            pass
+
+    async def close(self) -> None:
+        """
+        Close the session backend.
 
         Example:
-            >>> await StateManager.remove_state('math', 'user1')
+            >>> await StateManager().close()
         """
-        async with cls._lock:
-            if category in cls._instance.state:
-                cls._instance.state[category].pop(user_id, None)
+        await self.backend.close()
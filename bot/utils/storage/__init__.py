@@ -0,0 +1,100 @@
+"""
+The storage package contains the persistent backends behind the UserStore.
+
+Modules:
+- base: Contains the StorageBackend interface.
+- json_backend: Contains a backend keeping all users in a single JSON file.
+- sqlite_backend: Contains a backend keeping one indexed row per user in SQLite.
+- sharded_backend: Contains a backend spreading the users over several JSON shard files.
+- journal_backend: Contains a backend appending changes to a journal next to a JSON snapshot.
+- indexed_backend: Contains a backend with an append-only record file and an offset index.
+- migrate: Contains the one-shot migration from the JSON users file.
+- cold_store: Contains the compressed file holding users who have been inactive for a long time.
+
+The backend is chosen with the USER_STORAGE environment variable ("json" by default, "sqlite",
+"sharded", "journal" or "indexed"). The number of shards of the sharded backend is set with USER_SHARDS (16 by default).
+
+Usage:
+    from utils.storage import create_storage
+"""
+
+import os
+
+from .base import StorageBackend
+from .json_backend import JsonStorage
+from .sqlite_backend import SqliteStorage
+from .sharded_backend import ShardedJsonStorage
+from .journal_backend import JournalStorage
+from .indexed_backend import IndexedStorage
+from .migrate import migrate_json_users
+from .cold_store import ColdStore
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(CURRENT_DIR, "..", "..")
+USER_INFO_FILE = os.path.join(DATA_DIR, "users_info.json")
+USER_DB_FILE = os.path.join(DATA_DIR, "users_info.db")
+USER_SHARD_DIR = os.path.join(DATA_DIR, "users")
+USER_JOURNAL_FILE = os.path.join(DATA_DIR, "users_info.journal")
+USER_DATA_FILE = os.path.join(DATA_DIR, "users_info.dat")
+USER_INDEX_FILE = os.path.join(DATA_DIR, "users_info.idx")
+USER_COLD_FILE = os.path.join(DATA_DIR, "users_cold.json.gz")
+
+
+def create_storage(kind: str = None) -> StorageBackend:
+    """
+    Create the storage backend configured for the bot.
+
+    The journal backend uses the JSON users file as its snapshot. The first time any other backend
+    starts empty, the users from the JSON file are migrated into it.
+
+    Args:
+        kind (str, optional): "json", "sqlite", "sharded", "journal" or "indexed". Defaults to the
+            USER_STORAGE environment variable.
+
+    Returns:
+        StorageBackend: The configured backend.
+
+    Raises:
+        ValueError: If the backend kind is unknown.
+
+    Example:
+        >>> storage = create_storage("sqlite")
+    """
+    kind = (kind or os.getenv("USER_STORAGE", "json")).lower()
+
+    if kind == "json":
+        return JsonStorage(USER_INFO_FILE)
+    if kind == "journal":
+        return JournalStorage(USER_INFO_FILE, USER_JOURNAL_FILE)
+    if kind == "sqlite":
+        storage = SqliteStorage(USER_DB_FILE)
+    elif kind == "sharded":
+        storage = ShardedJsonStorage(USER_SHARD_DIR, int(os.getenv("USER_SHARDS", "16")))
+    elif kind == "indexed":
+        storage = IndexedStorage(USER_DATA_FILE, USER_INDEX_FILE)
+    else:
+        raise ValueError(f"Unknown user storage: {kind}")
+
+    if storage.is_empty():
+        migrate_json_users(USER_INFO_FILE, storage)
+    return storage
+
+
+__all__ = [
+    "StorageBackend",
+    "JsonStorage",
+    "SqliteStorage",
+    "ShardedJsonStorage",
+    "JournalStorage",
+    "IndexedStorage",
+    "ColdStore",
+    "migrate_json_users",
+    "create_storage",
+    "USER_INFO_FILE",
+    "USER_DB_FILE",
+    "USER_SHARD_DIR",
+    "USER_JOURNAL_FILE",
+    "USER_DATA_FILE",
+    "USER_INDEX_FILE",
+    "USER_COLD_FILE",
+]
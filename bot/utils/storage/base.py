@@ -0,0 +1,124 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ..user_record import UserRecord
+
+
+class StorageBackend(ABC):
+    """
+    Interface of the persistent storage behind the UserStore.
+
+    A backend stores one UserRecord per user, keyed by the user ID (str). The UserStore reads users
+    from it one at a time on a cache miss and only hands changed users to `save`.
+    """
+
+    @abstractmethod
+    def get(self, user_id: str) -> Optional[UserRecord]:
+        """
+        Read a single user.
+
+        Args:
+            user_id (str): The ID of the user.
+
+        Returns:
+            UserRecord or None: The stored record, or None if the user is unknown.
+        """
+
+    @abstractmethod
+    def save(self, users: Dict[str, UserRecord]) -> None:
+        """
+        Persist the given users, replacing their previously stored records.
+
+        Args:
+            users (dict): Mapping of user ID to the record of that user.
+
+        Raises:
+            OSError: If the data cannot be written.
+        """
+
+    @abstractmethod
+    def delete(self, user_ids: Iterable[str]) -> None:
+        """
+        Remove the given users. Unknown IDs are ignored.
+
+        Args:
+            user_ids (Iterable[str]): IDs of the users to remove.
+
+        Raises:
+            OSError: If the data cannot be written.
+        """
+
+    @abstractmethod
+    def born_on(self, month: int, day: int) -> List[str]:
+        """
+        Find the users whose birthday falls on the given day of the year.
+
+        Args:
+            month (int): Month of the birthday (1-12).
+            day (int): Day of the month of the birthday.
+
+        Returns:
+            list: IDs of the matching users.
+        """
+
+    @abstractmethod
+    def top_math_scores(self, limit: int) -> List[Tuple[str, int]]:
+        """
+        Find the users with the highest math scores.
+
+        Args:
+            limit (int): Maximum number of users to return.
+
+        Returns:
+            list: Pairs of user ID and math score, best score first.
+        """
+
+    @abstractmethod
+    def iter_all(self) -> Iterator[Tuple[str, UserRecord]]:
+        """
+        Iterate over all stored users.
+
+        Background tasks use this to walk all users; backends that can should stream the records
+        instead of materializing them all at once.
+
+        Returns:
+            Iterator[Tuple[str, UserRecord]]: Pairs of user ID and user record.
+        """
+
+    def inactive_since(self, day: int) -> Iterator[Tuple[str, UserRecord]]:
+        """
+        Iterate over the users last seen before the given day, or never seen at all.
+
+        Scans all users by default; backends with an index on last_seen should override it.
+
+        Args:
+            day (int): Ordinal of the first day that counts as active.
+
+        Returns:
+            Iterator[Tuple[str, UserRecord]]: Pairs of user ID and user record.
+        """
+        for user_id, record in self.iter_all():
+            if record.last_seen is None or record.last_seen < day:
+                yield user_id, record
+
+    def is_empty(self) -> bool:
+        """
+        Check whether the backend holds no users yet.
+
+        Returns:
+            bool: True if no user is stored.
+        """
+        return next(iter(self.iter_all()), None) is None
+
+    def maintain(self) -> None:
+        """
+        Run periodic housekeeping, like compacting a journal.
+
+        Called by the UserStore flusher after each flush. Does nothing by default.
+        """
+
+    def close(self) -> None:
+        """
+        Release the resources held by the backend.
+        """
+
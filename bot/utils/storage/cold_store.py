@@ -0,0 +1,104 @@
+from typing import Dict, Iterable, Iterator, Optional, Set, Tuple
+import gzip
+import json
+import os
+
+from .json_backend import sync_dir
+from ..user_record import UserRecord
+
+
+class ColdStore:
+    """
+    Gzip-compressed JSON file holding users who have not used the bot for a long time.
+
+    The file is only read on a cache miss. Its decoded content (the compact lists, not UserRecords) is
+    kept in memory after the first read until the next `move_in` replaces it, so later cold hits, scans
+    and misses for users that are not in the file (e.g. brand-new users) never decompress it again.
+
+    Attributes:
+        path (str): Path of the compressed file.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._ids: Optional[Set[str]] = None
+        self._data: Optional[Dict[str, list]] = None
+
+    def _read(self) -> Dict[str, list]:
+        # Readers treat an unreadable file as empty; `_read_strict` is used before rewriting it
+        try:
+            return self._read_strict()
+        except OSError as e:
+            print(f"Error occurred while reading the cold file: {e}")
+            self._ids = set()
+            return {}
+
+    def _read_strict(self) -> Dict[str, list]:
+        if self._data is not None:
+            return self._data
+        try:
+            with gzip.open(self.path, "rt") as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            data = {}
+        except (ValueError, EOFError) as e:
+            # Corrupt or truncated: rewriting the file from this would lose every cold user
+            raise OSError(f"Unreadable cold file {self.path}: {e}") from e
+        self._data, self._ids = data, set(data)
+        return data
+
+    def _write(self, data: Dict[str, list]) -> None:
+        tmp_path = f"{self.path}.tmp"
+        with gzip.open(tmp_path, "wt") as file:
+            json.dump(data, file, separators=(",", ":"))
+        with open(tmp_path, "rb") as file:
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.path)
+        sync_dir(self.path)
+        self._data, self._ids = data, set(data)
+
+    def __contains__(self, user_id: str) -> bool:
+        if self._ids is None:
+            self._read()
+        return user_id in self._ids
+
+    def get(self, user_id: str) -> Optional[UserRecord]:
+        """
+        Read a single cold user.
+
+        Args:
+            user_id (str): The ID of the user.
+
+        Returns:
+            UserRecord or None: The record, or None if the user is not in the cold file.
+        """
+        if user_id not in self:
+            return None
+        data = self._read().get(user_id)
+        return UserRecord.from_stored(data) if data is not None else None
+
+    def iter_all(self) -> Iterator[Tuple[str, UserRecord]]:
+        """
+        Iterate over all cold users.
+        """
+        for user_id, data in self._read().items():
+            yield user_id, UserRecord.from_stored(data)
+
+    def move_in(self, users: Dict[str, UserRecord], remove: Iterable[str] = ()) -> None:
+        """
+        Add users to the cold file and drop others from it, rewriting the file once.
+
+        Args:
+            users (dict): Mapping of user ID to the record to add.
+            remove (Iterable[str]): IDs of users to drop, e.g. because they became active again.
+
+        Raises:
+            OSError: If the file cannot be read or written. The file is then left untouched.
+        """
+        # A copy, so the cached content stays as on disk if the write fails
+        data = dict(self._read_strict())
+        for user_id in remove:
+            data.pop(user_id, None)
+        for user_id, record in users.items():
+            data[user_id] = record.to_compact()
+        self._write(data)
@@ -0,0 +1,256 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import heapq
+import json
+import os
+import uuid
+
+from .base import StorageBackend
+from .json_backend import sync_dir
+from ..user_record import UserRecord
+
+COMPACT_MIN_DEAD_BYTES: int = 1024 * 1024  # dead space in bytes below which no compaction happens
+
+
+class IndexedStorage(StorageBackend):
+    """
+    Storage backend with an append-only record file and a side index of record offsets.
+
+    Every save appends one line per user, `["123",[...compact record...]]`, to the data file and one
+    line `123 <offset> <length>` per user to the index file. A single user is read with one positioned
+    read of its latest line, without parsing anybody else, and only the index is kept in memory.
+    Deleting a user appends the tombstone line `["123",null]` and the index line `123 <offset> -<length>`.
+
+    When the backend opens, the index is brought up to date incrementally: lines appended to the data
+    file after the last indexed one (e.g. after a crash between the two writes) are scanned and added.
+    The first line of both files carries a generation token; if they do not match, the index is rebuilt
+    from scratch. `maintain` rewrites both files once superseded lines take up more space than live ones.
+
+    Attributes:
+        path (str): Path of the data file.
+        index_path (str): Path of the index file.
+        index (dict): Mapping of user ID to the (offset, length) of its latest line.
+    """
+
+    def __init__(self, path: str, index_path: str) -> None:
+        self.path = path
+        self.index_path = index_path
+        self.index: Dict[str, Tuple[int, int]] = {}
+        self.live_bytes = 0
+        self.generation = None
+        self._data = None
+        self._index_file = None
+        self._open()
+
+    def _open(self) -> None:
+        if not os.path.exists(self.path):
+            self._write_files({})
+            return
+
+        self._data = open(self.path, "r+b")
+        header = self._data.readline()
+        try:
+            self.generation = json.loads(header)[1]
+        except (ValueError, IndexError):
+            raise OSError(f"{self.path} is not an indexed user file")
+
+        indexed_end = self._read_index()
+        if indexed_end is None:
+            print(f"Rebuilding index {self.index_path}")
+            self.index = {}
+            self.live_bytes = 0
+            indexed_end = len(header)
+            with open(self.index_path, "w") as index_file:
+                index_file.write(f"# {self.generation}\n")
+
+        self._index_file = open(self.index_path, "a")
+        self._catch_up(indexed_end)
+
+    def _read_index(self) -> Optional[int]:
+        # Returns the end of the last indexed line, or None if the index has to be rebuilt
+        try:
+            with open(self.index_path, "r") as index_file:
+                if index_file.readline().strip() != f"# {self.generation}":
+                    return None
+                end = 0
+                for line in index_file:
+                    try:
+                        user_id, offset, length = line.split()
+                        offset, length = int(offset), int(length)
+                    except ValueError:
+                        # Half-written by a crash; appending after it would corrupt the next line
+                        return None
+                    end = max(end, offset + abs(length))
+                    if length > 0:
+                        self._set_entry(user_id, offset, length)
+                    else:
+                        self._drop_entry(user_id)
+                return end or len(self._header())
+        except FileNotFoundError:
+            return None
+
+    def _header(self) -> bytes:
+        return (json.dumps(["#", self.generation]) + "\n").encode()
+
+    def _catch_up(self, offset: int) -> None:
+        self._data.seek(offset)
+        entries = []
+        for line in self._data:
+            if not line.endswith(b"\n"):
+                # Half-written last record: drop it, so the next append starts on a clean line
+                self._data.truncate(offset)
+                break
+            try:
+                user_id, data = json.loads(line)
+            except ValueError:
+                # Corrupted but complete: skip it, it counts as dead space until the next compaction
+                print(f"Skipping corrupted user record: {line!r}")
+                offset += len(line)
+                continue
+            if data is None:
+                self._drop_entry(user_id)
+                entries.append(f"{user_id} {offset} -{len(line)}\n")
+            else:
+                self._set_entry(user_id, offset, len(line))
+                entries.append(f"{user_id} {offset} {len(line)}\n")
+            offset += len(line)
+        if entries:
+            print(f"Indexed {len(entries)} records appended after the last index update")
+            self._index_file.write("".join(entries))
+            self._index_file.flush()
+
+    def _set_entry(self, user_id: str, offset: int, length: int) -> None:
+        previous = self.index.get(user_id)
+        if previous:
+            self.live_bytes -= previous[1]
+        self.index[user_id] = (offset, length)
+        self.live_bytes += length
+
+    def _drop_entry(self, user_id: str) -> None:
+        previous = self.index.pop(user_id, None)
+        if previous:
+            self.live_bytes -= previous[1]
+
+    def _read_record(self, offset: int, length: int) -> UserRecord:
+        line = os.pread(self._data.fileno(), length, offset)
+        return UserRecord.from_stored(json.loads(line)[1])
+
+    def iter_all(self) -> Iterator[Tuple[str, UserRecord]]:
+        for user_id, (offset, length) in list(self.index.items()):
+            yield user_id, self._read_record(offset, length)
+
+    def is_empty(self) -> bool:
+        return not self.index
+
+    def get(self, user_id: str) -> Optional[UserRecord]:
+        entry = self.index.get(user_id)
+        return self._read_record(*entry) if entry else None
+
+    def save(self, users: Dict[str, UserRecord]) -> None:
+        offset = self._data.seek(0, os.SEEK_END)
+        lines, entries = [], []
+        for user_id, record in users.items():
+            line = (json.dumps([user_id, record.to_compact()], separators=(",", ":")) + "\n").encode()
+            lines.append(line)
+            entries.append((user_id, offset, len(line)))
+            offset += len(line)
+
+        self._data.write(b"".join(lines))
+        self._data.flush()
+        os.fsync(self._data.fileno())
+
+        for user_id, offset, length in entries:
+            self._set_entry(user_id, offset, length)
+        self._index_file.write("".join(f"{u} {o} {n}\n" for u, o, n in entries))
+        self._index_file.flush()
+
+    def delete(self, user_ids: Iterable[str]) -> None:
+        user_ids = [user_id for user_id in user_ids if user_id in self.index]
+        if not user_ids:
+            return
+
+        offset = self._data.seek(0, os.SEEK_END)
+        lines, entries = [], []
+        for user_id in user_ids:
+            line = (json.dumps([user_id, None], separators=(",", ":")) + "\n").encode()
+            lines.append(line)
+            entries.append(f"{user_id} {offset} -{len(line)}\n")
+            offset += len(line)
+
+        self._data.write(b"".join(lines))
+        self._data.flush()
+        os.fsync(self._data.fileno())
+
+        for user_id in user_ids:
+            self._drop_entry(user_id)
+        self._index_file.write("".join(entries))
+        self._index_file.flush()
+
+    def born_on(self, month: int, day: int) -> List[str]:
+        matches = []
+        for user_id, record in self.iter_all():
+            birthday = record.birthday_date
+            if birthday and (birthday.month, birthday.day) == (month, day):
+                matches.append(user_id)
+        return matches
+
+    def top_math_scores(self, limit: int) -> List[Tuple[str, int]]:
+        scores = ((user_id, record.math_score) for user_id, record in self.iter_all())
+        return heapq.nlargest(limit, scores, key=lambda item: item[1])
+
+    def maintain(self) -> None:
+        """
+        Rewrite the data and index files without superseded records once they waste enough space.
+        """
+        size = self._data.seek(0, os.SEEK_END)
+        dead_bytes = size - self.live_bytes - len(self._header())
+        if dead_bytes < max(COMPACT_MIN_DEAD_BYTES, self.live_bytes):
+            return
+
+        users = dict(self.iter_all())
+        self._write_files(users)
+        print(f"Indexed user file compacted: {dead_bytes} bytes freed")
+
+    def _write_files(self, users: Dict[str, UserRecord]) -> None:
+        # The new state is built aside and only taken over once the new data file is in place, so a
+        # failed write (e.g. a full disk) leaves the backend working on the old files.
+        # A new generation token makes a crash between the two renames detectable on the next open.
+        generation = uuid.uuid4().hex
+        header = (json.dumps(["#", generation]) + "\n").encode()
+        index: Dict[str, Tuple[int, int]] = {}
+        offset = len(header)
+
+        with open(f"{self.path}.tmp", "wb") as data, open(f"{self.index_path}.tmp", "w") as index_file:
+            data.write(header)
+            index_file.write(f"# {generation}\n")
+            for user_id, record in users.items():
+                line = (json.dumps([user_id, record.to_compact()], separators=(",", ":")) + "\n").encode()
+                data.write(line)
+                index_file.write(f"{user_id} {offset} {len(line)}\n")
+                index[user_id] = (offset, len(line))
+                offset += len(line)
+            data.flush()
+            os.fsync(data.fileno())
+            index_file.flush()
+            os.fsync(index_file.fileno())
+
+        os.replace(f"{self.path}.tmp", self.path)
+        new_data = open(self.path, "r+b")
+        try:
+            os.replace(f"{self.index_path}.tmp", self.index_path)
+        except OSError as e:
+            # The old index no longer matches the generation of the data file, so the next open
+            # rebuilds it; until then the entries appended to it are only read from memory
+            print(f"Error replacing {self.index_path}, it will be rebuilt: {e}")
+        sync_dir(self.path)
+        new_index_file = open(self.index_path, "a")
+
+        if self._data is not None:
+            self.close()
+        self._data, self._index_file = new_data, new_index_file
+        self.generation = generation
+        self.index = index
+        self.live_bytes = offset - len(header)
+
+    def close(self) -> None:
+        self._data.close()
+        self._index_file.close()
@@ -0,0 +1,121 @@
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+import json
+import os
+
+from .json_backend import JsonStorage, write_json_atomic
+from ..user_record import UserRecord
+
+COMPACT_THRESHOLD: int = 1024 * 1024  # journal size in bytes that triggers a compaction
+
+
+class JournalStorage(JsonStorage):
+    """
+    Storage backend appending user changes to a journal next to a JSON snapshot.
+
+    A save does not rewrite the snapshot: for every changed user it appends one line holding only
+    the fields that differ from the last persisted state, e.g. `["123", {"math_score": 7}]`, and
+    syncs the journal once per saved batch; a deleted user is journaled as `["123", null]`. When the
+    backend is created the snapshot is read and the journal replayed on top of it. Once the journal
+    grows past `compact_threshold` bytes, `maintain` writes a fresh snapshot and truncates the journal.
+
+    The snapshot has the same format as the file of JsonStorage, so an existing users file can be
+    used as the snapshot directly.
+
+    Attributes:
+        path (str): Path of the snapshot file.
+        journal_path (str): Path of the journal file.
+        compact_threshold (int): Journal size in bytes above which `maintain` compacts.
+        users (dict): Mapping of user ID to the last persisted record.
+    """
+
+    def __init__(
+        self, path: str, journal_path: str, compact_threshold: int = COMPACT_THRESHOLD
+    ) -> None:
+        super().__init__(path)
+        self.journal_path = journal_path
+        self.compact_threshold = compact_threshold
+        replayed = self._replay()
+        if replayed:
+            print(f"Replayed {replayed} journal entries")
+        self._journal = open(self.journal_path, "a")
+
+    def _replay(self) -> int:
+        replayed = 0
+        try:
+            with open(self.journal_path, "r") as journal:
+                for line in journal:
+                    try:
+                        user_id, fields = json.loads(line)
+                    except ValueError:
+                        # A crash can leave the last line half-written
+                        print(f"Skipping corrupted journal entry: {line!r}")
+                        continue
+                    if fields is None:
+                        self.users.pop(user_id, None)
+                        continue
+                    record = self.users.setdefault(user_id, UserRecord())
+                    for name, value in fields.items():
+                        setattr(record, name, value)
+                    replayed += 1
+        except FileNotFoundError:
+            pass
+        return replayed
+
+    def iter_all(self) -> Iterator[Tuple[str, UserRecord]]:
+        # The journal diffs against these records, so nobody else may hold them
+        return ((user_id, record.copy()) for user_id, record in list(self.users.items()))
+
+    def get(self, user_id: str) -> Optional[UserRecord]:
+        record = self.users.get(user_id)
+        return record.copy() if record else None
+
+    def save(self, users: Dict[str, UserRecord]) -> None:
+        lines = []
+        for user_id, record in users.items():
+            new = record.to_compact()
+            old = self.users[user_id].to_compact() if user_id in self.users else None
+            delta = {
+                name: value
+                for index, (name, value) in enumerate(zip(UserRecord.__slots__, new))
+                if old is None or old[index] != value
+            }
+            if delta:
+                lines.append(json.dumps([user_id, delta], separators=(",", ":")) + "\n")
+            self.users[user_id] = record.copy()
+
+        self._append(lines)
+
+    def delete(self, user_ids: Iterable[str]) -> None:
+        lines = []
+        for user_id in user_ids:
+            if self.users.pop(user_id, None) is not None:
+                lines.append(json.dumps([user_id, None], separators=(",", ":")) + "\n")
+        self._append(lines)
+
+    def _append(self, lines: list) -> None:
+        if lines:
+            self._journal.write("".join(lines))
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+
+    def maintain(self) -> None:
+        """
+        Compact the journal into a new snapshot once it has grown past the threshold.
+
+        The snapshot is written atomically before the journal is truncated. If the process dies in
+        between, replaying the old journal on the new snapshot yields the same state again.
+        """
+        if self._journal.tell() < self.compact_threshold:
+            return
+
+        data = {user_id: record.to_compact() for user_id, record in self.users.items()}
+        write_json_atomic(self.path, data, separators=(",", ":"))
+        self._journal.truncate(0)
+        self._journal.seek(0)
+        os.fsync(self._journal.fileno())
+        print(f"Journal compacted into a snapshot of {len(data)} users")
+
+    def close(self) -> None:
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
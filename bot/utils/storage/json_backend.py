@@ -0,0 +1,126 @@
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+import json
+import os
+
+from .base import StorageBackend
+from ..user_record import UserRecord
+
+
+class JsonStorage(StorageBackend):
+    """
+    Storage backend keeping all users in a single JSON file.
+
+    The whole file is read when the backend is created and rewritten on every save. Each user is written in the compact
+    list form of UserRecord; files in the older dict form are still read. Writes go to a temporary file
+    that is synced to disk and then atomically renamed over the original, so a crash never truncates
+    the file.
+
+    Attributes:
+        path (str): Path of the JSON file.
+        users (dict): Mapping of user ID to user record, as last read or written.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.users: Dict[str, UserRecord] = {
+            user_id: UserRecord.from_stored(data) for user_id, data in read_json(path).items()
+        }
+        print(f"Read {len(self.users)} users from {path}")
+
+    def iter_all(self) -> Iterator[Tuple[str, UserRecord]]:
+        return iter(list(self.users.items()))
+
+    def get(self, user_id: str) -> Optional[UserRecord]:
+        return self.users.get(user_id)
+
+    def save(self, users: Dict[str, UserRecord]) -> None:
+        self.users.update(users)
+        self._write()
+
+    def delete(self, user_ids: Iterable[str]) -> None:
+        for user_id in user_ids:
+            self.users.pop(user_id, None)
+        self._write()
+
+    def _write(self) -> None:
+        data = {user_id: record.to_compact() for user_id, record in self.users.items()}
+        write_json_atomic(self.path, data, separators=(",", ":"))
+
+    def born_on(self, month: int, day: int) -> List[str]:
+        return [
+            user_id
+            for user_id, record in self.users.items()
+            if record.birthday
+            and (record.birthday_date.month, record.birthday_date.day) == (month, day)
+        ]
+
+    def top_math_scores(self, limit: int) -> List[Tuple[str, int]]:
+        scores = [(user_id, record.math_score) for user_id, record in self.users.items()]
+        scores.sort(key=lambda item: item[1], reverse=True)
+        return scores[:limit]
+
+
+def read_json(path: str) -> Dict[str, Any]:
+    """
+    Read a JSON object from a file.
+
+    Args:
+        path (str): Path of the file.
+
+    Returns:
+        dict: The parsed object, or an empty dict if the file is missing, empty or corrupted.
+    """
+    try:
+        with open(path, "r") as file:
+            file_content = file.read()
+            return json.loads(file_content) if file_content.strip() else {}
+    except FileNotFoundError:
+        return {}
+    except json.JSONDecodeError as e:
+        print(f"Error occurred while reading {path}: {e}")
+        return {}
+
+
+def write_json_atomic(path: str, data: Any, **dump_kwargs) -> None:
+    """
+    Write data as JSON to a temporary file and atomically rename it over `path`.
+
+    Args:
+        path (str): Destination path.
+        data: JSON-serializable data.
+        **dump_kwargs: Extra arguments for json.dump.
+
+    Raises:
+        OSError: If the file cannot be written.
+
+    Example:
+        >>> write_json_atomic("users_info.json", users, separators=(",", ":"))
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(data, file, **dump_kwargs)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+    sync_dir(path)
+
+
+def sync_dir(path: str) -> None:
+    """
+    Persist a rename in the directory containing `path`.
+
+    Not every platform allows opening a directory, in which case this does nothing.
+
+    Args:
+        path (str): Path of a file in the directory to sync.
+    """
+    try:
+        dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
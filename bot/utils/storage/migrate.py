@@ -0,0 +1,42 @@
+import json
+import os
+
+from .base import StorageBackend
+from ..user_record import UserRecord
+
+
+def migrate_json_users(json_path: str, storage: StorageBackend) -> int:
+    """
+    Copy all users from the JSON users file into another storage backend.
+
+    After a successful import the JSON file is renamed to '<name>.migrated', so the migration runs once.
+    The file is parsed strictly: an unreadable file is neither imported nor renamed, so the bot does not
+    start over with no users.
+
+    Args:
+        json_path (str): Path of the JSON users file.
+        storage (StorageBackend): The storage to import into.
+
+    Returns:
+        int: Number of migrated users.
+
+    Raises:
+        ValueError: If the JSON file is corrupt. It is left in place to be repaired.
+
+    Example:
+        >>> migrate_json_users(USER_INFO_FILE, SqliteStorage(USER_DB_FILE))
+    """
+    if not os.path.exists(json_path):
+        return 0
+
+    try:
+        with open(json_path, "r") as file:
+            legacy = json.load(file)
+    except ValueError as e:
+        raise ValueError(f"Cannot migrate {json_path}, the file is corrupt: {e}") from e
+
+    users = {user_id: UserRecord.from_stored(data) for user_id, data in legacy.items()}
+    storage.save(users)
+    os.replace(json_path, f"{json_path}.migrated")
+    print(f"Migrated {len(users)} users from {json_path} to {type(storage).__name__}")
+    return len(users)
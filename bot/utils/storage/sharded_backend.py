@@ -0,0 +1,92 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import heapq
+import os
+import zlib
+
+from .base import StorageBackend
+from .json_backend import read_json, write_json_atomic
+from ..user_record import UserRecord
+
+
+class ShardedJsonStorage(StorageBackend):
+    """
+    Storage backend spreading the users over several JSON shard files.
+
+    A user always lives in the shard chosen by a stable hash of their ID, so a save only reads and
+    rewrites the shards that contain changed users. Every shard is written atomically on its own.
+    Reads and scans load one shard at a time instead of the whole user base.
+
+    Attributes:
+        directory (str): Directory holding the shard files.
+        shard_count (int): Number of shards. Changing it for an existing directory moves users to
+            other shards, so it must stay fixed once data has been written.
+    """
+
+    def __init__(self, directory: str, shard_count: int = 16) -> None:
+        self.directory = directory
+        self.shard_count = shard_count
+        os.makedirs(directory, exist_ok=True)
+
+    def shard_of(self, user_id: str) -> int:
+        """
+        Return the shard number of a user.
+
+        Args:
+            user_id (str): The ID of the user.
+
+        Returns:
+            int: The shard number, between 0 and shard_count - 1.
+        """
+        return zlib.crc32(user_id.encode()) % self.shard_count
+
+    def shard_path(self, shard: int) -> str:
+        """
+        Return the path of a shard file.
+        """
+        return os.path.join(self.directory, f"users_{shard:03d}.json")
+
+    def _read_shard(self, shard: int) -> Dict[str, list]:
+        return read_json(self.shard_path(shard))
+
+    def iter_all(self) -> Iterator[Tuple[str, UserRecord]]:
+        for shard in range(self.shard_count):
+            for user_id, data in self._read_shard(shard).items():
+                yield user_id, UserRecord.from_stored(data)
+
+    def get(self, user_id: str) -> Optional[UserRecord]:
+        data = self._read_shard(self.shard_of(user_id)).get(user_id)
+        return UserRecord.from_stored(data) if data is not None else None
+
+    def save(self, users: Dict[str, UserRecord]) -> None:
+        by_shard: Dict[int, Dict[str, UserRecord]] = {}
+        for user_id, record in users.items():
+            by_shard.setdefault(self.shard_of(user_id), {})[user_id] = record
+
+        for shard, shard_users in by_shard.items():
+            data = self._read_shard(shard)
+            for user_id, record in shard_users.items():
+                data[user_id] = record.to_compact()
+            write_json_atomic(self.shard_path(shard), data, separators=(",", ":"))
+
+    def delete(self, user_ids: Iterable[str]) -> None:
+        by_shard: Dict[int, List[str]] = {}
+        for user_id in user_ids:
+            by_shard.setdefault(self.shard_of(user_id), []).append(user_id)
+
+        for shard, shard_user_ids in by_shard.items():
+            data = self._read_shard(shard)
+            for user_id in shard_user_ids:
+                data.pop(user_id, None)
+            write_json_atomic(self.shard_path(shard), data, separators=(",", ":"))
+
+    def born_on(self, month: int, day: int) -> List[str]:
+        matches = []
+        for user_id, record in self.iter_all():
+            birthday = record.birthday_date
+            if birthday and (birthday.month, birthday.day) == (month, day):
+                matches.append(user_id)
+        return matches
+
+    def top_math_scores(self, limit: int) -> List[Tuple[str, int]]:
+        scores = ((user_id, record.math_score) for user_id, record in self.iter_all())
+        return heapq.nlargest(limit, scores, key=lambda item: item[1])
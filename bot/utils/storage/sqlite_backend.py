@@ -0,0 +1,161 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import sqlite3
+
+from .base import StorageBackend
+from ..user_record import UserRecord
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id INTEGER PRIMARY KEY,
+    username TEXT,
+    first_name TEXT,
+    birthday INTEGER,
+    birth_month INTEGER,
+    birth_day INTEGER,
+    math_score INTEGER NOT NULL DEFAULT 0,
+    friend_day INTEGER,
+    friend_percentage INTEGER NOT NULL DEFAULT 0,
+    last_seen INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_users_birthday ON users (birth_month, birth_day);
+CREATE INDEX IF NOT EXISTS idx_users_math_score ON users (math_score);
+CREATE INDEX IF NOT EXISTS idx_users_friend ON users (friend_day, friend_percentage);
+"""
+
+# Columns added after the first release, with their definitions for ALTER TABLE
+ADDED_COLUMNS = {
+    "last_seen": "INTEGER",
+}
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_users_last_seen ON users (last_seen);
+"""
+
+COLUMNS = (
+    "user_id",
+    "username",
+    "first_name",
+    "birthday",
+    "birth_month",
+    "birth_day",
+    "math_score",
+    "friend_day",
+    "friend_percentage",
+    "last_seen",
+)
+
+UPSERT = (
+    f"INSERT INTO users ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))}) "
+    f"ON CONFLICT (user_id) DO UPDATE SET "
+    + ", ".join(f"{column} = excluded.{column}" for column in COLUMNS[1:])
+)
+
+
+class SqliteStorage(StorageBackend):
+    """
+    Storage backend keeping one row per user in a SQLite database.
+
+    The birthday, the math score and the friend fields are real, indexed columns, so saving a user
+    touches a single row and birthday or leaderboard queries are answered from an index.
+
+    Attributes:
+        path (str): Path of the database file.
+        connection (sqlite3.Connection): The open database connection.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        self._add_missing_columns()
+        self.connection.executescript(INDEXES)
+
+    def _add_missing_columns(self) -> None:
+        existing = {row[1] for row in self.connection.execute("PRAGMA table_info(users)")}
+        for column, definition in ADDED_COLUMNS.items():
+            if column not in existing:
+                self.connection.execute(f"ALTER TABLE users ADD COLUMN {column} {definition}")
+
+    def iter_all(self) -> Iterator[Tuple[str, UserRecord]]:
+        cursor = self.connection.execute(f"SELECT {', '.join(COLUMNS)} FROM users")
+        for row in cursor:
+            yield str(row[0]), row_to_record(row)
+
+    def get(self, user_id: str) -> Optional[UserRecord]:
+        row = self.connection.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM users WHERE user_id = ?", (int(user_id),)
+        ).fetchone()
+        return row_to_record(row) if row else None
+
+    def save(self, users: Dict[str, UserRecord]) -> None:
+        try:
+            with self.connection:
+                self.connection.executemany(
+                    UPSERT, [record_to_row(user_id, record) for user_id, record in users.items()]
+                )
+        except sqlite3.Error as e:
+            raise OSError(f"SQLite write failed: {e}") from e
+
+    def delete(self, user_ids: Iterable[str]) -> None:
+        try:
+            with self.connection:
+                self.connection.executemany(
+                    "DELETE FROM users WHERE user_id = ?", [(int(user_id),) for user_id in user_ids]
+                )
+        except sqlite3.Error as e:
+            raise OSError(f"SQLite delete failed: {e}") from e
+
+    def born_on(self, month: int, day: int) -> List[str]:
+        cursor = self.connection.execute(
+            "SELECT user_id FROM users WHERE birth_month = ? AND birth_day = ?", (month, day)
+        )
+        return [str(row[0]) for row in cursor]
+
+    def top_math_scores(self, limit: int) -> List[Tuple[str, int]]:
+        cursor = self.connection.execute(
+            "SELECT user_id, math_score FROM users ORDER BY math_score DESC LIMIT ?", (limit,)
+        )
+        return [(str(user_id), score) for user_id, score in cursor]
+
+    def inactive_since(self, day: int) -> Iterator[Tuple[str, UserRecord]]:
+        cursor = self.connection.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM users WHERE last_seen IS NULL OR last_seen < ?", (day,)
+        )
+        for row in cursor.fetchall():
+            yield str(row[0]), row_to_record(row)
+
+    def is_empty(self) -> bool:
+        return self.connection.execute("SELECT 1 FROM users LIMIT 1").fetchone() is None
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+def record_to_row(user_id: str, record: UserRecord) -> tuple:
+    """
+    Convert a user record into a row of the users table.
+    """
+    birthday = record.birthday_date
+    return (
+        int(user_id),
+        record.username,
+        record.first_name,
+        record.birthday,
+        birthday.month if birthday else None,
+        birthday.day if birthday else None,
+        record.math_score,
+        record.friend_day,
+        record.friend_percentage,
+        record.last_seen,
+    )
+
+
+def row_to_record(row: tuple) -> UserRecord:
+    """
+    Convert a row of the users table into a user record.
+    """
+    _, username, first_name, birthday, _, _, math_score, friend_day, percentage, last_seen = row
+    return UserRecord(username, first_name, birthday, math_score, friend_day, percentage, last_seen)
+
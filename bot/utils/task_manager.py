@@ -1,45 +1,320 @@
-# 3rd built
+# Built-in
+import os
+import time
 import asyncio
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Any, Dict, Optional
 
 # Custom
-from tasks import friend_percent_reset, send_frog
+from .tasks import send_frog, announce_birthdays
+from .cron import CronSchedule
+from .io_pool import run_blocking
+from .user_store import UserStore
+from .user_record import BOT_TIMEZONE
+from .state_manager import StateManager
+from .chat_members import ChatMembers
+from .storage.json_backend import read_json, write_json_atomic
 
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+TASK_RUNS_FILE = os.getenv("TASK_RUNS_FILE", os.path.join(CURRENT_DIR, "..", "task_runs.json"))
 
-class TaskManager:
+RESTART_BACKOFF: float = 1.0  # seconds before the first restart of a failed task
+RESTART_BACKOFF_MAX: float = 300.0  # the delay doubles with every failure in a row up to this
+
+
+@dataclass
+class JobStats:
     """
-    Class responsible for managing background tasks.
+    Health and run statistics of a supervised task.
+
+    A run is one call of a scheduled job, or the whole lifetime of a long-running task until it ends
+    or fails.
 
     Attributes:
-        tasks (list): List to store all running tasks.
-        druzhba_id (int): Chat ID for the Druzhba chat.
-        test_chat_id (int): Chat ID for the test chat.
+        name (str): The name of the task.
+        state (str): "running", "waiting" (for the next fire time), "backoff" (before a restart or
+            retry), "finished" or "stopped".
+        runs (int): Number of runs started.
+        failures (int): Number of runs that raised an exception.
+        consecutive_failures (int): Number of failed runs since the last successful one.
+        last_success (float): When the last successful run ended (UNIX timestamp), or None.
+        last_error (str): The exception of the last failed run, or None.
+        last_duration (float): Duration of the last run in seconds, or None.
+        total_duration (float): Summed duration of all runs in seconds.
+        max_duration (float): Longest run in seconds.
+        next_run (datetime): Next fire time of a scheduled job, or None.
+        running_since (float): When the current run started (UNIX timestamp), or None between runs.
     """
+    name: str
+    state: str = "running"
+    runs: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    last_success: Optional[float] = None
+    last_error: Optional[str] = None
+    last_duration: Optional[float] = None
+    total_duration: float = 0.0
+    max_duration: float = 0.0
+    next_run: Optional[datetime] = None
+    running_since: Optional[float] = None
 
-    def __init__(self) -> None:
+    def start(self) -> None:
+        """
+        Record the start of a run.
         """
-        Initialize the TaskManager with default values.
+        self.state = "running"
+        self.runs += 1
+        self.running_since = time.time()
+
+    def record(self, duration: float, error: Optional[Exception] = None) -> None:
         """
-        self.tasks = []
+        Record the end of a run.
 
-    async def add_task(self, coroutine, *args) -> asyncio.Task:
+        Args:
+            duration (float): Duration of the run in seconds.
+            error (Exception, optional): The exception the run failed with.
         """
-        Add a new task to the TaskManager.
+        self.running_since = None
+        self.last_duration = duration
+        self.total_duration += duration
+        self.max_duration = max(self.max_duration, duration)
+        if error is None:
+            self.consecutive_failures = 0
+            self.last_success = time.time()
+        else:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_error = f"{type(error).__name__}: {error}"
+
+    @property
+    def healthy(self) -> bool:
+        """
+        Whether the last run succeeded, or the current run has outlasted the longest restart delay.
+        """
+        if self.consecutive_failures == 0:
+            return True
+        return self.running_since is not None and time.time() - self.running_since > RESTART_BACKOFF_MAX
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Return the statistics as a JSON-serializable dict, with the mean run duration and a health flag.
+        """
+        data = asdict(self)
+        data["next_run"] = self.next_run.isoformat() if self.next_run else None
+        data["mean_duration"] = self.total_duration / self.runs if self.runs else None
+        data["healthy"] = self.healthy
+        return data
+
+
+class TaskManager:
+    """
+    Singleton class responsible for managing background tasks.
+
+    Long-running loops are started with `add_task`. Periodic jobs are scheduled with `schedule`: every
+    job computes its next fire time from a cron schedule and sleeps exactly until then. The start time
+    of the last run of every job is kept in TASK_RUNS_FILE, so a run missed while the bot was down is
+    caught up once at startup.
+
+    Every task is supervised: a long-running task that raises is restarted, and a failed run of a
+    scheduled job is retried until the next fire time comes, both after a delay doubling from
+    RESTART_BACKOFF up to RESTART_BACKOFF_MAX. Run statistics of every task are kept in `jobs` and
+    summarized by `health`.
+
+    Attributes:
+        tasks (list): List to store all running tasks.
+        jobs (dict): Statistics of every task by name.
+        last_runs (dict): Start time (UNIX timestamp) of the last run of every scheduled job by name.
+    """
+
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super(TaskManager, cls).__new__(cls, *args, **kwargs)
+            cls._instance.tasks = []
+            cls._instance.jobs: Dict[str, JobStats] = {}
+            cls._instance.last_runs: Dict[str, float] = {}
+            cls._instance._stopping = False
+        return cls._instance
+
+    async def add_task(self, coroutine, *args, name: str = None) -> asyncio.Task:
+        """
+        Add a new supervised task to the TaskManager.
+
+        The task is restarted with backoff if it raises, and is done once the coroutine returns.
 
         Args:
             coroutine: The coroutine function to run as a task.
             *args: Arguments to pass to the coroutine.
+            name (str, optional): Unique name of the task. Defaults to the name of the coroutine.
 
         Returns:
             asyncio.Task: The created asyncio Task.
 
         Example:
-            >>> task = await task_manager.add_task(task_manager.friend_percent_reset)
+            >>> task = await task_manager.add_task(UserStore().run_flusher)
         """
-        task = asyncio.create_task(coroutine(*args))
+        name = name or coroutine.__name__
+        self.jobs[name] = JobStats(name)
+        task = asyncio.create_task(self._supervise(name, coroutine, *args))
         self.tasks.append(task)
-        print(f"Task added: {coroutine.__name__}")
+        print(f"Task added: {name}")
         return task
 
+    async def _supervise(self, name: str, coroutine, *args) -> None:
+        stats = self.jobs[name]
+        # The runs of a scheduled job are counted by the job itself, the supervisor only restarts it
+        counts_runs = coroutine != self._run_scheduled
+        backoff = RESTART_BACKOFF
+        try:
+            while True:
+                if counts_runs:
+                    stats.start()
+                started = time.monotonic()
+                try:
+                    await coroutine(*args)
+                except Exception as e:
+                    duration = time.monotonic() - started
+                    stats.record(duration if counts_runs else 0.0, e)
+                    if duration > RESTART_BACKOFF_MAX:
+                        # It ran fine for a while, so this is a new streak of failures
+                        backoff = RESTART_BACKOFF
+                    print(f"Task {name} failed: {e}; restarting in {backoff:.0f}s")
+                    stats.state = "backoff"
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, RESTART_BACKOFF_MAX)
+                    continue
+
+                if counts_runs:
+                    stats.record(time.monotonic() - started)
+                # The loops return when they are cancelled
+                stats.state = "stopped" if self._stopping else "finished"
+                return
+        except asyncio.CancelledError:
+            # Cancel the task if it's cancelled
+            stats.state = "stopped"
+
+    async def schedule(self, name: str, spec: str, coroutine, *args, tz=BOT_TIMEZONE) -> asyncio.Task:
+        """
+        Run a coroutine function at the fire times of a cron schedule.
+
+        The coroutine is called with the scheduled fire time (an aware datetime) after `args`, so a
+        late or caught-up run knows which fire time it stands for. If the job has run before and fire
+        times passed since its last run, the latest of them is run once right away, unless the next fire
+        time is later the same day: the missed run is then merged into that one, so a job never runs
+        twice on one day because of a restart.
+
+        Args:
+            name (str): Unique name of the job, the key of its last-run marker.
+            spec (str): The cron schedule, e.g. "0 9 * * wed" (see CronSchedule).
+            coroutine: The coroutine function to run on every fire time, called as
+                `coroutine(*args, fire_at)`.
+            *args: Arguments to pass to the coroutine.
+            tz: The pytz timezone the schedule is evaluated in. Defaults to CET.
+
+        Returns:
+            asyncio.Task: The supervised task running the job.
+
+        Raises:
+            ValueError: If the schedule is malformed.
+
+        Example:
+            >>> await task_manager.schedule("frog", "0 9 * * wed", send_frog, bot)
+        """
+        schedule = CronSchedule(spec, tz)
+        print(f"Job scheduled: {name} ({spec})")
+        return await self.add_task(self._run_scheduled, name, schedule, coroutine, *args, name=name)
+
+    async def _run_scheduled(self, name: str, schedule: CronSchedule, coroutine, *args) -> None:
+        stats = self.jobs[name]
+        try:
+            now = datetime.now(schedule.timezone)
+            if name in self.last_runs:
+                last_run = datetime.fromtimestamp(self.last_runs[name], schedule.timezone)
+                fire_at = schedule.next_after(last_run)
+            else:
+                fire_at = schedule.next_after(now)
+            if fire_at <= now:
+                # Only the latest missed fire time is caught up
+                following = schedule.next_after(fire_at)
+                while following <= now:
+                    fire_at, following = following, schedule.next_after(following)
+                if following.date() == now.date():
+                    print(f"Merging the missed run of {name} into the one at {following:%H:%M}")
+                    fire_at = following
+                else:
+                    print(f"Catching up the missed run of {name} from {fire_at:%Y-%m-%d %H:%M}")
+
+            while True:
+                stats.next_run = fire_at
+                delay = (fire_at - datetime.now(schedule.timezone)).total_seconds()
+                if delay > 0:
+                    stats.state = "waiting"
+                    # Checked again after waking up, the clock may have moved meanwhile
+                    await asyncio.sleep(delay)
+                    continue
+
+                started = datetime.now(schedule.timezone)
+                retry_until = schedule.next_after(max(fire_at, started))
+                backoff = RESTART_BACKOFF
+                while not await self._run_job(stats, coroutine, *args, fire_at):
+                    if (retry_until - datetime.now(schedule.timezone)).total_seconds() <= backoff:
+                        print(f"Giving up on the run of {name}, the next one is due")
+                        break
+                    print(f"Retrying {name} in {backoff:.0f}s")
+                    stats.state = "backoff"
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, RESTART_BACKOFF_MAX)
+
+                await self._mark_run(name, started.timestamp())
+                # The next fire time after the one just run; fire times that passed while it was
+                # running are not repeated
+                fire_at = schedule.next_after(max(fire_at, datetime.now(schedule.timezone)))
+        except asyncio.CancelledError:
+            # Cancel the task if it's cancelled
+            pass
+
+    async def _run_job(self, stats: JobStats, coroutine, *args) -> bool:
+        stats.start()
+        started = time.monotonic()
+        try:
+            await coroutine(*args)
+        except Exception as e:
+            stats.record(time.monotonic() - started, e)
+            print(f"An error occurred in the scheduled job {stats.name}: {e}")
+            return False
+        stats.record(time.monotonic() - started)
+        return True
+
+    async def _mark_run(self, name: str, timestamp: float) -> None:
+        self.last_runs[name] = timestamp
+        try:
+            await run_blocking(write_json_atomic, TASK_RUNS_FILE, self.last_runs, indent=4)
+        except OSError as e:
+            print(f"Error writing the runs of the scheduled jobs: {e}")
+
+    def health(self) -> Dict[str, Any]:
+        """
+        Return a summary of the health of all tasks.
+
+        A task is healthy if its last run did not fail, or if it was restarted and has been running
+        for longer than RESTART_BACKOFF_MAX since.
+
+        Returns:
+            dict: "healthy" (bool, all tasks healthy) and "jobs", the statistics of every task by name
+            (see JobStats.to_dict).
+
+        Example:
+            >>> TaskManager().health()["healthy"]
+            True
+        """
+        jobs = {name: stats.to_dict() for name, stats in self.jobs.items()}
+        return {
+            "healthy": all(job["healthy"] for job in jobs.values()),
+            "jobs": jobs,
+        }
+
     async def run_tasks(self, bot) -> None:
         """
         Run the background tasks managed by the TaskManager.
@@ -50,8 +325,15 @@ class TaskManager:
         Example:
             >>> await task_manager.run_tasks(bot)
         """
-        await self.add_task(friend_percent_reset)
-        await self.add_task(send_frog, bot)
+        self._stopping = False
+        self.last_runs = await run_blocking(read_json, TASK_RUNS_FILE)
+
+        await self.add_task(UserStore().run_flusher)
+        await self.add_task(StateManager().run_expiry)
+        await self.add_task(StateManager().run_snapshots)
+        await self.add_task(ChatMembers().run_saver)
+        await self.schedule("frog", "0 9 * * wed", send_frog, bot)
+        await self.schedule("birthdays", "0 9 * * *", announce_birthdays, bot)
         print("All tasks started.")
 
     def stop_tasks(self) -> None:
@@ -61,6 +343,7 @@ class TaskManager:
         Example:
             >>> task_manager.stop_tasks()
         """
+        self._stopping = True
         for task in self.tasks:
             task.cancel()
         self.tasks.clear()
@@ -1,7 +1,7 @@
-from .percent_resetter import friend_percent_reset
 from .frog_sender import send_frog
+from .birthday_announcer import announce_birthdays
 
 __all__ = [
-    "friend_percent_reset",
-    "send_frog"
-]
\ No newline at end of file
+    "send_frog",
+    "announce_birthdays",
+]
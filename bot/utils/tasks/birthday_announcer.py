@@ -1,32 +1,97 @@
-# 3rd party
-from telegram import Update
-from pytz import timezone
-
 # Built-in
-import asyncio
-from datetime import datetime 
+import os
+from datetime import date, datetime, timedelta
+from typing import Dict
 
 # Custom
-from ..data_manager import get_user_info
-
-
-async def announce_birthday(update: Update):
-    try:
-        while True:
-            druzhba: int = -1001545165176
-            user = update.
-            
-            mention = f"@{user.username}"
-            days = []
-            
-            current = datetime.now(timezone("CET"))
-            if current.day == 
-            
-            
-            prompt = f"Сегодня у {mention} день рождения!! Поздравим его!🥳🎂"
-            
-            
-            await asyncio.sleep(86400)
-    except asyncio.CancelledError:
-        # Cancel the task if it's cancelled
-        pass
\ No newline at end of file
+from ..broadcast import broadcast
+from ..birthday_index import BirthdayIndex
+from ..chat_members import ChatMembers
+from ..io_pool import run_blocking
+from ..outbound_queue import BROADCAST
+from ..user_record import BOT_TIMEZONE
+from ..user_store import UserStore
+from ..storage.json_backend import read_json, write_json_atomic
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+ANNOUNCED_FILE = os.getenv(
+    "BIRTHDAYS_ANNOUNCED_FILE", os.path.join(CURRENT_DIR, "..", "..", "birthdays_announced.json")
+)
+CATCH_UP_DAYS: int = 3  # missed days still announced late, the day of the run included
+
+
+async def announce_birthdays(bot, day: date = None):
+    """
+    Congratulate the users whose birthday is on a day in every group chat they are in.
+
+    Scheduled by the TaskManager every day at 9:00 AM CET, with the fire time of the run as `day`.
+    The last announced day is kept in ANNOUNCED_FILE: a repeat run for a day already announced does
+    nothing, and days missed while the bot was down (up to CATCH_UP_DAYS back) are announced late
+    before the day of the run. Only the slots of those days in the BirthdayIndex are read and the chats
+    come from the ChatMembers index, so the job scans neither users nor chats. Every chat gets one
+    message per day naming all of its members celebrating, sent with a broadcast named after the day
+    that a restart resumes.
+
+    Args:
+        bot: The Telegram bot instance.
+        day (date, optional): The day to announce. Defaults to today in CET.
+
+    Example:
+        >>> await task_manager.schedule("birthdays", "0 9 * * *", announce_birthdays, bot)
+    """
+    if day is None:
+        day = datetime.now(BOT_TIMEZONE).date()
+    elif isinstance(day, datetime):
+        # The TaskManager passes its fire time
+        day = day.astimezone(BOT_TIMEZONE).date()
+
+    announced = await run_blocking(read_json, ANNOUNCED_FILE)
+    last_day = date.fromisoformat(announced["last_day"]) if "last_day" in announced else None
+    first_day = day
+    if last_day is not None:
+        first_day = max(day - timedelta(days=CATCH_UP_DAYS - 1), last_day + timedelta(days=1))
+
+    while first_day <= day:
+        await _announce_day(bot, first_day, late=first_day < day)
+        try:
+            await run_blocking(write_json_atomic, ANNOUNCED_FILE, {"last_day": first_day.isoformat()})
+        except OSError as e:
+            print(f"Error writing the last announced birthday: {e}")
+        first_day += timedelta(days=1)
+
+
+async def _announce_day(bot, day: date, late: bool) -> None:
+    mentions: Dict[str, str] = {}
+    chat_ids = set()
+    for user_id in BirthdayIndex().celebrating_on(day):
+        user_chats = ChatMembers().chats_of(int(user_id))
+        record = await run_blocking(UserStore().get, user_id) if user_chats else None
+        if record is None:
+            continue
+        mentions[user_id] = f"@{record.username}" if record.username else record.first_name
+        chat_ids |= user_chats
+
+    if not mentions:
+        return
+
+    async def congratulate(chat_id: int, mentions: Dict[str, str]) -> None:
+        members = ChatMembers().members_of(chat_id)
+        names = [mention for user_id, mention in mentions.items() if int(user_id) in members]
+        if not names:
+            return
+        if late:
+            who = names[0] if len(names) == 1 else f"{', '.join(names[:-1])} и {names[-1]}"
+            prompt = f"{day:%d.%m} у {who} был день рождения!! Поздравим с опозданием!🥳🎂"
+        elif len(names) == 1:
+            prompt = f"Сегодня у {names[0]} день рождения!! Поздравим его!🥳🎂"
+        else:
+            prompt = f"Сегодня у {', '.join(names[:-1])} и {names[-1]} день рождения!! Поздравим их!🥳🎂"
+        await bot.send_message(chat_id=chat_id, text=prompt, rate_limit_args=BROADCAST)
+
+    await broadcast(
+        f"birthdays:{day}",
+        sorted(chat_ids),
+        mentions,
+        congratulate,
+        resume_within=CATCH_UP_DAYS * 86400,
+    )
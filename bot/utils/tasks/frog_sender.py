@@ -1,54 +1,42 @@
-# 3rd party
-from pytz import timezone
-
 # Built-in
 import os
-import random
-import asyncio
-from pathlib import Path
 from datetime import datetime
+from pathlib import Path
+
+# Custom
+from ..broadcast import broadcast
+from ..chat_members import parse_chat_ids
+from ..image_catalog import ImageCatalog
+from ..outbound_queue import BROADCAST
 
+catalog = ImageCatalog(os.path.join(os.getcwd(), "img"))
+# The chats getting the frog, the Druzhba chat unless configured otherwise
+FROG_CHAT_IDS = parse_chat_ids(os.getenv("FROG_CHAT_IDS", "-1001545165176"))
 
-async def send_frog(bot):
+
+async def send_frog(bot, fire_at: datetime = None):
     """
-    Send an image every Wednesday at 9:00 AM CET.
+    Send a random image from the 'img' folder to the FROG_CHAT_IDS chats.
 
-    This task runs indefinitely and sends a random image from the 'img' folder
-    to the Druzhba chat every Wednesday at 9:00 AM CET.
+    Scheduled by the TaskManager every Wednesday at 9:00 AM CET. The chats are reached with a
+    broadcast, so a run interrupted by a restart sends the same image to the remaining chats. The image
+    is uploaded at most once; the other chats, and later Wednesdays picking the same image, get its
+    cached file ID.
 
     Args:
         bot: The Telegram bot instance.
+        fire_at (datetime, optional): The scheduled fire time of the run, passed by the TaskManager.
 
     Example:
-        >>> await task_manager.frog_sender(bot)
+        >>> await task_manager.schedule("frog", "0 9 * * wed", send_frog, bot)
     """
-    try:
-        while True:
-            druzhba: int = -1001545165176
-            test_chat: int = -4198289287
-            current = datetime.now(timezone("CET"))
-
-            # Send the image
-            if current.weekday() == 2 and current.hour == 9:
-                print("Looking for a pic")
-                image_folder = os.path.join(os.getcwd(), "img")
-                image_files = [
-                    f
-                    for f in Path(image_folder).iterdir()
-                    if f.is_file() and f.suffix.lower() in [".jpg", ".png", ".gif"]
-                ]
-                if image_files:
-                    random_image = random.choice(image_files)
-                    image_path = str(random_image)
-                    try:
-                        with open(image_path, "rb") as photo:
-                            await bot.send_photo(chat_id=druzhba, photo=photo)
-                        print(f"Image '{random_image}' sent to the Druzhba")
-                    except Exception as e:
-                        print(f"An error occurred while sending the photo: {e}")
-                else:
-                    print("No image found in the folder:", image_folder)
-            await asyncio.sleep(3600)
-    except asyncio.CancelledError:
-        # Cancel the task if it's cancelled
-        pass
+    print("Looking for a pic")
+    random_image = await catalog.pick()
+    if random_image is None:
+        print("No image found in the folder:", catalog.folder)
+        return
+
+    async def send_image(chat_id: int, image_name: str) -> None:
+        await catalog.send(bot, chat_id, Path(catalog.folder) / image_name, rate_limit_args=BROADCAST)
+
+    await broadcast("frog", FROG_CHAT_IDS, random_image.name, send_image)
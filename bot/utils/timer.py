@@ -1,9 +1,8 @@
-from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Bot, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 
 from dataclasses import dataclass
-from typing import Callable
-import asyncio
+from typing import Any, Awaitable, Callable
 
 from utils import StateManager
 
@@ -22,8 +21,8 @@ class TimerConfig:
         - prompt (str): The prompt message to be sent when the timer expires.
         - timeout (int): The duration of the timer in seconds.
         - callback_data (str): The data to be sent back when the user interacts with the prompt.
-        - is_active (Callable[[dict], bool]): A function to determine if the timer is still active based on
-            the current state.
+        - active_action (str): The action of the session (e.g. "answering") during which the timer is
+            still active. Kept as plain data, so the timer survives a restart of the bot.
     """
     user_id: int
     state_name: str
@@ -33,20 +32,51 @@ class TimerConfig:
     prompt: str
     timeout: int
     callback_data: str
-    is_active: Callable[[dict], bool]
+    active_action: str
+
+
+def restore_timer(data: dict, bot: Bot) -> Callable[[Any], Awaitable[None]]:
+    """
+    Build the expiry callback of a timer from its snapshot data.
+
+    Args:
+        data (dict): The snapshot data of the timer, as saved by `set_timer`.
+        bot (telegram.Bot): The bot sending the prompt.
+
+    Returns:
+        Callable: Coroutine function to be called with the expired session.
+
+    Example:
+        >>> await StateManager().restore_snapshot(lambda data: restore_timer(data, app.bot))
+    """
+
+    async def timeout_handler(session: Any) -> None:
+        if session.action == data["active_action"]:
+            retry_text = "Попробовать еще раз..."
+            keyboard = [
+                [InlineKeyboardButton(retry_text, callback_data=data["callback_data"])]
+            ]
+            reply_markup = InlineKeyboardMarkup(keyboard)
+            await bot.send_message(
+                chat_id=data["chat_id"], text=data["prompt"], reply_markup=reply_markup
+            )
+
+    return timeout_handler
 
 
 async def set_timer(config: TimerConfig):
     """
     Sets a timer for a specific user with the provided configuration.
 
-    This function sets a timer for a user based on the provided configuration. When the timer expires,
-    it sends a prompt message to the user with an option to retry.
+    This function arms the deadline of the user's session in the chat in the StateManager. When the deadline
+    passes, the expiry loop sends a prompt message to the user with an option to retry if the session is still
+    active, and removes the session. Setting a new timer for the same session replaces the previous one, and
+    removing the session cancels it. The timer is part of the session snapshot, so it survives a restart.
 
     Args:
         config (TimerConfig): Configuration for the timer, including user ID, state name, context, chat ID,
-            mention, prompt message, timeout duration, callback data, and a function to determine if the timer
-            should still be active.
+            mention, prompt message, timeout duration, callback data, and the action of the session during
+            which the timer is active.
 
     Raises:
         This function doesn't raise any exceptions.
@@ -61,29 +91,21 @@ async def set_timer(config: TimerConfig):
         >>>     prompt="Your time is up! Would you like to try again?",
         >>>     timeout=60,
         >>>     callback_data="retry",
-        >>>     is_active=lambda state: state.get('is_active', False)
+        >>>     active_action="answering",
         >>> )
         >>> await set_timer(timer_config)
     """
-    state_manager = StateManager()
-
-    async def timeout_handler() -> None:
-        await asyncio.sleep(config.timeout)
-
-        state = await state_manager.get_state(config.state_name, config.user_id)
-        if state and config.is_active(state):
-            retry_text = "Попробовать еще раз..."
-            keyboard = [
-                [InlineKeyboardButton(retry_text, callback_data=config.callback_data)]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            await config.context.bot.send_message(
-                chat_id=config.chat_id, text=config.prompt, reply_markup=reply_markup
-            )
-            await state_manager.remove_state(config.state_name, config.user_id)
-
-    await state_manager.set_state(
+    data = {
+        "chat_id": config.chat_id,
+        "prompt": config.prompt,
+        "callback_data": config.callback_data,
+        "active_action": config.active_action,
+    }
+    await StateManager().expire_after(
         config.state_name,
+        config.chat_id,
         config.user_id,
-        {"timer": asyncio.create_task(timeout_handler())},
+        config.timeout,
+        restore_timer(data, config.context.bot),
+        snapshot=data,
     )
@@ -0,0 +1,243 @@
+from pytz import timezone
+
+import calendar
+from datetime import date, datetime
+from typing import Dict, Any, List, Optional
+
+BIRTHDAY_FORMAT = "%d.%m.%Y"
+BOT_TIMEZONE = timezone("CET")
+
+
+class UserRecord:
+    """
+    Compact, typed information about a single user.
+
+    The birthday is parsed once when it is set and kept as a date ordinal, so nothing has to re-parse it
+    on every request. The friend feature keeps the day (CET date ordinal) its level was generated on,
+    so "used today" is a date comparison and no daily reset of all users is needed.
+
+    Records are stored as short lists (see `to_compact`) and converted to the dict shape returned by
+    `get_user_info` only where that shape is still needed (see `to_info`).
+
+    Attributes:
+        username (str): The username of the user.
+        first_name (str): The first name of the user.
+        birthday (int): The user's birthday as a date ordinal, or None if not set.
+        math_score (int): The best math score of the user.
+        friend_day (int): The day the friend feature was last used on as a date ordinal, or None.
+        friend_percentage (int): The friendship level generated by the friend feature on that day.
+        last_seen (int): The day the user last interacted with the bot as a date ordinal, or None.
+    """
+
+    __slots__ = (
+        "username",
+        "first_name",
+        "birthday",
+        "math_score",
+        "friend_day",
+        "friend_percentage",
+        "last_seen",
+    )
+
+    def __init__(
+        self,
+        username: Optional[str] = None,
+        first_name: Optional[str] = None,
+        birthday: Optional[int] = None,
+        math_score: int = 0,
+        friend_day: Optional[int] = None,
+        friend_percentage: int = 0,
+        last_seen: Optional[int] = None,
+    ) -> None:
+        self.username = username
+        self.first_name = first_name
+        self.birthday = birthday
+        self.math_score = math_score
+        # Files written before friend_day existed hold the old used_today flag here
+        self.friend_day = None if isinstance(friend_day, bool) else friend_day
+        self.friend_percentage = friend_percentage
+        self.last_seen = last_seen
+
+    @property
+    def birthday_date(self) -> Optional[date]:
+        """
+        The user's birthday as a date, or None if not set.
+        """
+        return date.fromordinal(self.birthday) if self.birthday else None
+
+    @property
+    def birthday_text(self) -> Optional[str]:
+        """
+        The user's birthday in the 'dd.mm.yyyy' format, or None if not set.
+        """
+        return self.birthday_date.strftime(BIRTHDAY_FORMAT) if self.birthday else None
+
+    @property
+    def friend_used_today(self) -> bool:
+        """
+        Whether the friend feature has already been used today.
+        """
+        return self.friend_day == today_ordinal()
+
+    def set_friend_percentage(self, percentage: int) -> None:
+        """
+        Store today's friendship level and mark the friend feature as used today.
+
+        Args:
+            percentage (int): The generated friendship level.
+        """
+        self.friend_day = today_ordinal()
+        self.friend_percentage = percentage
+
+    def copy(self) -> "UserRecord":
+        """
+        Return a shallow copy of the record.
+        """
+        return UserRecord(*self.to_compact())
+
+    def to_compact(self) -> List[Any]:
+        """
+        Serialize the record into a short list, in the order of `__slots__`.
+
+        Example:
+            >>> UserRecord("vlad", "Vlad", 730000, 7).to_compact()
+            ['vlad', 'Vlad', 730000, 7, None, 0, None]
+        """
+        return [
+            self.username,
+            self.first_name,
+            self.birthday,
+            self.math_score,
+            self.friend_day,
+            self.friend_percentage,
+            self.last_seen,
+        ]
+
+    @classmethod
+    def from_compact(cls, data: List[Any]) -> "UserRecord":
+        """
+        Create a record from the list produced by `to_compact`. Lists written before a field was
+        added are shorter; the missing fields get their defaults.
+        """
+        return cls(*data)
+
+    def to_info(self) -> Dict[str, Any]:
+        """
+        Convert the record into the dict shape returned by `get_user_info`.
+        """
+        return {
+            "username": self.username,
+            "first_name": self.first_name,
+            "credentials": {"birthday": self.birthday_text},
+            "math_score": self.math_score,
+            "friend": {
+                "used_today": self.friend_used_today,
+                "percentage": self.friend_percentage,
+            },
+        }
+
+    def update_from_info(self, info: Dict[str, Any]) -> None:
+        """
+        Apply (possibly partial) user information in the dict shape to the record.
+
+        Args:
+            info (dict): User information as returned by `get_user_info`. Missing keys are left unchanged.
+        """
+        if "username" in info:
+            self.username = info["username"]
+        if "first_name" in info:
+            self.first_name = info["first_name"]
+        if "birthday" in info.get("credentials", {}):
+            self.birthday = parse_birthday(info["credentials"]["birthday"])
+        if "math_score" in info:
+            self.math_score = info["math_score"]
+        friend = info.get("friend", {})
+        if "used_today" in friend:
+            self.friend_day = today_ordinal() if friend["used_today"] else None
+        if "percentage" in friend:
+            self.friend_percentage = friend["percentage"]
+
+    @classmethod
+    def from_info(cls, info: Dict[str, Any]) -> "UserRecord":
+        """
+        Create a record from user information in the dict shape.
+        """
+        record = cls()
+        record.update_from_info(info)
+        return record
+
+    @classmethod
+    def from_stored(cls, data) -> "UserRecord":
+        """
+        Create a record from its stored form, either the compact list or the legacy dict.
+        """
+        return cls.from_compact(data) if isinstance(data, list) else cls.from_info(data)
+
+
+def today_ordinal() -> int:
+    """
+    Return the current date in the bot's timezone (CET) as a date ordinal.
+
+    Example:
+        >>> today_ordinal()
+        739542
+    """
+    return datetime.now(BOT_TIMEZONE).date().toordinal()
+
+
+def parse_birthday(birthday: Optional[str]) -> Optional[int]:
+    """
+    Parse a 'dd.mm.yyyy' birthday into a date ordinal.
+
+    Args:
+        birthday (str or None): The birthday as entered by the user.
+
+    Returns:
+        int or None: The date ordinal, or None if the birthday is not set or not a valid date.
+
+    Example:
+        >>> parse_birthday("31.12.2000")
+        730485
+    """
+    if not birthday:
+        return None
+    try:
+        return datetime.strptime(birthday, BIRTHDAY_FORMAT).date().toordinal()
+    except ValueError:
+        return None
+
+
+def birthday_in_year(birthday: date, year: int) -> date:
+    """
+    Return the day a birthday is celebrated on in a given year.
+
+    Birthdays on February 29 are celebrated on February 28 in common years.
+
+    Args:
+        birthday (date): The date of birth.
+        year (int): The year of the celebration.
+
+    Returns:
+        date: The day of the celebration.
+
+    Example:
+        >>> birthday_in_year(date(2000, 2, 29), 2025)
+        datetime.date(2025, 2, 28)
+    """
+    if (birthday.month, birthday.day) == (2, 29) and not calendar.isleap(year):
+        return date(year, 2, 28)
+    return birthday.replace(year=year)
+
+
+def next_birthday(birthday: date, today: date) -> date:
+    """
+    Return the next celebration of a birthday, today included.
+
+    Example:
+        >>> next_birthday(date(2000, 2, 29), date(2025, 3, 1))
+        datetime.date(2026, 2, 28)
+    """
+    celebration = birthday_in_year(birthday, today.year)
+    if celebration < today:
+        celebration = birthday_in_year(birthday, today.year + 1)
+    return celebration
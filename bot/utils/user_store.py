@@ -0,0 +1,401 @@
+from collections import OrderedDict
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+import asyncio
+import heapq
+import os
+import threading
+
+from .io_pool import run_blocking
+from .user_record import UserRecord, today_ordinal
+from .storage import StorageBackend, ColdStore, create_storage, USER_COLD_FILE
+
+FLUSH_INTERVAL: float = 5.0  # seconds between two flushes of pending changes
+FLUSH_THRESHOLD: int = 50  # number of pending changes that triggers an early flush
+HOT_CAPACITY: int = int(os.getenv("USER_HOT_CAPACITY", "10000"))  # users kept in memory
+COLD_AFTER_DAYS: int = 90  # days without interaction after which a user moves to cold storage
+
+
+class UserStore:
+    """
+    Singleton repository of user information with a bounded in-memory (hot) tier.
+
+    Recently used users are kept in memory in LRU order, up to HOT_CAPACITY of them. A miss reads the
+    single user from the storage backend and, failing that, from the compressed cold file. Writes only
+    update the in-memory record and mark the user as dirty; the flusher task later hands all dirty users
+    to the backend at once, either every FLUSH_INTERVAL seconds or as soon as FLUSH_THRESHOLD changes
+    are pending. Dirty users are never evicted before they have been flushed.
+
+    Once a day the flusher moves the users who have not interacted with the bot for COLD_AFTER_DAYS
+    from the backend into the cold file, so the backend only holds the active users. A cold user who
+    comes back is written to the backend again and dropped from the cold file on the next pass.
+
+    All methods are thread-safe, so the async wrappers in data_manager can call them from the I/O
+    thread pool while the flusher writes to the backend.
+
+    Attributes:
+        users (OrderedDict): The hot tier, mapping user ID (str) to UserRecord, least recently used first.
+        storage (StorageBackend): The backend persisting the active users.
+        cold (ColdStore): The compressed file holding the inactive users.
+        loaded (bool): Whether the backend has already been opened.
+        dirty (set): IDs of the users changed since the last flush.
+        pending_changes (int): Number of updates since the last flush.
+    """
+
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super(UserStore, cls).__new__(cls)
+            cls._instance.users = OrderedDict()
+            cls._instance.storage = None
+            cls._instance.cold = None
+            cls._instance.loaded = False
+            cls._instance.dirty = set()
+            cls._instance.pending_changes = 0
+            cls._instance._rewarmed = set()
+            cls._instance._tiered_on = None
+            cls._instance._flush_requested = asyncio.Event()
+            cls._instance._loop = None
+            cls._instance._lock = threading.RLock()
+            # Lock order: `_flush_lock`, then `_lock`, then `_storage_lock`, which serializes the calls
+            # into the backend. Flushes run one at a time, so older snapshots never overwrite newer ones.
+            cls._instance._flush_lock = threading.Lock()
+            cls._instance._storage_lock = threading.RLock()
+            cls._instance._saving = set()
+        return cls._instance
+
+    def load(
+        self, storage: Optional[StorageBackend] = None, cold: Optional[ColdStore] = None
+    ) -> None:
+        """
+        Open the storage backend and the cold file. Users are read lazily, on first access.
+
+        Args:
+            storage (StorageBackend, optional): The backend to use. Defaults to the one configured
+                with the USER_STORAGE environment variable.
+            cold (ColdStore, optional): The cold file to use. Defaults to USER_COLD_FILE.
+
+        Example:
+            >>> UserStore().load()
+        """
+        with self._lock:
+            self.storage = storage or create_storage()
+            self.cold = cold or ColdStore(USER_COLD_FILE)
+            self.users = OrderedDict()
+            self.loaded = True
+        print(f"User store opened: {type(self.storage).__name__}")
+
+    def _ensure_loaded(self) -> None:
+        with self._lock:
+            if not self.loaded:
+                self.load()
+
+    def _fetch(self, user_id: str) -> Optional[UserRecord]:
+        # Return the hot record of a user, reading it into the hot tier on a miss
+        record = self.users.get(user_id)
+        if record:
+            self.users.move_to_end(user_id)
+            return record
+
+        with self._storage_lock:
+            record = self.storage.get(user_id)
+        if record is None:
+            record = self.cold.get(user_id)
+            if record is None:
+                return None
+            # Back from the cold file: the next flush writes the user to the backend again
+            self._rewarmed.add(user_id)
+            self._mark_dirty(user_id)
+
+        self.users[user_id] = record
+        self._evict()
+        return record
+
+    def _evict(self) -> None:
+        overflow = len(self.users) - HOT_CAPACITY
+        if overflow <= 0:
+            return
+        # The least recently used clean users; the scan stops as soon as enough are found
+        clean = []
+        for user_id in self.users:
+            # Users being saved are not in the backend yet either
+            if user_id not in self.dirty and user_id not in self._saving:
+                clean.append(user_id)
+                if len(clean) == overflow:
+                    break
+        for user_id in clean:
+            del self.users[user_id]
+
+    def get(self, user_id: str) -> Optional[UserRecord]:
+        """
+        Return a copy of the record of a single user.
+
+        Args:
+            user_id (str): The ID of the user.
+
+        Returns:
+            UserRecord or None: A copy of the stored record, or None if the user is unknown.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            record = self._fetch(user_id)
+            return record.copy() if record else None
+
+    def touch(self, user_id: str) -> None:
+        """
+        Record that a user interacted with the bot today.
+
+        Only the first interaction of the day changes the record, so this adds at most one write
+        per user and day.
+
+        Args:
+            user_id (str): The ID of the user.
+
+        Example:
+            >>> UserStore().touch("123")
+        """
+        self._ensure_loaded()
+        with self._lock:
+            record = self._fetch(user_id)
+            today = today_ordinal()
+            if record and record.last_seen != today:
+                record.last_seen = today
+                self._mark_dirty(user_id)
+
+    def iter_all(self) -> Iterator[Tuple[str, UserRecord]]:
+        """
+        Stream the records of all users, from the storage backend and then from the cold file.
+
+        Pending changes are flushed first. Backends that keep their data in several files (like the
+        sharded one) read them one at a time, so the whole user base is never materialized at once.
+
+        Returns:
+            Iterator[Tuple[str, UserRecord]]: Pairs of user ID and user record.
+
+        Example:
+            >>> for user_id, record in UserStore().iter_all():
+            ...     print(user_id, record.math_score)
+        """
+        self._ensure_loaded()
+        self.flush()
+        yield from self.storage.iter_all()
+        yield from self._iter_cold()
+
+    def _iter_cold(self) -> Iterator[Tuple[str, UserRecord]]:
+        # Users who came back are already served by the backend
+        rewarmed = set(self._rewarmed)
+        for user_id, record in self.cold.iter_all():
+            if user_id not in rewarmed:
+                yield user_id, record
+
+    def put(self, user_id: str, record: UserRecord) -> None:
+        """
+        Store a user record and mark the user as dirty.
+
+        Args:
+            user_id (str): The ID of the user.
+            record (UserRecord): The new record of the user. The store keeps its own copy.
+
+        Example:
+            >>> UserStore().put("123", record)
+        """
+        self._ensure_loaded()
+        with self._lock:
+            if user_id not in self.users and user_id in self.cold:
+                self._rewarmed.add(user_id)
+            self.users[user_id] = record.copy()
+            self.users.move_to_end(user_id)
+            self._mark_dirty(user_id)
+            self._evict()
+
+    def update(self, user_info: Dict[str, Any]) -> None:
+        """
+        Merge user information in the dict shape into the store and mark the changed users as dirty.
+
+        Args:
+            user_info (dict): Mapping of user ID to the information to store for that user.
+
+        Example:
+            >>> UserStore().update({"123": {"math_score": 5}})
+        """
+        self._ensure_loaded()
+        with self._lock:
+            for user_id, info in user_info.items():
+                record = self._fetch(user_id)
+                if record:
+                    record.update_from_info(info)
+                else:
+                    self.users[user_id] = UserRecord.from_info(info)
+                self._mark_dirty(user_id)
+            self._evict()
+
+    def _mark_dirty(self, user_id: str) -> None:
+        self.dirty.add(user_id)
+        self.pending_changes += 1
+        if self.pending_changes == FLUSH_THRESHOLD:
+            self._request_flush()
+
+    def _request_flush(self) -> None:
+        # update() may run on the I/O thread pool, so wake the flusher through its event loop
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._flush_requested.set)
+
+    def born_on(self, month: int, day: int) -> List[str]:
+        """
+        Find the users whose birthday falls on the given day of the year.
+
+        Pending changes are flushed first, so the backend can answer from its own index. Cold users
+        are included.
+
+        Args:
+            month (int): Month of the birthday (1-12).
+            day (int): Day of the month of the birthday.
+
+        Returns:
+            list: IDs of the matching users.
+        """
+        self._ensure_loaded()
+        self.flush()
+        with self._lock:
+            with self._storage_lock:
+                matches = self.storage.born_on(month, day)
+            for user_id, record in self._iter_cold():
+                birthday = record.birthday_date
+                if birthday and (birthday.month, birthday.day) == (month, day):
+                    matches.append(user_id)
+            return matches
+
+    def top_math_scores(self, limit: int = 10) -> List[Tuple[str, int]]:
+        """
+        Find the users with the highest math scores, cold users included.
+
+        Args:
+            limit (int): Maximum number of users to return.
+
+        Returns:
+            list: Pairs of user ID and math score, best score first.
+        """
+        self._ensure_loaded()
+        self.flush()
+        with self._lock:
+            with self._storage_lock:
+                scores = self.storage.top_math_scores(limit)
+            scores += [(user_id, record.math_score) for user_id, record in self._iter_cold()]
+            return heapq.nlargest(limit, scores, key=lambda item: item[1])
+
+    def flush(self) -> None:
+        """
+        Hand all pending changes to the storage backend.
+
+        This call blocks while the backend writes; from async code use `await run_blocking(store.flush)`.
+        Copies of the changed records are taken under the lock and written outside it, so reads and
+        writes of other users do not wait for the disk. If the backend fails, the changes stay pending
+        and the next flush retries them.
+
+        Example:
+            >>> UserStore().flush()
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self.dirty:
+                    return
+                dirty, self.dirty = self.dirty, set()
+                self.pending_changes = 0
+                snapshot = {user_id: self.users[user_id].copy() for user_id in dirty}
+                self._saving |= dirty
+
+            try:
+                with self._storage_lock:
+                    self.storage.save(snapshot)
+            except OSError as e:
+                with self._lock:
+                    self.dirty |= dirty
+                print(f"Error writing user data: {e}")
+            finally:
+                with self._lock:
+                    self._saving -= dirty
+                    self._evict()
+
+    def maintain(self) -> None:
+        """
+        Let the storage backend run its housekeeping and, once a day, move inactive users to the cold file.
+
+        Example:
+            >>> UserStore().maintain()
+        """
+        try:
+            with self._storage_lock:
+                self.storage.maintain()
+            if self._tiered_on != today_ordinal():
+                # Once a day even if it fails, e.g. on an unreadable cold file
+                self._tiered_on = today_ordinal()
+                with self._lock, self._storage_lock:
+                    self._move_inactive_to_cold()
+        except OSError as e:
+            print(f"Error maintaining user data: {e}")
+
+    def _move_inactive_to_cold(self) -> None:
+        today = today_ordinal()
+        inactive, unstamped = {}, {}
+        for user_id, record in self.storage.inactive_since(today - COLD_AFTER_DAYS):
+            if user_id in self.users:
+                continue
+            if record.last_seen is None:
+                # Users stored before last_seen existed start their inactivity period today
+                record.last_seen = today
+                unstamped[user_id] = record
+            else:
+                inactive[user_id] = record
+
+        if unstamped:
+            self.storage.save(unstamped)
+        # Returning users can only leave the cold file once the backend has their record
+        persisted = self._rewarmed - self.dirty
+        if inactive or persisted:
+            # The cold file is written first: a user found in both places is read from the backend
+            self.cold.move_in(inactive, remove=persisted)
+            self.storage.delete(inactive)
+            self._rewarmed -= persisted
+            print(f"Moved {len(inactive)} inactive users to cold storage")
+
+    def close(self) -> None:
+        """
+        Flush pending changes and close the storage backend.
+
+        Example:
+            >>> UserStore().close()
+        """
+        if not self.loaded:
+            return
+        self.flush()
+        with self._lock:
+            with self._storage_lock:
+                self.storage.close()
+            self.loaded = False
+
+    async def run_flusher(self, interval: float = FLUSH_INTERVAL) -> None:
+        """
+        Flush pending changes periodically or as soon as enough of them have piled up.
+
+        This task runs indefinitely and is meant to be started by the TaskManager. The flushes and
+        the housekeeping after them run on the I/O thread pool.
+
+        Args:
+            interval (float): Maximum number of seconds between two flushes.
+
+        Example:
+            >>> await task_manager.add_task(UserStore().run_flusher)
+        """
+        self._loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._flush_requested.wait(), interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._flush_requested.clear()
+                await run_blocking(self.flush)
+                await run_blocking(self.maintain)
+        except asyncio.CancelledError:
+            # Cancel the task if it's cancelled
+            pass
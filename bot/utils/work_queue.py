@@ -0,0 +1,124 @@
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+from collections import deque
+import asyncio
+import time
+
+MAX_RUNNING: int = 16  # jobs of different users running at the same time
+DRAIN_TIMEOUT: float = 10.0  # seconds the queued jobs get to finish when the bot stops
+
+Job = Callable[[], Awaitable[Any]]
+ErrorHandler = Callable[[Exception], Awaitable[Any]]
+
+
+class WorkQueue:
+    """
+    Singleton queue of the work deferred out of the update handlers.
+
+    A handler that has already given the user a reaction (e.g. answered a callback query) submits the
+    rest of its work here and returns, so the next updates are not held up by it. The jobs of one key
+    (a user) run one after another in the order they were submitted, so a user's commands, clicks and
+    messages are handled in order; jobs of different keys run concurrently, at most MAX_RUNNING at once. An error of a job is
+    handed to its error handler and does not stop the jobs queued behind it.
+
+    Attributes:
+        done (int): Number of jobs finished.
+        failed (int): Number of jobs that raised an error.
+    """
+
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super(WorkQueue, cls).__new__(cls, *args, **kwargs)
+            cls._instance.done = 0
+            cls._instance.failed = 0
+            cls._instance._queues: Dict[Any, Deque[tuple]] = {}
+            cls._instance._workers: Dict[Any, asyncio.Task] = {}
+            cls._instance._running: Optional[asyncio.Semaphore] = None
+            cls._instance._waited = [0, 0.0, 0.0]  # started jobs, total and max wait before starting
+        return cls._instance
+
+    def submit(self, key: Any, job: Job, on_error: ErrorHandler = None) -> None:
+        """
+        Queue a job behind the other jobs of its key.
+
+        Args:
+            key: The key ordering the job, e.g. the user ID.
+            job (Callable): Coroutine function run without arguments.
+            on_error (Callable, optional): Coroutine function called with the error if the job raises.
+
+        Example:
+            >>> WorkQueue().submit(user.id, lambda: friend_command(update, context))
+        """
+        if self._running is None:
+            self._running = asyncio.Semaphore(MAX_RUNNING)
+        self._queues.setdefault(key, deque()).append((job, on_error, time.monotonic()))
+        if key not in self._workers:
+            self._workers[key] = asyncio.create_task(self._work(key))
+
+    async def _work(self, key: Any) -> None:
+        queue = self._queues[key]
+        try:
+            while queue:
+                job, on_error, submitted = queue[0]
+                async with self._running:
+                    waited = time.monotonic() - submitted
+                    stats = self._waited
+                    stats[0] += 1
+                    stats[1] += waited
+                    stats[2] = max(stats[2], waited)
+                    try:
+                        await job()
+                        self.done += 1
+                    except Exception as e:
+                        self.failed += 1
+                        if on_error is None:
+                            print(f"Deferred job of {key} failed: {e}")
+                        else:
+                            await on_error(e)
+                queue.popleft()
+        except asyncio.CancelledError:
+            # Cancel the task if it's cancelled
+            pass
+        finally:
+            del self._queues[key]
+            del self._workers[key]
+
+    async def drain(self, timeout: float = DRAIN_TIMEOUT) -> None:
+        """
+        Wait for the queued jobs to finish, cancelling those still running after `timeout` seconds.
+
+        Example:
+            >>> await WorkQueue().drain()
+        """
+        workers = list(self._workers.values())
+        if not workers:
+            return
+        _, pending = await asyncio.wait(workers, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            print(f"Dropped the deferred work of {len(pending)} users on shutdown")
+            await asyncio.wait(pending)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return the counters of the queue.
+
+        Returns:
+            dict: Jobs finished and failed, jobs queued or running and the users they are for, and the
+            mean and longest wait of a job before it started in seconds.
+
+        Example:
+            >>> WorkQueue().stats()["queued"]
+            0
+        """
+        started, total, longest = self._waited
+        return {
+            "done": self.done,
+            "failed": self.failed,
+            "queued": sum(len(queue) for queue in self._queues.values()),
+            "busy_users": len(self._workers),
+            "mean_wait": total / started if started else 0.0,
+            "max_wait": longest,
+        }